@@ -0,0 +1,150 @@
+"""
+無視窗重播基準測試：以錄影檔或合成畫面取代攝影機驅動完整的 main() 迴圈，
+結束時輸出各階段 (remap、cvtColor、pose.process、blur、draw_posture_ui、display) 的耗時百分位數。
+
+用法:
+    python Codes/benchmark.py --video session.mp4
+    python Codes/benchmark.py --synthetic 600 --keys 200:b,400:b
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+import main as app
+from stage_timer import StageTimer
+from voice_assistant import SilentVoice
+
+
+class ReplayCapture:
+    """讀取錄影檔，讀到結尾時自動釋放，讓主迴圈的 cap.isOpened() 結束"""
+    def __init__(self, path, max_frames=None):
+        self.cap = cv2.VideoCapture(path)
+        self.max_frames = max_frames
+        self.frames_read = 0
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def read(self):
+        if self.max_frames is not None and self.frames_read >= self.max_frames:
+            self.cap.release()
+            return False, None
+        success, frame = self.cap.read()
+        if not success:
+            self.cap.release()
+            return False, None
+        if frame.shape[:2] != (app.H, app.W):
+            frame = cv2.resize(frame, (app.W, app.H))
+        self.frames_read += 1
+        return True, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticCapture:
+    """產生固定數量的合成畫面 (漸層背景加上移動的方塊)，不需要攝影機或影片"""
+    def __init__(self, num_frames, width=app.W, height=app.H, variants=8):
+        self.num_frames = num_frames
+        self.frames_read = 0
+        self.opened = True
+        xs = np.linspace(0, 255, width, dtype=np.uint8)
+        base = np.dstack([np.tile(xs, (height, 1))] * 3)
+        self.frames = []
+        for i in range(variants):
+            frame = base.copy()
+            x = (i * width // variants) % (width - 200)
+            cv2.rectangle(frame, (x, height // 3), (x + 200, height // 3 + 200), (40, 120, 200), -1)
+            self.frames.append(frame)
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        if self.frames_read >= self.num_frames:
+            self.opened = False
+            return False, None
+        frame = self.frames[self.frames_read % len(self.frames)].copy()
+        self.frames_read += 1
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+
+class HeadlessDisplay:
+    """取代 cv2 的顯示函式：不開視窗，waitKey 依腳本回傳按鍵"""
+    def __init__(self, keys=None):
+        self.keys = keys or {}   # 第幾幀 -> 按鍵字元
+        self.frame_index = 0
+
+    def imshow(self, name, image):
+        pass
+
+    def waitKey(self, delay=0):
+        key = self.keys.get(self.frame_index)
+        self.frame_index += 1
+        return ord(key) if key else -1
+
+    def destroyAllWindows(self):
+        pass
+
+
+def parse_keys(spec):
+    """把 "200:b,400:q" 轉成 {200: "b", 400: "q"}"""
+    keys = {}
+    if not spec:
+        return keys
+    for item in spec.split(","):
+        frame, key = item.split(":")
+        keys[int(frame)] = key.strip()
+    return keys
+
+
+def run_benchmark(cap, keys=None, pipelined=False, use_roi=False, display_scale=1.0, infer_every=1):
+    timer = StageTimer()
+    display = HeadlessDisplay(keys)
+    start = time.perf_counter()
+    app.main(pipelined=pipelined, cap=cap, display=display, voice=SilentVoice(),
+             timer=timer, report=False, use_roi=use_roi, log_dir=None,
+             rollup_db=None, display_scale=display_scale, infer_every=infer_every)
+    wall = time.perf_counter() - start
+
+    frames = display.frame_index
+    print()
+    print(f"Frames: {frames}, wall time: {wall:.2f}s, end-to-end FPS: {frames / wall if wall > 0 else 0:.1f}")
+    print("Stage latency (ms):")
+    print(timer.format_report())
+    return timer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Smart Posture Assistant 無視窗基準測試")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", help="用來重播的錄影檔")
+    source.add_argument("--synthetic", type=int, metavar="N", help="使用 N 幀合成畫面")
+    parser.add_argument("--max-frames", type=int, default=None, help="錄影檔最多讀取的幀數")
+    parser.add_argument("--keys", default="", help="按鍵腳本，例如 200:b,400:b")
+    parser.add_argument("--pipeline", action="store_true", help="以多執行緒管線模式執行")
+    parser.add_argument("--roi", action="store_true", help="啟用上半身 ROI 推論")
+    parser.add_argument("--display-scale", type=float, default=1.0, help="顯示解析度比例")
+    parser.add_argument("--infer-every", type=int, default=1, help="每 N 幀才跑一次姿勢模型，其他幀使用預測的關鍵點")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.video:
+        capture = ReplayCapture(args.video, args.max_frames)
+    else:
+        capture = SyntheticCapture(args.synthetic)
+    run_benchmark(capture, parse_keys(args.keys), pipelined=args.pipeline, use_roi=args.roi,
+                  display_scale=args.display_scale, infer_every=args.infer_every)
@@ -0,0 +1,105 @@
+import cv2
+import numpy as np
+
+# 用來判斷人有沒有移動的關鍵點：鼻子、左肩、右肩
+ANCHOR_LANDMARKS = (0, 11, 12)
+
+
+def anchor_points(pose_landmarks):
+    """從 MediaPipe 結果取出錨點的正規化座標 (K, 2)；沒有偵測到人時回傳 None"""
+    if pose_landmarks is None:
+        return None
+    landmarks = pose_landmarks.landmark
+    return np.array([[landmarks[i].x, landmarks[i].y] for i in ANCHOR_LANDMARKS], dtype=np.float32)
+
+
+class BackgroundBlur:
+    """
+    背景模糊合成器 (隱私模式)。
+
+    - 在縮小的畫面上做高斯模糊再放大回原尺寸，成本約為全解析度模糊的 scale^2。
+    - 所有中間影像都預先配置，直接就地寫回原畫面，遮罩只用單通道。
+    - 人幾乎沒有移動時沿用上一次的遮罩 (最多 max_mask_age 幀)，
+      該幀拿不到 segmentation_mask 時也會沿用。
+    """
+    def __init__(self, scale=0.25, kernel=55, threshold=0.1, motion_threshold=0.01, max_mask_age=15):
+        self.scale = scale
+        self.threshold = threshold
+        self.motion_threshold = motion_threshold  # 錨點移動量 (正規化座標) 超過此值就重建遮罩
+        self.max_mask_age = max_mask_age
+
+        # 縮小後的核大小也要等比例縮小，並保持為奇數
+        k = max(3, int(kernel * scale))
+        self.kernel = k if k % 2 == 1 else k + 1
+
+        self._shape = None
+        self._small = None
+        self._small_blur = None
+        self._full_blur = None
+        self._background = None   # 單通道 uint8 遮罩，255 代表背景
+        self._mask_anchor = None
+        self._mask_age = None     # None 表示目前沒有可用的遮罩
+
+    def _ensure_buffers(self, frame):
+        if self._shape == frame.shape:
+            return
+        h, w = frame.shape[:2]
+        small_w = max(1, int(w * self.scale))
+        small_h = max(1, int(h * self.scale))
+        self._shape = frame.shape
+        self._small = np.empty((small_h, small_w, frame.shape[2]), dtype=frame.dtype)
+        self._small_blur = np.empty_like(self._small)
+        self._full_blur = np.empty_like(frame)
+        self._background = np.zeros((h, w), dtype=np.uint8)
+        self._mask_age = None
+
+    def _update_mask(self, segmentation_mask, anchor):
+        """更新背景遮罩；回傳目前是否有可用的遮罩"""
+        moved = True
+        if anchor is not None and self._mask_anchor is not None:
+            moved = float(np.abs(anchor - self._mask_anchor).max()) > self.motion_threshold
+
+        reusable = self._mask_age is not None and self._mask_age < self.max_mask_age
+        if segmentation_mask is not None and (moved or not reusable):
+            if segmentation_mask.shape != self._background.shape:
+                return reusable
+            # 1 是人, 0 是背景
+            cv2.compare(segmentation_mask, self.threshold, cv2.CMP_LE, dst=self._background)
+            self._mask_anchor = anchor
+            self._mask_age = 0
+            return True
+
+        if reusable:
+            self._mask_age += 1
+            return True
+        return False
+
+    def apply(self, frame, segmentation_mask, anchor=None):
+        """
+        就地把 frame 的背景換成模糊畫面。
+
+        Args:
+            frame: BGR 畫面 (會被直接修改)
+            segmentation_mask: MediaPipe 的人像機率圖 (H, W)，可為 None
+            anchor: anchor_points() 的結果，用來判斷能否沿用上一次的遮罩
+        Returns:
+            是否有套用模糊
+        """
+        self._ensure_buffers(frame)
+        if not self._update_mask(segmentation_mask, anchor):
+            return False
+
+        h, w = frame.shape[:2]
+        small_h, small_w = self._small.shape[:2]
+        cv2.resize(frame, (small_w, small_h), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self._small, (self.kernel, self.kernel), 0, dst=self._small_blur)
+        cv2.resize(self._small_blur, (w, h), dst=self._full_blur, interpolation=cv2.INTER_LINEAR)
+
+        # 混合：背景的位置換成模糊圖，人維持原圖
+        cv2.copyTo(self._full_blur, self._background, frame)
+        return True
+
+    def reset(self):
+        """丟棄快取的遮罩 (例如關閉模糊時)"""
+        self._mask_age = None
+        self._mask_anchor = None
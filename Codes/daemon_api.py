@@ -0,0 +1,139 @@
+"""
+背景服務模式 (--daemon) 的本機 HTTP API。
+
+不開視窗、不呼叫 waitKey，也不繪製任何 UI；狀態與指令透過 127.0.0.1 上的 HTTP 提供：
+    GET  /state    目前狀態 (在場、分數、番茄鐘、PostureHistory.snapshot() 等) 的 JSON
+    POST /blur     切換背景模糊 (等同按 'b')
+    POST /reset    重置久坐計時器 (等同按 'r')
+    POST /quit     結束程式並生成報告 (等同按 'q')
+
+只接受本機程式的請求：帶有 Origin 標頭 (瀏覽器中的網頁發出) 的請求一律拒絕，
+POST 必須是 Content-Type: application/json，網頁無法不經 CORS 預檢就送出這種請求。
+
+例如：
+    curl http://127.0.0.1:8765/state
+    curl -X POST -H "Content-Type: application/json" http://127.0.0.1:8765/quit
+"""
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+
+# API 路徑 -> 主迴圈的按鍵
+COMMANDS = {
+    "/blur": "b",
+    "/reset": "r",
+    "/quit": "q",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PostureDaemon/1.0"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject_browser(self):
+        """網頁 (任何帶有 Origin 標頭的請求) 不能使用 API；拒絕時回傳 True"""
+        if self.headers.get("Origin") is not None:
+            self._send_json(403, {"error": "cross-origin requests are not allowed"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._reject_browser():
+            return
+        if self.path.rstrip("/") in ("/state", ""):
+            self._send_json(200, self.server.daemon.state())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self._reject_browser():
+            return
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self._send_json(415, {"error": "Content-Type must be application/json"})
+            return
+        key = COMMANDS.get(self.path.rstrip("/"))
+        if key is None:
+            self._send_json(404, {"error": "unknown command", "commands": sorted(COMMANDS)})
+            return
+        self.server.daemon.command(key)
+        self._send_json(202, {"queued": self.path.rstrip("/")[1:]})
+
+    def log_message(self, format, *args):
+        pass  # 不在終端機輸出每個請求
+
+
+class DaemonServer:
+    """
+    在背景執行緒提供 HTTP API。
+    主迴圈每幀呼叫 publish() 更新狀態 (只替換 dict 參考，不做序列化)，
+    JSON 只在有請求時才在 HTTP 執行緒產生。
+    """
+    def __init__(self, host=DAEMON_HOST, port=DAEMON_PORT):
+        self.host = host
+        self.port = port
+        self._state = {"running": False}
+        self._commands = queue.Queue()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.daemon = self
+        self.port = self._server.server_address[1]  # port=0 時由系統分配
+        self._thread = threading.Thread(target=self._server.serve_forever, name="daemon-api", daemon=True)
+        self._thread.start()
+        print(f"API 已啟動: http://{self.host}:{self.port}/state")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def publish(self, state):
+        self._state = state
+
+    def state(self):
+        return self._state
+
+    def command(self, key):
+        """排入一個指令 (按鍵字元)，主迴圈下次呼叫 waitKey 時取得"""
+        self._commands.put(key)
+
+    def display(self):
+        return DaemonDisplay(self)
+
+
+class DaemonDisplay:
+    """
+    取代 cv2 的顯示介面：不開視窗，waitKey 回傳 API 排入的指令，
+    讓主迴圈沿用原本的按鍵處理。
+    """
+    def __init__(self, server):
+        self.server = server
+
+    def imshow(self, name, frame):
+        pass
+
+    def waitKey(self, delay=0):
+        try:
+            return ord(self.server._commands.get_nowait())
+        except queue.Empty:
+            return -1
+
+    def destroyAllWindows(self):
+        pass
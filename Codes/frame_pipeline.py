@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from stage_timer import NullTimer
+
+
+class LatestQueue:
+    """有界佇列：滿了就丟掉最舊的幀，確保下游永遠拿到最新的資料"""
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()  # 丟棄過期的幀
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """取出最舊的一筆；逾時或佇列已關閉時回傳 None"""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class StageStats:
+    """記錄單一階段的吞吐量 (每秒處理幀數)"""
+    def __init__(self, name, window=1.0):
+        self.name = name
+        self.window = window
+        self.total = 0
+        self.fps = 0.0
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+
+    def tick(self):
+        self.total += 1
+        self._window_count += 1
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= self.window:
+            self.fps = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+
+class PipelineStage(threading.Thread):
+    """
+    管線中的一個階段：從 in_queue 取資料，交給 work() 處理後放進 out_queue。
+    in_queue 為 None 時代表來源階段 (例如攝影機擷取)。
+    work() 回傳 None 表示這一幀沒有產出 (例如讀取失敗)。
+    """
+    def __init__(self, name, work, in_queue, out_queue, stop_event):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.work = work
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop_event = stop_event
+        self.stats = StageStats(name)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            item = None
+            if self.in_queue is not None:
+                item = self.in_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+            try:
+                out = self.work(item)
+            except Exception as e:
+                print(f"管線階段 {self.stats.name} 發生錯誤: {e}")
+                continue
+            if out is None:
+                continue
+            self.stats.tick()
+            self.out_queue.put(out)
+
+
+class FramePipeline:
+    """
+    多執行緒分段處理：擷取 -> 畸變修正 -> 姿勢推論，各自在獨立執行緒執行。
+    繪製與顯示 (cv2.imshow 必須在主執行緒) 由呼叫端透過 read() 取得結果後處理。
+    階段之間以 LatestQueue 連接，推論永遠處理最新的一幀，過期的幀直接丟棄。
+    """
+    def __init__(self, cap, pose, mapx=None, mapy=None, queue_size=1, timer=None, roi=None, predictor=None):
+        self.cap = cap
+        self.pose = pose
+        self.roi = roi
+        self.predictor = predictor
+        self.mapx = mapx
+        self.mapy = mapy
+        self.timer = timer or NullTimer()
+
+        self.stop_event = threading.Event()
+        self.capture_queue = LatestQueue(queue_size)
+        self.undistort_queue = LatestQueue(queue_size)
+        self.output_queue = LatestQueue(queue_size)
+
+        self.stages = [
+            PipelineStage("capture", self._capture, None, self.capture_queue, self.stop_event),
+            PipelineStage("undistort", self._undistort, self.capture_queue, self.undistort_queue, self.stop_event),
+            PipelineStage("inference", self._infer, self.undistort_queue, self.output_queue, self.stop_event),
+        ]
+        self.render_stats = StageStats("render")
+
+    def _capture(self, _):
+        with self.timer.stage("capture"):
+            success, frame = self.cap.read()
+        if not success:
+            time.sleep(0.005)  # 避免讀取失敗時空轉
+            return None
+        return frame
+
+    def _undistort(self, frame):
+        if self.mapx is not None and self.mapy is not None:
+            with self.timer.stage("remap"):
+                frame = cv2.remap(frame, self.mapx, self.mapy, cv2.INTER_LINEAR)
+        return frame
+
+    def _infer(self, frame):
+        predictor = self.predictor
+        if predictor is not None:
+            timestamp = time.time()
+            if not predictor.should_infer(timestamp):
+                return frame, predictor.predict()
+        frame.flags.writeable = False
+        with self.timer.stage("cvtColor"):
+            if self.roi is not None:
+                frame_rgb, roi_rect = self.roi.prepare(frame)
+            else:
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with self.timer.stage("pose.process"):
+            results = self.pose.process(frame_rgb)
+        if self.roi is not None:
+            results = self.roi.restore(results, roi_rect, frame.shape)
+        if predictor is not None:
+            predictor.observe(timestamp, results)
+        frame.flags.writeable = True
+        return frame, results
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def read(self, timeout=0.5):
+        """取得最新的 (frame, results)；逾時回傳 None"""
+        packet = self.output_queue.get(timeout=timeout)
+        if packet is not None:
+            self.render_stats.tick()
+        return packet
+
+    def stats(self):
+        """
+        回傳各階段的統計資料列表。
+        queue_depth 為該階段輸入佇列目前的長度，dropped 為該佇列丟棄的過期幀數。
+        """
+        summary = []
+        in_queues = [None, self.capture_queue, self.undistort_queue, self.output_queue]
+        all_stats = [stage.stats for stage in self.stages] + [self.render_stats]
+        for stats, queue in zip(all_stats, in_queues):
+            summary.append({
+                "name": stats.name,
+                "fps": stats.fps,
+                "frames": stats.total,
+                "queue_depth": len(queue) if queue is not None else 0,
+                "dropped": queue.dropped if queue is not None else 0,
+            })
+        return summary
+
+    def format_stats(self):
+        return " | ".join(
+            f"{s['name']}: {s['fps']:.1f} fps, q={s['queue_depth']}, drop={s['dropped']}"
+            for s in self.stats()
+        )
+
+    def stop(self):
+        self.stop_event.set()
+        for queue in (self.capture_queue, self.undistort_queue, self.output_queue):
+            queue.close()
+        for stage in self.stages:
+            stage.join(timeout=1.0)
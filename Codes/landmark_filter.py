@@ -0,0 +1,160 @@
+"""
+關鍵點預測：評分用的五個關鍵點 (鼻子、雙眼、雙肩) 的等速度卡爾曼濾波。
+
+坐著的使用者移動很慢，不需要每幀都跑完整的姿勢模型。
+LandmarkPredictor 決定哪些幀要推論 (每 N 幀一次，或預測誤差變大時提早)，
+其他幀由濾波器外插出關鍵點，評分與骨架繪製照常進行。
+"""
+import time
+
+import numpy as np
+
+from pose_backends import LandmarkList, PoseResult
+from posture_score import NOSE, LEFT_EYE, RIGHT_EYE, LEFT_SHOULDER, RIGHT_SHOULDER
+
+# extract_face_shoulder_features 使用的關鍵點：鼻子、左眼、右眼、左肩、右肩
+SCORER_LANDMARKS = (NOSE, LEFT_EYE, RIGHT_EYE, LEFT_SHOULDER, RIGHT_SHOULDER)
+
+PROCESS_NOISE = 0.001         # 加速度的雜訊強度 (正規化座標 / s^2)^2 / Hz，坐姿移動很慢
+MEASUREMENT_NOISE = 0.003 ** 2  # 模型輸出關鍵點的抖動 (正規化座標)^2
+MAX_PREDICT_ERROR = 0.01      # 預測誤差 (標準差或上次推論的殘差) 超過此值時提早推論，約 13 px @ 1280
+MAX_PREDICT_SECONDS = 0.5     # 最多連續外插多久 (秒)
+
+
+class LandmarkKalman:
+    """
+    每個座標 (x, y) 各自一個 [位置, 速度] 的等速度模型，以向量化的 NumPy 運算一次更新全部座標。
+    共變異數只存 P00 / P01 / P11 三個元素 (對稱 2x2)。
+    """
+    def __init__(self, count, process_noise=PROCESS_NOISE, measurement_noise=MEASUREMENT_NOISE):
+        self.count = count
+        self.q = process_noise
+        self.r = measurement_noise
+        self.reset()
+
+    def reset(self):
+        n = self.count * 2
+        self.position = np.zeros(n)
+        self.velocity = np.zeros(n)
+        self.p00 = np.zeros(n)
+        self.p01 = np.zeros(n)
+        self.p11 = np.zeros(n)
+        self.timestamp = None
+        self.initialized = False
+
+    def predict(self, timestamp):
+        """把狀態推進到 timestamp，回傳預測的位置 (count, 2)"""
+        dt = timestamp - self.timestamp
+        if dt > 0:
+            q = self.q
+            self.position += self.velocity * dt
+            self.p00 += dt * (2.0 * self.p01 + dt * self.p11) + q * dt ** 3 / 3.0
+            self.p01 += dt * self.p11 + q * dt ** 2 / 2.0
+            self.p11 += q * dt
+            self.timestamp = timestamp
+        return self.position.reshape(self.count, 2)
+
+    def update(self, timestamp, measured):
+        """加入一次量測 (count, 2)，回傳殘差 (量測 - 預測) 的最大絕對值"""
+        z = np.asarray(measured, dtype=np.float64).ravel()
+        if not self.initialized:
+            self.position[:] = z
+            self.velocity[:] = 0.0
+            self.p00[:] = self.r
+            self.p01[:] = 0.0
+            self.p11[:] = self.q  # 初始速度未知
+            self.timestamp = timestamp
+            self.initialized = True
+            return 0.0
+        self.predict(timestamp)
+        residual = z - self.position
+        s = self.p00 + self.r
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        self.position += k0 * residual
+        self.velocity += k1 * residual
+        self.p11 -= k1 * self.p01
+        self.p01 *= 1.0 - k0
+        self.p00 *= 1.0 - k0
+        return float(np.abs(residual).max())
+
+    def position_std(self):
+        """目前預測位置的最大標準差"""
+        return float(np.sqrt(self.p00.max()))
+
+
+class _PredictedLandmark:
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, x, y, z, visibility):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visibility = visibility
+
+
+class LandmarkPredictor:
+    """
+    決定每一幀要不要跑姿勢模型，不跑時提供預測的關鍵點。
+    每幀先呼叫 should_infer(timestamp)；需要推論時把結果交給 observe()，否則呼叫 predict() 取得結果。
+    預測的結果沿用上次推論的其他關鍵點 (只有 indices 的位置會移動)，沒有 segmentation_mask。
+    """
+    def __init__(self, infer_every=2, max_error=MAX_PREDICT_ERROR, max_seconds=MAX_PREDICT_SECONDS,
+                 indices=SCORER_LANDMARKS, **kalman_kwargs):
+        self.infer_every = max(1, int(infer_every))
+        self.max_error = max_error
+        self.max_seconds = max_seconds
+        self.indices = tuple(indices)
+        self.kalman = LandmarkKalman(len(self.indices), **kalman_kwargs)
+        self._landmarks = None        # 上次推論的完整關鍵點列表
+        self._last_inference = None
+        self._frames_since = 0
+        self._residual = 0.0
+        self.inferred = 0
+        self.predicted = 0
+
+    def should_infer(self, timestamp=None):
+        """推進濾波器到這一幀並判斷是否需要推論 (每幀呼叫一次)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        if self._landmarks is None or not self.kalman.initialized:
+            return True  # 目前沒有追蹤中的人
+        self.kalman.predict(timestamp)
+        if self._frames_since + 1 >= self.infer_every:
+            return True
+        if timestamp - self._last_inference >= self.max_seconds:
+            return True
+        return self._residual > self.max_error or self.kalman.position_std() > self.max_error
+
+    def observe(self, timestamp, results):
+        """推論幀：以模型結果更新濾波器，回傳原本的 results"""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.inferred += 1
+        self._frames_since = 0
+        self._last_inference = timestamp
+        pose_landmarks = results.pose_landmarks
+        if pose_landmarks is None:
+            self._landmarks = None
+            self._residual = 0.0
+            self.kalman.reset()
+            return results
+        landmarks = pose_landmarks.landmark
+        self._landmarks = landmarks
+        measured = [(landmarks[i].x, landmarks[i].y) for i in self.indices]
+        self._residual = self.kalman.update(timestamp, measured)
+        return results
+
+    def predict(self):
+        """非推論幀：回傳 should_infer() 推進後的預測位置組成的結果 (形式與 solution 的結果相同)"""
+        self.predicted += 1
+        self._frames_since += 1
+        positions = self.kalman.position.reshape(-1, 2)
+        landmarks = list(self._landmarks)
+        for (x, y), i in zip(positions.tolist(), self.indices):
+            last = landmarks[i]
+            landmarks[i] = _PredictedLandmark(x, y, last.z, getattr(last, "visibility", None))
+        return PoseResult(LandmarkList(landmarks), None)
+
+    @property
+    def inference_ratio(self):
+        total = self.inferred + self.predicted
+        return self.inferred / total if total else 1.0
@@ -1,254 +1,365 @@
-import cv2
 import time
-import mediapipe as mp
-import numpy as np
-import os
+_IMPORT_START = time.perf_counter()  # --startup-timing：模組載入時間
+
+import argparse
+import cv2
+import signal
 
 from posture_score import extract_face_shoulder_features, PostureScore
 from posture_history import PostureHistory
-from ui_painter import draw_pose_landmarks, draw_posture_ui
-from voice_assistant import VoiceAssistant
-from report_generator import generate_report
+from ui_painter import draw_pose_landmarks, draw_posture_ui, OverlayRenderer, NullOverlay
+from voice_assistant import VoiceAssistant, PRIORITY_HIGH, PRIORITY_LOW
+from report_generator import generate_report, parse_report_formats
+from frame_pipeline import FramePipeline
+from stage_timer import StageTimer, FrameRateMeter, StartupTimer
+from pose_backends import BackgroundPoseLoader, POSE_BACKENDS, POSE_LANDMARKER_MODEL
+from landmark_filter import LandmarkPredictor, MAX_PREDICT_ERROR
+from blur_compositor import BackgroundBlur, anchor_points
+from roi_tracker import UpperBodyROI
+from undistort import load_camera_params, build_remap_maps, LandmarkUndistorter
+from score_timeline import ScoreTimeline
+from session_log import SessionLogWriter, new_session_path
+from rollups import RollupAccumulator, RollupStore
+from daemon_api import DaemonServer, DAEMON_PORT
+from session_engine import SessionEngine, WARN, USER_AWAY, USER_RETURNING, USER_BACK, BREAK_DUE
+from shm_frames import SharedMemoryCapture
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 # --- 設定全域常數 ---
 W, H = 1280, 720
 POMODORO_LIMIT_SECONDS =  60  # 久坐提醒時間 (30分鐘)
 LOW_SCORE_THRESHOLD = 70      # 低於幾分開始警告
 WARNING_COOLDOWN = 5.0        # 語音警告冷卻時間 (秒)
+PIPELINE_REPORT_INTERVAL = 10.0  # 管線模式下輸出各階段統計的間隔 (秒)
+PERF_WINDOW = 300             # 每個階段保留的耗時樣本數 (約 10 秒)
+PERF_REFRESH_INTERVAL = 0.5   # 除錯面板的百分位數更新間隔 (秒)
 
 
 
-def main():
-    cap = cv2.VideoCapture(0)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, W)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, H)
-    
-    if not cap.isOpened():
-        print("Error: Could not open webcam.")
-        return
+def main(pipelined=False, cap=None, display=None, voice=None, timer=None, report=True, use_roi=False,
+         undistort_mode="image", log_dir="sessions", report_formats=("png",), show_report=False,
+         rollup_db="rollups.sqlite3", display_scale=1.0, daemon=None, camera_index=0,
+         headless=False, stop_event=None, on_result=None, on_finish=None, capture_process=False,
+         pose_backend="solution", pose_model=POSE_LANDMARKER_MODEL, infer_every=1,
+         max_predict_error=MAX_PREDICT_ERROR, startup_timing=False):
+    """
+    主程式迴圈。參數預設為實際攝影機與視窗，基準測試 (benchmark.py) 可替換：
+        cap: 影像來源 (需有 read / isOpened / release)，預設為 cv2.VideoCapture(camera_index)
+        display: 顯示介面 (需有 imshow / waitKey / destroyAllWindows)，預設為 cv2
+        voice: 語音助手，預設為 VoiceAssistant()
+        timer: 各階段計時器 (StageTimer)，預設為常駐的環狀緩衝區版本
+        report: 結束時是否生成報告
+        use_roi: 只把上半身附近的縮小裁切送進 Pose 模型 (UpperBodyROI)
+        undistort_mode: 有 camera_params.npz 時的畸變修正方式
+            "image" 修正整張畫面 (定點數 remap 表，快取在磁碟)、
+            "landmarks" 只修正評分用的關鍵點、"off" 不修正
+        log_dir: 每幀特徵與分數的 session 記錄檔目錄，None 表示不記錄
+        report_formats: 報告輸出格式 ("png" / "svg" / "html")
+        show_report: 報告產生後是否用系統預設程式開啟
+        rollup_db: 每分鐘彙總資料庫 (多日報告用)，None 表示不更新
+        display_scale: 顯示解析度相對於擷取解析度的比例，小於 1 時先縮小畫面再疊字與顯示
+        daemon: 已啟動的 DaemonServer；指定時不開視窗、不繪製 UI，狀態與指令改由本機 API 提供
+        camera_index: 未指定 cap 時開啟的攝影機編號
+        headless: 不繪製任何 UI (多攝影機的 worker 使用)
+        stop_event: 設定後結束主迴圈 (multiprocessing.Event 或 threading.Event)
+        on_result: 每幀呼叫 on_result(timestamp, present, score, state, time_left, away)，
+            score / state 在沒有評分時為 None，time_left 在計時暫停時為 None，
+            away 為 SessionEngine 判定的離席狀態 (離開後到回座確認完成前為 True)
+        on_finish: session 結束時呼叫 on_finish(away_periods)，離席時段為絕對時間 [(start, end), ...]
+        capture_process: 未指定 cap 時，在獨立行程擷取與畸變修正，畫面經共享記憶體傳給主迴圈
+            (SharedMemoryCapture)；不可與 pipelined 同時使用
+        pose_backend: 姿勢推論後端 (pose_backends.py)，"solution" 同步推論、
+            "live_stream" 非同步推論 (結果晚約一幀，不可與 use_roi 同時使用)
+        pose_model: live_stream 後端的 PoseLandmarker 模型檔
+        infer_every: 大於 1 時每 N 幀才跑一次姿勢模型 (預測誤差超過 max_predict_error 時提早)，
+            其他幀以卡爾曼濾波預測的關鍵點評分與繪製 (LandmarkPredictor)
+        startup_timing: 顯示第一幀後輸出啟動各步驟的耗時
+    """
+    startup = StartupTimer()
+    startup.add("imports", _IMPORT_SECONDS, background=False)
+    # 姿勢模型在背景建立並預熱，同時在這裡開啟攝影機、載入校正參數
+    # (segmentation 只在背景模糊開啟時才執行，一開始只建立骨架模型)
+    pose_loader = BackgroundPoseLoader(
+        pose_backend,
+        (W, H),
+        segmentation=False,
+        model_path=pose_model,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+    if daemon is not None:
+        display = daemon.display()
+    display = display or cv2
+    draw_ui = daemon is None and not headless
+    timer = timer or StageTimer(capacity=PERF_WINDOW)
+    fps_meter = FrameRateMeter()
 
     # --- [張氏標定參數載入] ---
     mapx, mapy = None, None
-    if os.path.exists("camera_params.npz"):
-        try:
-            with np.load("camera_params.npz") as data:
-                mtx = data['mtx']
-                dist = data['dist']
-            newcameramtx, roi = cv2.getOptimalNewCameraMatrix(mtx, dist, (W, H), 0, (W, H))
-            mapx, mapy = cv2.initUndistortRectifyMap(mtx, dist, None, newcameramtx, (W, H), 5)
-            print("已載入相機校正參數。")
-        except Exception as e:
-            print(f"載入參數失敗: {e}")
+    landmark_undistort = None
+    camera_params = load_camera_params() if undistort_mode != "off" else None
+    if camera_params is not None:
+        mtx, dist = camera_params
+        if undistort_mode == "landmarks":
+            # 只修正評分用的五個關鍵點，畫面本身不 remap
+            landmark_undistort = LandmarkUndistorter(mtx, dist, (W, H))
+        else:
+            mapx, mapy = build_remap_maps(mtx, dist, (W, H))
+        print(f"已載入相機校正參數。(修正方式: {undistort_mode})")
+    startup.mark("camera_params")
+
+    if cap is None and capture_process:
+        # 擷取與 remap 在擷取行程完成，主迴圈拿到的已是修正後的畫面
+        cap = SharedMemoryCapture(camera_index, (W, H), mapx, mapy)
+        mapx, mapy = None, None
+    elif cap is None:
+        cap = cv2.VideoCapture(camera_index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, W)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, H)
+
+    if not cap.isOpened():
+        print("Error: Could not open webcam.")
+        pose_loader.discard()
+        return
+    startup.mark("camera_open")
 
     # --- 初始化模組 ---
     scorer = PostureScore()
     history = PostureHistory()
-    voice = VoiceAssistant()
-    
-    # 啟用 segmentation_mask 用於背景模糊
-    mp_pose = mp.solutions.pose
+    voice = voice or VoiceAssistant()
+    blur = BackgroundBlur()
+    roi = UpperBodyROI() if use_roi else None
+    predictor = LandmarkPredictor(infer_every, max_predict_error) if infer_every > 1 else None
+    session_log = SessionLogWriter(new_session_path(log_dir)) if log_dir else None
+    rollup = RollupAccumulator()
+
+    # 文字疊圖層：按鍵說明只光柵化一次，其他文字依內容快取
+    display_size = None
+    if display_scale != 1.0:
+        display_size = (int(W * display_scale), int(H * display_scale))
+    overlay = OverlayRenderer(design_size=(W, H), display_size=display_size) if draw_ui else NullOverlay()
+    tips_color = (0, 0, 0)
+    overlay.add_static("'b': Blur background", (10, H - 90), 0.8, tips_color, 2)
+    overlay.add_static("'r': Reset Timer", (10, H - 55), 0.8, tips_color, 2)
+    overlay.add_static("'q': Quit & Generate Report", (10, H - 20), 0.8, tips_color, 2)
     
     # --- 狀態變數 ---
     is_calibrated = False
-    calibration_data = []
+    calibration_sums = {}      # 校正期間各特徵的累加值 (基準取平均，不保留每一幀)
+    calibration_count = 0
     CALIBRATION_FRAMES = 90
     
     # 新功能變數
     enable_blur = False          # 背景模糊開關
-    start_time = time.time()     # 程式開始時間
-    pomodoro_start = time.time() # 番茄鐘開始時間
-    last_warning_time = 0        # 上次語音警告時間
-    last_pomodoro_warning_time = 0 # 上次番茄鐘語音警告時間
-    long_term_history = []       # 用於最後畫圖的數據 (時間, 分數)
-    
-    # 用戶離席相關變數
-    was_user_present = False     # 上一幀用戶是否在場
-    paused_duration = 0          # 累計暫停時間 (用於計算有效的久坐時間)
-    pause_start_time = None      # 開始暫停的時間點
-    away_periods = []            # 離席時段列表 [(start_elapsed, end_elapsed), ...]
-    
-    # 防抖動相關變數 (Debounce)
-    LOW_SCORE_DEBOUNCE = 1.5     # 低分警告延遲時間 (秒)
-    RETURN_DEBOUNCE = 3.0        # 用戶回來確認時間 (秒)
-    low_score_start_time = None  # 低分開始時間 (用於延遲警告)
-    user_return_start_time = None # 用戶回來開始時間 (用於確認真正坐下)
-    user_confirmed_back = True   # 用戶是否已確認回來
-    
+    long_term_history = ScoreTimeline()  # 用於最後畫圖的數據 (時間, 分數)，記憶體用量固定
+
+    # 在場偵測、回座確認 (防抖動)、番茄鐘與低分警告 (離席時段記錄在 session.away_periods)
+    session = SessionEngine(pomodoro_limit=POMODORO_LIMIT_SECONDS, low_score_threshold=LOW_SCORE_THRESHOLD,
+                            warning_cooldown=WARNING_COOLDOWN)
+    start_time = session.start_time  # 程式開始時間
+
     warning_text = ""
     warning_display_start = 0
     WARNING_DURATION = 1.0
+
+    # 效能除錯面板
+    show_perf = False
+    perf_stats = None
+    last_perf_update = 0
     
-    print("--- 操作說明 ---")
-    print("按 'b': 切換背景模糊 (隱私模式)")
-    print("按 'r': 重置久坐計時器")
-    print("按 'q': 結束程式並生成報告")
+    if daemon is not None:
+        print("--- 背景服務模式 ---")
+        print(f"GET  http://{daemon.host}:{daemon.port}/state  查詢狀態")
+        print("POST /blur、/reset、/quit  切換背景模糊、重置計時器、結束並生成報告")
+    else:
+        print("--- 操作說明 ---")
+        print("按 'b': 切換背景模糊 (隱私模式)")
+        print("按 'r': 重置久坐計時器")
+        print("按 'd': 顯示/隱藏效能除錯面板")
+        print("按 'q': 結束程式並生成報告")
+    startup.mark("modules")
 
-    with mp_pose.Pose(
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-        enable_segmentation=True  # 關鍵：開啟分割功能以支援模糊
-    ) as pose:
+    try:
+        pose = pose_loader.result()
+    except Exception as e:
+        # 模型檔不存在、mediapipe 無法載入或預熱失敗：釋放攝影機 (與擷取行程)、關閉記錄檔後結束
+        print(f"Error: 無法建立姿勢模型: {e}")
+        cap.release()
+        if session_log is not None:
+            session_log.close()
+        display.destroyAllWindows()
+        return
+    startup.mark("wait_pose")
+    startup.add("pose_build", pose_loader.build_seconds)
+    startup.add("pose_warmup", pose_loader.warmup_seconds)
+    first_frame = True
+
+    with pose:
+
+        # 管線模式：擷取、畸變修正、推論在背景執行緒進行，主執行緒只負責繪製與顯示
+        pipeline = None
+        last_pipeline_report = time.time()
+        if pipelined:
+            pipeline = FramePipeline(cap, pose, mapx, mapy, timer=timer, roi=roi, predictor=predictor)
+            pipeline.start()
+            print("管線模式已啟用")
 
         while cap.isOpened():
-            success, frame = cap.read()
-            if not success:
-                continue
+            if pipeline is not None:
+                packet = pipeline.read()
+                if packet is None:
+                    continue
+                frame, results = packet
+            else:
+                with timer.stage("capture"):
+                    success, frame = cap.read()
+                if not success:
+                    continue
 
-            # 1. 畸變修正
-            if mapx is not None and mapy is not None:
-                frame = cv2.remap(frame, mapx, mapy, cv2.INTER_LINEAR)
+                # 1. 畸變修正
+                if mapx is not None and mapy is not None:
+                    with timer.stage("remap"):
+                        frame = cv2.remap(frame, mapx, mapy, cv2.INTER_LINEAR)
+
+                # 2. MediaPipe 處理 (預測模式下不需要推論的幀直接使用預測的關鍵點)
+                frame_timestamp = time.time()
+                if predictor is not None and not predictor.should_infer(frame_timestamp):
+                    results = predictor.predict()
+                else:
+                    frame.flags.writeable = False
+                    with timer.stage("cvtColor"):
+                        if roi is not None:
+                            # ROI 模式：只轉換縮小後的上半身裁切
+                            frame_rgb, roi_rect = roi.prepare(frame)
+                        else:
+                            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    with timer.stage("pose.process"):
+                        results = pose.process(frame_rgb)
+                    if roi is not None:
+                        results = roi.restore(results, roi_rect, frame.shape)
+                    if predictor is not None:
+                        predictor.observe(frame_timestamp, results)
+                    frame.flags.writeable = True
 
             current_time = time.time()
             elapsed_time = current_time - start_time
-            
-            # 2. MediaPipe 處理
-            frame.flags.writeable = False
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(frame_rgb)
-            frame.flags.writeable = True
+
+            if pipeline is not None and current_time - last_pipeline_report >= PIPELINE_REPORT_INTERVAL:
+                print(f"[管線] {pipeline.format_stats()}")
+                last_pipeline_report = current_time
             
             # 3. 背景模糊處理 (如果開啟)
-            if enable_blur and results.segmentation_mask is not None:
-                # 建立遮罩: 1 是人, 0 是背景
-                condition = np.stack((results.segmentation_mask,) * 3, axis=-1) > 0.1
-                bg_image = cv2.GaussianBlur(frame, (55, 55), 0) # 對原圖做模糊
-                # 混合：如果是人就用原圖，不然用模糊圖
-                frame = np.where(condition, frame, bg_image)
+            # 骨架模型的結果沒有 segmentation_mask 欄位，切換完成前也可能拿不到遮罩
+            # (拿不到時合成器會沿用最近的遮罩)
+            if enable_blur:
+                segmentation_mask = getattr(results, "segmentation_mask", None)
+                with timer.stage("blur"):
+                    blur.apply(frame, segmentation_mask, anchor_points(results.pose_landmarks))
 
-            frame_bgr = frame # 此時已經可能是模糊過的背景
+            frame_bgr = overlay.prepare(frame) # 此時已經可能是模糊過的背景 (需要時縮小成顯示解析度)
 
             result_dict = None
-            is_user_present = False
+            is_user_present = bool(results.pose_landmarks)
+            scoring = session.needs_score(is_user_present)
 
             # 4. 姿勢判斷核心邏輯
-            if results.pose_landmarks:
-                is_user_present = True
-                h, w = frame_bgr.shape[:2]
-                
-                # 用戶回來時的處理 (加入防抖動)
-                # 條件: 用戶剛被偵測到 (之前不在場)，已校正，尚未確認回來，且尚未開始計時
-                if not was_user_present and is_calibrated and not user_confirmed_back and user_return_start_time is None:
-                    # 用戶剛被偵測到且之前已離開，開始計時確認
-                    user_return_start_time = current_time
-                    print("偵測到用戶，等待確認...")
-                
-                # 檢查是否處於確認回來的狀態
-                is_confirming_return = (user_return_start_time is not None and not user_confirmed_back and is_calibrated)
-                
-                if is_confirming_return:
-                    # --- 確認回來中 (3秒確認期) ---
-                    confirm_elapsed = current_time - user_return_start_time
-                    confirm_progress = min(confirm_elapsed / RETURN_DEBOUNCE, 1.0)
-                    
-                    if confirm_elapsed >= RETURN_DEBOUNCE:
-                        # 用戶已穩定坐下 3 秒，確認回來
-                        pomodoro_start = time.time()
-                        paused_duration = 0
-                        # 記錄離席時段結束
-                        if pause_start_time is not None:
-                            away_end = elapsed_time
-                            away_start = away_end - (current_time - pause_start_time)
-                            away_periods.append((away_start, away_end))
-                        pause_start_time = None
-                        user_confirmed_back = True
-                        user_return_start_time = None
-                        print("用戶回來 - 計時器重置")
-                        voice.say("歡迎回來，計時器已重置")
-                    else:
-                        # 顯示確認中的 UI (不進行姿勢評分)
-                        cv2.putText(frame_bgr, "Confirming return...", (50, 100), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 200, 255), 2)
-                        
-                        # 畫確認進度條
-                        bar_w, bar_h = 300, 20
-                        x_start, y_start = 50, 130
-                        cv2.rectangle(frame_bgr, (x_start, y_start), (x_start + bar_w, y_start + bar_h), (100, 100, 100), -1)
-                        cv2.rectangle(frame_bgr, (x_start, y_start), (x_start + int(bar_w * confirm_progress), y_start + bar_h), (0, 200, 255), -1)
-                        cv2.putText(frame_bgr, f"{confirm_elapsed:.1f}s / {RETURN_DEBOUNCE:.0f}s", 
-                                    (x_start + bar_w + 10, y_start + 15), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 200, 255), 2)
-                        
-                        # 畫骨架 (但不評分)
+            if is_user_present:
+                h, w = frame.shape[:2]  # 特徵以擷取解析度計算，不受顯示縮放影響
+
+                if scoring:
+                    # --- 正常監控階段 ---
+                    # 畫骨架
+                    if draw_ui:
                         draw_pose_landmarks(frame_bgr, results.pose_landmarks)
-                
+                    
+                    features = extract_face_shoulder_features(results.pose_landmarks.landmark, w, h,
+                                                              undistort=landmark_undistort)
+                    result_dict = scorer.compute(features)
+                    history.update(current_time, result_dict)
+                    
+                    score = result_dict.get("score", 100)
+                    
+                    # 記錄數據給最後的圖表
+                    long_term_history.add(elapsed_time, score)
+                    rollup.add_sample(current_time, score, history.current_state)
+
                 elif not is_calibrated:
                     # --- 校正階段 ---
                     # 畫骨架
-                    draw_pose_landmarks(frame_bgr, results.pose_landmarks)
+                    if draw_ui:
+                        draw_pose_landmarks(frame_bgr, results.pose_landmarks)
                     
-                    features = extract_face_shoulder_features(results.pose_landmarks.landmark, w, h)
-                    calibration_data.append(features)
-                    progress = len(calibration_data) / CALIBRATION_FRAMES
+                    features = extract_face_shoulder_features(results.pose_landmarks.landmark, w, h,
+                                                              undistort=landmark_undistort)
+                    for name, value in features.items():
+                        calibration_sums[name] = calibration_sums.get(name, 0.0) + value
+                    calibration_count += 1
+                    progress = calibration_count / CALIBRATION_FRAMES
                     
                     # 畫進度條
                     bar_w, bar_h = 400, 30
                     x_start, y_start = (w - bar_w) // 2, h - 100
-                    cv2.rectangle(frame_bgr, (x_start, y_start), (x_start + bar_w, y_start + bar_h), (100, 100, 100), -1)
-                    cv2.rectangle(frame_bgr, (x_start, y_start), (x_start + int(bar_w * progress), y_start + bar_h), (0, 255, 0), -1)
-                    cv2.putText(frame_bgr, "Calibrating... Sit Upright", (x_start, y_start - 10), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-
-                    if len(calibration_data) >= CALIBRATION_FRAMES:
-                        avg_features = {k: sum(d[k] for d in calibration_data) / len(calibration_data) for k in features}
-                        scorer.set_baseline(avg_features)
+                    overlay.rectangle(frame_bgr, (x_start, y_start), (x_start + bar_w, y_start + bar_h), (100, 100, 100), -1)
+                    overlay.rectangle(frame_bgr, (x_start, y_start), (x_start + int(bar_w * progress), y_start + bar_h), (0, 255, 0), -1)
+                    overlay.text(frame_bgr, "Calibrating... Sit Upright", (x_start, y_start - 10), 
+                                0.8, (0, 255, 255), 2)
+
+                    if calibration_count >= CALIBRATION_FRAMES:
+                        scorer.set_baseline({name: total / calibration_count
+                                             for name, total in calibration_sums.items()})
                         is_calibrated = True
+                        session.calibrated = True
                         voice.say("校正完成，開始監控")
                         voice.say("")
                         print("Calibration complete.")
-                
-                else:
-                    # --- 正常監控階段 ---
-                    # 畫骨架
-                    draw_pose_landmarks(frame_bgr, results.pose_landmarks)
-                    
-                    features = extract_face_shoulder_features(results.pose_landmarks.landmark, w, h)
-                    result_dict = scorer.compute(features)
-                    history.update(current_time, result_dict)
-                    
-                    score = result_dict.get("score", 100)
-                    
-                    # 記錄數據給最後的圖表
-                    long_term_history.append((elapsed_time, score))
-
-                    # [功能] 語音警告 (低分且持續 1.5 秒)
-                    if score < LOW_SCORE_THRESHOLD:
-                        # 開始計時低分持續時間
-                        if low_score_start_time is None:
-                            low_score_start_time = current_time
-                        elif (current_time - low_score_start_time) >= LOW_SCORE_DEBOUNCE:
-                            # 低分已持續足夠時間，且冷却時間已過
-                            if (current_time - last_warning_time) > WARNING_COOLDOWN:
-                                print("低分持續，發出警告")
-                                voice.say("請坐好，注意姿勢")
-                                last_warning_time = current_time
-                    else:
-                        # 分數恢復，重置低分計時器
-                        low_score_start_time = None
 
-            else:
+            # 在場 / 回座確認 / 番茄鐘 / 低分警告的狀態更新
+            events = session.tick(current_time, is_user_present,
+                                  result_dict["score"] if result_dict is not None else None)
+            for event in events:
+                if event.kind == WARN:
+                    print("低分持續，發出警告")
+                    # 過了冷卻時間還沒播出的警告已經沒有意義
+                    voice.say("請坐好，注意姿勢", priority=PRIORITY_HIGH, ttl=WARNING_COOLDOWN)
+                elif event.kind == USER_AWAY:
+                    print("用戶離席 - 計時器暫停")
+                elif event.kind == USER_RETURNING:
+                    print("偵測到用戶，等待確認...")
+                elif event.kind == USER_BACK:
+                    print("用戶回來 - 計時器重置")
+                    voice.say("歡迎回來，計時器已重置")
+                elif event.kind == BREAK_DUE:
+                    voice.say("時間到了，請起來活動一下", priority=PRIORITY_LOW)
+
+            if not is_user_present:
                 # --- [功能] 離席偵測 ---
                 # 如果沒抓到人，就不扣分，顯示 "User Away"
-                cv2.putText(frame_bgr, "User Away - Paused", (50, 100), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 165, 255), 2)
-                
-                # 用戶離開時開始計算暫停時間
-                if was_user_present:
-                    # 用戶剛剛離開，開始暫停計時
-                    pause_start_time = current_time
-                    user_confirmed_back = False  # 重置確認狀態
-                    print("用戶離席 - 計時器暫停")
+                overlay.text(frame_bgr, "User Away - Paused", (50, 100), 
+                            1.2, (0, 165, 255), 2)
+            elif session.confirming:
+                # --- 確認回來中 (不進行姿勢評分) ---
+                confirm_elapsed, confirm_progress = session.confirm_elapsed()
+                overlay.text(frame_bgr, "Confirming return...", (50, 100), 
+                            1.2, (0, 200, 255), 2)
                 
-                # 用戶離開時重置回來計時器
-                user_return_start_time = None
+                # 畫確認進度條
+                bar_w, bar_h = 300, 20
+                x_start, y_start = 50, 130
+                overlay.rectangle(frame_bgr, (x_start, y_start), (x_start + bar_w, y_start + bar_h), (100, 100, 100), -1)
+                overlay.rectangle(frame_bgr, (x_start, y_start), (x_start + int(bar_w * confirm_progress), y_start + bar_h), (0, 200, 255), -1)
+                overlay.text(frame_bgr, f"{confirm_elapsed:.1f}s / {session.return_debounce:.0f}s", 
+                            (x_start + bar_w + 10, y_start + 15), 
+                            0.6, (0, 200, 255), 2)
                 
-                # 用戶離開時重置低分計時器 (防止誤報)
-                low_score_start_time = None
+                # 畫骨架 (但不評分)
+                if draw_ui:
+                    draw_pose_landmarks(frame_bgr, results.pose_landmarks)
 
             # 5. [功能] 久坐提醒 (番茄鐘) - 只在用戶確認在場時運行
-            if is_user_present and user_confirmed_back:
-                pomodoro_elapsed = current_time - pomodoro_start - paused_duration
-                time_left = POMODORO_LIMIT_SECONDS - pomodoro_elapsed
-                
+            time_left = session.time_left
+            if time_left is not None:
                 # 顯示倒數計時
                 timer_color = (0, 255, 0)
                 if time_left < 60: timer_color = (0, 0, 255) # 最後一分鐘變紅
@@ -258,63 +369,98 @@ def main():
                 timer_text = f"Break in: {minutes:02d}:{seconds:02d}"
                 
                 if time_left <= 0:
-                    cv2.putText(frame_bgr, "TIME TO STAND UP!", (W//2 - 200, H//2), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 3)
-                    if (current_time - last_pomodoro_warning_time) > 5.0: # 每5秒叫一次
-                        voice.say("時間到了，請起來活動一下")
-                        last_pomodoro_warning_time = current_time
+                    overlay.text(frame_bgr, "TIME TO STAND UP!", (W//2 - 200, H//2), 
+                                1.5, (0, 0, 255), 3)
                 else:
-                    cv2.putText(frame_bgr, timer_text, (W - 350, 32), 
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, timer_color, 2)
+                    overlay.text(frame_bgr, timer_text, (W - 350, 32), 
+                                0.8, timer_color, 2)
             else:
                 # 用戶不在場或確認中，顯示暫停狀態
-                cv2.putText(frame_bgr, "Timer: PAUSED", (W - 350, 32), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+                overlay.text(frame_bgr, "Timer: PAUSED", (W - 350, 32), 
+                            0.8, (0, 165, 255), 2)
             
-            tips_color = (0, 0, 0) 
-            cv2.putText(frame_bgr, "'b': Blur background", (10, H - 90), cv2.FONT_HERSHEY_SIMPLEX, 0.8, tips_color, 2)
-            cv2.putText(frame_bgr, "'r': Reset Timer", (10, H - 55), cv2.FONT_HERSHEY_SIMPLEX, 0.8, tips_color, 2)
-            cv2.putText(frame_bgr, "'q': Quit & Generate Report", (10, H - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.8, tips_color, 2)
+            overlay.draw_static(frame_bgr)
 
             if warning_text and (current_time - warning_display_start) < WARNING_DURATION:
-                cv2.putText(frame_bgr, warning_text, (W//2 - 250, H - 100), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+                overlay.text(frame_bgr, warning_text, (W//2 - 250, H - 100), 
+                            1.0, (0, 0, 255), 2)
             elif (current_time - warning_display_start) >= WARNING_DURATION:
                 warning_text = "" 
 
             # 6. 繪製標準 UI (只在用戶確認在場時顯示姿勢評分)
-            # 傳遞 fps 資訊
-            fps = 1.0 / (time.time() - (current_time - 0.01)) # 簡單估算
-            if is_user_present and user_confirmed_back:
-                draw_posture_ui(frame_bgr, result_dict, fps=fps, history_summary=history.snapshot())
-            else:
-                # 用戶不在場或確認中只顯示 FPS
-                draw_posture_ui(frame_bgr, None, fps=fps, history_summary=None)
+            # 傳遞 fps 資訊 (實際的幀間隔，包含擷取與顯示時間)
+            fps_meter.tick()
+            fps = fps_meter.fps
+            if show_perf and current_time - last_perf_update >= PERF_REFRESH_INTERVAL:
+                perf_stats = timer.percentiles()
+                last_perf_update = current_time
+            debug_stats = perf_stats if show_perf else None
+            with timer.stage("draw_posture_ui"):
+                if not draw_ui:
+                    pass
+                elif session.timer_running:
+                    draw_posture_ui(frame_bgr, result_dict, fps=fps, history_summary=history.snapshot(),
+                                    perf_stats=debug_stats, overlay=overlay)
+                else:
+                    # 用戶不在場或確認中只顯示 FPS
+                    draw_posture_ui(frame_bgr, None, fps=fps, history_summary=None, perf_stats=debug_stats,
+                                    overlay=overlay)
             
-            # 更新用戶在場狀態
-            was_user_present = is_user_present
+            # 記錄這一幀 (背景批次寫入)
+            if session_log is not None:
+                state = history.current_state if result_dict is not None else None
+                session_log.append(current_time, result_dict, is_user_present, state)
 
-            cv2.imshow("Smart Posture Assistant", frame_bgr)
-            
-            # 7. 鍵盤控制
-            key = cv2.waitKey(5) & 0xFF
-            if key == ord("q"):
+            timer_running = session.timer_running
+            if on_result is not None:
+                on_result(current_time, is_user_present,
+                          result_dict["score"] if result_dict is not None else None,
+                          history.current_state if result_dict is not None else None,
+                          time_left, not session.confirmed_back)
+
+            # 背景服務模式：更新 API 提供的狀態
+            if daemon is not None:
+                daemon.publish({
+                    "timestamp": current_time,
+                    "present": is_user_present,
+                    "calibrated": is_calibrated,
+                    "confirmed_back": session.confirmed_back,
+                    "score": result_dict["score"] if result_dict is not None else None,
+                    "status": result_dict["status"] if result_dict is not None else None,
+                    "blur": enable_blur,
+                    "timer": {
+                        "state": "running" if timer_running else "paused",
+                        "time_left": time_left,
+                    },
+                    "message": warning_text or None,
+                    "history": history.snapshot(),
+                })
+
+            with timer.stage("display"):
+                display.imshow("Smart Posture Assistant", frame_bgr)
+
+                # 7. 鍵盤控制
+                key = display.waitKey(5) & 0xFF
+            if first_frame:
+                first_frame = False
+                startup.mark("first_frame")
+                if startup_timing:
+                    print("[啟動] 各步驟耗時:")
+                    print(startup.format_report())
+            if key == ord("q") or (stop_event is not None and stop_event.is_set()):
                 break
             elif key == ord("b"):
                 enable_blur = not enable_blur
+                pose.set_segmentation(enable_blur)
+                blur.reset()
                 status = "ON" if enable_blur else "OFF"
                 print(f"背景模糊: {status}")
+            elif key == ord("d"):
+                show_perf = not show_perf
+                last_perf_update = 0  # 立即更新一次
             elif key == ord("r"):
-                # 計算當前的剩餘時間 (如果用戶在場)
-                if is_user_present:
-                    current_elapsed = current_time - pomodoro_start - paused_duration
-                    current_time_left = POMODORO_LIMIT_SECONDS - current_elapsed
-                else:
-                    current_time_left = 1  # 用戶不在場時不允許重置
-                
-                if current_time_left <= 0:
-                    pomodoro_start = time.time()
-                    paused_duration = 0  # 重置暫停時間
+                # 只有用戶在場且時間已到時允許重置
+                if session.reset_timer(time.time()):
                     voice.stop() # 清除之前的語音排程
                     voice.say("計時器已重置")
                     print("Timer Reset")
@@ -323,18 +469,103 @@ def main():
                     warning_display_start = time.time()
                     print("Cannot reset: Timer is still running.")
 
+        if pipeline is not None:
+            pipeline.stop()
+            print(f"[管線] {pipeline.format_stats()}")
+
+    if predictor is not None:
+        print(f"[預測] 推論 {predictor.inferred} 幀、預測 {predictor.predicted} 幀 "
+              f"(推論比例 {predictor.inference_ratio:.0%})")
+
     cap.release()
-    cv2.destroyAllWindows()
+    if session_log is not None:
+        session_log.close()
+        print(f"Session 記錄已儲存為: {session_log.path}")
+    display.destroyAllWindows()
     
     # 8. [功能] 程式結束，生成報告
     # 如果用戶在離席狀態下結束程式，記錄最後一個離席時段
-    if pause_start_time is not None:
-        final_elapsed = time.time() - start_time
-        away_start = final_elapsed - (time.time() - pause_start_time)
-        away_periods.append((away_start, final_elapsed))
+    away_periods = session.finish(time.time())
+    if on_finish is not None:
+        on_finish([(start_time + away_start, start_time + away_end) for away_start, away_end in away_periods])
+
+    # 把這次 session 的每分鐘統計累加進彙總資料庫 (多日報告用)
+    if rollup_db:
+        for away_start, away_end in away_periods:
+            rollup.add_away(start_time + away_start, start_time + away_end)
+        store = RollupStore(rollup_db)
+        store.merge(rollup.rows())
+        store.close()
     
+    if not report:
+        return
+
     print("正在生成健康報告...")
-    generate_report(long_term_history, (time.time() - start_time)/60, away_periods)
+    generate_report(long_term_history, (time.time() - start_time)/60, away_periods,
+                    formats=report_formats, show=show_report, distributions=history.distributions())
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Smart Posture Assistant")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="多執行緒管線模式 (擷取 / 畸變修正 / 推論 / 顯示 分開執行)")
+    parser.add_argument("--roi", action="store_true",
+                        help="只把上半身附近的縮小裁切送進姿勢模型，追蹤失敗時退回全畫面")
+    parser.add_argument("--undistort", choices=("image", "landmarks", "off"), default="image",
+                        help="畸變修正方式：image 修正整張畫面、landmarks 只修正評分用的關鍵點、off 不修正")
+    parser.add_argument("--log-dir", default="sessions",
+                        help="每幀特徵與分數的 session 記錄檔目錄 (預設 sessions/)")
+    parser.add_argument("--no-log", action="store_true", help="不寫入 session 記錄檔")
+    parser.add_argument("--report-format", default="png",
+                        help="報告輸出格式，以逗號分隔 (png / svg / html)，例如 png,html")
+    parser.add_argument("--show-report", action="store_true", help="報告產生後自動開啟")
+    parser.add_argument("--rollup-db", default="rollups.sqlite3",
+                        help="每分鐘彙總資料庫，供 rollups.py 產生多日報告 (預設 rollups.sqlite3)")
+    parser.add_argument("--no-rollup", action="store_true", help="不更新每分鐘彙總資料庫")
+    parser.add_argument("--daemon", action="store_true",
+                        help="背景服務模式：不開視窗、不繪製 UI，狀態與 b / r / q 指令改由本機 HTTP API 提供")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT, help=f"背景服務 API 的連接埠 (預設 {DAEMON_PORT})")
+    parser.add_argument("--display-scale", type=float, default=1.0,
+                        help="顯示解析度比例 (例如 0.5 以 640x360 顯示)，姿勢偵測仍使用完整解析度")
+    parser.add_argument("--capture-process", action="store_true",
+                        help="在獨立行程擷取與畸變修正，畫面經共享記憶體傳給推論 (不可與 --pipeline 同時使用)")
+    parser.add_argument("--pose-backend", choices=POSE_BACKENDS, default="solution",
+                        help="姿勢推論後端：solution 同步推論、live_stream 以 PoseLandmarker 非同步推論 (與擷取、顯示重疊)")
+    parser.add_argument("--pose-model", default=POSE_LANDMARKER_MODEL,
+                        help=f"live_stream 後端的 PoseLandmarker 模型檔 (預設 {POSE_LANDMARKER_MODEL})")
+    parser.add_argument("--infer-every", type=int, default=1,
+                        help="每 N 幀才跑一次姿勢模型，其他幀使用卡爾曼濾波預測的關鍵點 (預設 1：每幀推論)")
+    parser.add_argument("--max-predict-error", type=float, default=MAX_PREDICT_ERROR,
+                        help=f"預測誤差 (正規化座標) 超過此值時提早推論 (預設 {MAX_PREDICT_ERROR})")
+    parser.add_argument("--startup-timing", action="store_true",
+                        help="顯示第一幀後輸出啟動各步驟的耗時 (模組載入、攝影機、校正參數、模型建立與預熱)")
+    args = parser.parse_args()
+    if args.capture_process and args.pipeline:
+        parser.error("--capture-process 不可與 --pipeline 同時使用")
+    if args.pose_backend == "live_stream" and args.roi:
+        parser.error("--pose-backend live_stream 不可與 --roi 同時使用")
+    try:
+        args.report_formats = parse_report_formats(args.report_format)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    daemon = None
+    if args.daemon:
+        daemon = DaemonServer(port=args.port).start()
+        # 系統要求結束服務時，照常結束並生成報告
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.command("q"))
+    try:
+        main(pipelined=args.pipeline, use_roi=args.roi, undistort_mode=args.undistort,
+             log_dir=None if args.no_log else args.log_dir,
+             report_formats=args.report_formats,
+             show_report=args.show_report and not args.daemon,
+             rollup_db=None if args.no_rollup else args.rollup_db,
+             display_scale=args.display_scale, daemon=daemon, capture_process=args.capture_process,
+             pose_backend=args.pose_backend, pose_model=args.pose_model,
+             infer_every=args.infer_every, max_predict_error=args.max_predict_error,
+             startup_timing=args.startup_timing)
+    finally:
+        if daemon is not None:
+            daemon.stop()
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+多攝影機監測：每支攝影機一個 worker 行程。
+
+每個 worker 各自執行完整的 main() 主迴圈 (自己的 Pose、PostureScore、PostureHistory 與番茄鐘)，
+不繪製 UI，只把每幀精簡的結果 (在場、分數、狀態、剩餘時間、離席) 送回父行程；
+結束時再送回 SessionEngine 記錄的離席時段 (經過防抖動與回座確認，不受丟棄的結果影響)。
+父行程負責合併的狀態畫面與每支攝影機的報告。
+MediaPipe 與 OpenCV 在同一個 Python 行程內很難用滿多核心，分成多個行程後每支攝影機各用一顆核心。
+
+    python Codes/multi_camera.py --cameras 0 1 2
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from report_generator import parse_report_formats
+from score_timeline import ScoreTimeline
+from voice_assistant import SilentVoice
+
+RESULT_QUEUE_SIZE = 4096     # 父行程來不及處理時，worker 直接丟棄結果而不是阻塞
+DASHBOARD_REFRESH = 0.1      # 合併狀態畫面的更新間隔 (秒)
+STALE_AFTER = 2.0            # 超過此秒數沒有收到結果就標示為無訊號
+
+CameraResult = namedtuple("CameraResult", "camera timestamp present score state time_left away")
+
+_STATE_COLORS = {"good": (0, 180, 0), "warning": (0, 200, 255), "bad": (0, 0, 255)}
+
+
+class _WorkerDisplay:
+    """worker 不開視窗，也沒有鍵盤輸入 (由 stop_event 結束)"""
+    def imshow(self, name, frame):
+        pass
+
+    def waitKey(self, delay=0):
+        return -1
+
+    def destroyAllWindows(self):
+        pass
+
+
+def _worker(camera, results, stop_event, options):
+    # Ctrl+C 由父行程處理，worker 透過 stop_event 正常結束 (寫完 session 記錄)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import main as app
+
+    def on_result(timestamp, present, score, state, time_left, away):
+        try:
+            results.put_nowait((camera, timestamp, present, score, state, time_left, away))
+        except queue.Full:
+            pass
+
+    away_periods = []
+
+    voice = None
+    if not options["voice"]:
+        voice = SilentVoice()
+    log_dir = os.path.join(options["log_dir"], f"cam{camera}") if options["log_dir"] else None
+    try:
+        app.main(camera_index=camera, display=_WorkerDisplay(), voice=voice, headless=True,
+                 stop_event=stop_event, on_result=on_result, on_finish=away_periods.extend,
+                 report=False, log_dir=log_dir,
+                 rollup_db=None, use_roi=options["use_roi"], undistort_mode=options["undistort_mode"])
+    finally:
+        results.put((camera, None, away_periods))  # 結束通知 (阻塞送出，不會被丟棄)
+
+
+class CameraMonitor:
+    """
+    父行程端：一支攝影機的最新結果、分數記錄與離席時段。
+    執行中的離席時段依 worker 送來的 away 狀態追蹤 (結果可能被丟棄，只是近似)；
+    worker 結束時以 SessionEngine 的 away_periods 取代。
+    """
+    def __init__(self, camera, start_time):
+        self.camera = camera
+        self.start_time = start_time
+        self.latest = None
+        self.frames = 0
+        self.finished = False
+        self.timeline = ScoreTimeline()
+        self.away_periods = []
+        self._away_start = None
+
+    def add(self, result):
+        self.latest = result
+        self.frames += 1
+        elapsed = result.timestamp - self.start_time
+        if result.score is not None:
+            self.timeline.add(elapsed, result.score)
+        if result.away and self._away_start is None:
+            self._away_start = elapsed
+        elif not result.away and self._away_start is not None:
+            self.away_periods.append((self._away_start, elapsed))
+            self._away_start = None
+
+    def close(self, end_time, away_periods=None):
+        """worker 結束；away_periods 為 worker 送回的離席時段 (絕對時間)，沒有時保留追蹤到的結果"""
+        self.finished = True
+        if away_periods is not None:
+            self.away_periods = [(start - self.start_time, end - self.start_time) for start, end in away_periods]
+            self._away_start = None
+        elif self._away_start is not None:
+            self.away_periods.append((self._away_start, end_time - self.start_time))
+            self._away_start = None
+
+
+class Supervisor:
+    """啟動並管理每支攝影機的 worker 行程"""
+    def __init__(self, cameras, voice=True, log_dir="sessions", use_roi=False, undistort_mode="image"):
+        self.cameras = list(cameras)
+        self.options = {
+            "voice": voice,
+            "log_dir": log_dir,
+            "use_roi": use_roi,
+            "undistort_mode": undistort_mode,
+        }
+        # spawn：各平台行為一致，worker 不會繼承父行程的執行緒與 OpenCV / MediaPipe 狀態
+        self._ctx = multiprocessing.get_context("spawn")
+        self.results = self._ctx.Queue(RESULT_QUEUE_SIZE)
+        self.stop_event = self._ctx.Event()
+        self.processes = []
+        self.start_time = time.time()
+        self.monitors = {camera: CameraMonitor(camera, self.start_time) for camera in self.cameras}
+
+    def start(self):
+        for camera in self.cameras:
+            process = self._ctx.Process(target=_worker, name=f"camera-{camera}",
+                                        args=(camera, self.results, self.stop_event, self.options))
+            process.start()
+            self.processes.append(process)
+        print(f"已啟動 {len(self.processes)} 個攝影機 worker: {self.cameras}")
+        return self
+
+    def poll(self, timeout=0.05):
+        """取出目前所有的結果，回傳處理的筆數"""
+        count = 0
+        try:
+            item = self.results.get(timeout=timeout)
+            while True:
+                monitor = self.monitors[item[0]]
+                if item[1] is None:
+                    monitor.close(time.time(), item[2])
+                else:
+                    monitor.add(CameraResult(*item))
+                count += 1
+                item = self.results.get_nowait()
+        except queue.Empty:
+            pass
+        return count
+
+    def running(self):
+        return not all(m.finished for m in self.monitors.values()) and \
+            any(p.is_alive() for p in self.processes)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=10.0):
+        deadline = time.time() + timeout
+        while self.running() and time.time() < deadline:
+            self.poll()
+        self.poll(timeout=0)
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+        now = time.time()
+        for monitor in self.monitors.values():
+            if not monitor.finished:
+                monitor.close(now)
+
+    def render_dashboard(self, width=640, row_height=60):
+        """合併的狀態畫面：每支攝影機一列"""
+        image = np.full((row_height * len(self.cameras) + 20, width, 3), 235, dtype=np.uint8)
+        now = time.time()
+        for i, camera in enumerate(self.cameras):
+            monitor = self.monitors[camera]
+            y = 20 + row_height * i + 25
+            result = monitor.latest
+            if monitor.finished:
+                text, color = "stopped", (120, 120, 120)
+            elif result is None or now - result.timestamp > STALE_AFTER:
+                text, color = "no signal", (120, 120, 120)
+            elif not result.present:
+                text, color = "away", (0, 165, 255)
+            elif result.score is None:
+                text, color = "present", (80, 80, 80)
+            else:
+                text = f"score {result.score}  {result.state}"
+                color = _STATE_COLORS.get(result.state, (80, 80, 80))
+            cv2.putText(image, f"Camera {camera}: {text}", (15, y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA)
+            if not monitor.finished and result is not None and result.time_left is not None:
+                minutes, seconds = divmod(max(0, int(result.time_left)), 60)
+                cv2.putText(image, f"Break in {minutes:02d}:{seconds:02d}", (width - 190, y),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (60, 60, 60), 1, cv2.LINE_AA)
+            stats = monitor.timeline.stats()
+            if stats["count"]:
+                cv2.putText(image, f"avg {stats['avg_score']:.0f}  good {stats['good_ratio']:.0f}%",
+                            (15, y + 22), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (90, 90, 90), 1, cv2.LINE_AA)
+        return image
+
+    def generate_reports(self, formats=("png",)):
+        from report_generator import generate_report
+
+        duration_minutes = (time.time() - self.start_time) / 60
+        paths = []
+        for camera, monitor in self.monitors.items():
+            paths += generate_report(monitor.timeline, duration_minutes, monitor.away_periods,
+                                     formats=formats, name=f"posture_report_cam{camera}",
+                                     title=f"Posture Report - Camera {camera}")
+        return paths
+
+
+def run(cameras, headless=False, report=True, report_formats=("png",), **options):
+    supervisor = Supervisor(cameras, **options).start()
+    last_draw = 0.0
+    try:
+        while supervisor.running():
+            supervisor.poll()
+            if headless:
+                continue
+            now = time.time()
+            if now - last_draw >= DASHBOARD_REFRESH:
+                cv2.imshow("Smart Posture Assistant - Cameras", supervisor.render_dashboard())
+                last_draw = now
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                break
+    except KeyboardInterrupt:
+        pass
+    print("正在結束所有攝影機...")
+    supervisor.stop()
+    supervisor.join()
+    if not headless:
+        cv2.destroyAllWindows()
+    if report:
+        print("正在生成健康報告...")
+        supervisor.generate_reports(report_formats)
+    return supervisor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="多攝影機姿勢監測 (每支攝影機一個行程)")
+    parser.add_argument("--cameras", type=int, nargs="+", default=[0], help="攝影機編號，例如 0 1 2")
+    parser.add_argument("--headless", action="store_true", help="不顯示合併的狀態畫面 (Ctrl+C 結束)")
+    parser.add_argument("--no-voice", action="store_true", help="worker 不播放語音")
+    parser.add_argument("--no-report", action="store_true", help="結束時不生成報告")
+    parser.add_argument("--report-format", default="png", help="報告輸出格式，以逗號分隔 (png / svg / html)")
+    parser.add_argument("--log-dir", default="sessions", help="session 記錄檔目錄 (每支攝影機一個子目錄)")
+    parser.add_argument("--roi", action="store_true", help="上半身 ROI 推論")
+    parser.add_argument("--undistort", choices=("image", "landmarks", "off"), default="image")
+    args = parser.parse_args()
+    try:
+        args.report_formats = parse_report_formats(args.report_format)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run(args.cameras, headless=args.headless, report=not args.no_report,
+        report_formats=args.report_formats,
+        voice=not args.no_voice, log_dir=args.log_dir, use_roi=args.roi, undistort_mode=args.undistort)
@@ -0,0 +1,212 @@
+"""
+可替換的姿勢推論後端。
+
+所有後端的介面都與 PoseRuntime 相同：
+    process(frame_rgb) -> results   results.pose_landmarks.landmark[i].x / .y / .z / .visibility，
+                                    沒偵測到人時 pose_landmarks 為 None；開啟分割時另有 segmentation_mask
+    set_segmentation(enabled)       切換是否輸出人像分割遮罩
+    segmentation_enabled            目前的結果是否包含 segmentation_mask
+    close() / with 敘述
+
+後端：
+    "solution"     mp.solutions.pose.Pose (PoseRuntime)，process() 同步等待推論完成
+    "live_stream"  MediaPipe Tasks PoseLandmarker 的 LIVE_STREAM 模式：process() 只送出這一幀，
+                   立即回傳最近一次 callback 收到的結果，推論與下一幀的擷取、繪製同時進行
+                   (結果會比畫面晚約一幀)
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from pose_runtime import PoseRuntime
+
+POSE_BACKENDS = ("solution", "live_stream")
+POSE_LANDMARKER_MODEL = "pose_landmarker_lite.task"  # PoseLandmarker 模型檔 (live_stream 後端)
+
+PoseResult = namedtuple("PoseResult", "pose_landmarks segmentation_mask")
+
+
+class LandmarkList:
+    """讓 Tasks 的 NormalizedLandmark 列表與 solution 的 NormalizedLandmarkList 一樣以 .landmark 存取"""
+    __slots__ = ("landmark",)
+
+    def __init__(self, landmark):
+        self.landmark = landmark
+
+
+_EMPTY_RESULT = PoseResult(None, None)
+
+
+class LiveStreamPoseBackend:
+    """
+    PoseLandmarker (LIVE_STREAM) 後端。
+    PoseLandmarker 在自己的執行緒推論，忙碌時會自行丟棄送進來的幀；
+    結果在 callback 中轉成與 solution 相同的形式，process() 回傳最新的一份。
+    分割遮罩的輸出在建立 PoseLandmarker 時決定，切換時在背景建立新的 landmarker 再換手；
+    舊的 landmarker 可能正被 process() 使用 (detect_async)，因此由 process() 下一次呼叫時才關閉。
+    """
+    def __init__(self, model_path=POSE_LANDMARKER_MODEL, segmentation=False,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"找不到 PoseLandmarker 模型檔: {model_path}")
+        import mediapipe as mp
+        from mediapipe.tasks.python import BaseOptions, vision
+
+        self._mp = mp
+        self._vision = vision
+        self._base_options = BaseOptions(model_asset_path=model_path)
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self._lock = threading.Lock()
+        self._latest = _EMPTY_RESULT
+        self._last_timestamp_ms = -1
+        self._switch_thread = None
+        self._retired = []        # 換手後的舊 landmarker，由 process() 在下一次呼叫時關閉
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.active = segmentation
+        self.wanted = segmentation
+        self._landmarker = self._build(segmentation)
+
+    def _build(self, segmentation):
+        options = self._vision.PoseLandmarkerOptions(
+            base_options=self._base_options,
+            running_mode=self._vision.RunningMode.LIVE_STREAM,
+            num_poses=1,
+            min_pose_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence,
+            output_segmentation_masks=segmentation,
+            result_callback=self._on_result,
+        )
+        return self._vision.PoseLandmarker.create_from_options(options)
+
+    def _on_result(self, result, image, timestamp_ms):
+        # 在 MediaPipe 的執行緒上呼叫
+        pose_landmarks = LandmarkList(result.pose_landmarks[0]) if result.pose_landmarks else None
+        mask = None
+        if result.segmentation_masks:
+            view = result.segmentation_masks[0].numpy_view()
+            # 遮罩的記憶體屬於 MediaPipe，callback 結束後可能被重複使用，需要複製
+            mask = np.array(view[..., 0] if view.ndim == 3 else view, dtype=np.float32)
+        with self._lock:
+            self._latest = PoseResult(pose_landmarks, mask)
+            self.completed += 1
+
+    @property
+    def segmentation_enabled(self):
+        return self.active
+
+    def set_segmentation(self, enabled):
+        with self._lock:
+            self.wanted = enabled
+            if enabled == self.active or self._switch_thread is not None:
+                return
+            self._switch_thread = threading.Thread(target=self._switch, daemon=True)
+            self._switch_thread.start()
+
+    def _switch(self):
+        try:
+            while True:
+                with self._lock:
+                    target = self.wanted
+                    if target == self.active or self._closed:
+                        self._switch_thread = None
+                        return
+                landmarker = self._build(target)
+                with self._lock:
+                    self._retired.append(self._landmarker)
+                    self._landmarker = landmarker
+                    self.active = target
+        except Exception as e:
+            print(f"PoseLandmarker 建立失敗，維持原本的 landmarker: {e}")
+        finally:
+            # 建立失敗時也要清掉，否則之後的 set_segmentation 都會直接返回
+            with self._lock:
+                if self._switch_thread is threading.current_thread():
+                    self._switch_thread = None
+
+    def process(self, frame_rgb):
+        # LIVE_STREAM 要求時間戳記嚴格遞增 (毫秒)
+        timestamp_ms = max(int(time.monotonic() * 1000), self._last_timestamp_ms + 1)
+        self._last_timestamp_ms = timestamp_ms
+        image = self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=np.ascontiguousarray(frame_rgb))
+        with self._lock:
+            landmarker = self._landmarker
+            latest = self._latest
+            retired, self._retired = self._retired, []
+        # process() 只在一個執行緒上呼叫，這時不會有其他 detect_async 還在使用舊的 landmarker
+        for old in retired:
+            old.close()
+        landmarker.detect_async(image, timestamp_ms)
+        self.submitted += 1
+        return latest
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        thread = self._switch_thread
+        if thread is not None:
+            thread.join()
+        for old in self._retired:
+            old.close()
+        self._retired = []
+        self._landmarker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def create_pose_backend(name="solution", segmentation=False, model_path=POSE_LANDMARKER_MODEL, **pose_kwargs):
+    """依名稱建立後端；pose_kwargs 為 min_detection_confidence / min_tracking_confidence"""
+    if name == "solution":
+        return PoseRuntime(segmentation=segmentation, **pose_kwargs)
+    if name == "live_stream":
+        return LiveStreamPoseBackend(model_path, segmentation=segmentation, **pose_kwargs)
+    raise ValueError(f"未知的姿勢推論後端: {name} (可用: {', '.join(POSE_BACKENDS)})")
+
+
+class BackgroundPoseLoader:
+    """
+    在背景執行緒建立並預熱姿勢後端 (載入 mediapipe、建立模型、以一張空白畫面推論一次)，
+    主執行緒同時開啟攝影機與載入校正參數。result() 等待完成並回傳後端，建立失敗時拋出原本的例外。
+    """
+    def __init__(self, name="solution", frame_size=(1280, 720), **backend_kwargs):
+        self.build_seconds = None
+        self.warmup_seconds = None
+        self._backend = None
+        self._error = None
+        self._thread = threading.Thread(target=self._load, args=(name, frame_size, backend_kwargs),
+                                        name="pose-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self, name, frame_size, backend_kwargs):
+        try:
+            start = time.perf_counter()
+            backend = create_pose_backend(name, **backend_kwargs)
+            built = time.perf_counter()
+            self.build_seconds = built - start
+            backend.process(np.zeros((frame_size[1], frame_size[0], 3), dtype=np.uint8))
+            self.warmup_seconds = time.perf_counter() - built
+            self._backend = backend
+        except Exception as e:
+            self._error = e
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._backend
+
+    def discard(self):
+        """不使用這個後端 (例如攝影機開啟失敗)：等待建立完成後關閉"""
+        self._thread.join()
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
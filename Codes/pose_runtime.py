@@ -0,0 +1,91 @@
+import threading
+
+
+class PoseRuntime:
+    """
+    管理兩個 Pose 模型：只輸出骨架的輕量模型，以及額外輸出 segmentation_mask 的模型。
+    背景模糊關閉時只跑輕量模型；切換時先在背景執行緒建立並用最新一幀預熱目標模型，
+    準備好之後才換手，前景的 process() 不會因為建模型而卡住。
+    介面與 mp_pose.Pose 相同 (process / close / with 敘述)。
+    """
+    def __init__(self, segmentation=False, **pose_kwargs):
+        self.pose_kwargs = pose_kwargs
+        self._models = {False: None, True: None}
+        self._models[segmentation] = self._build(segmentation)
+        self.active = segmentation   # 目前使用中的模型
+        self.wanted = segmentation   # 呼叫端要求的模型
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        self._last_frame = None
+
+    def _build(self, segmentation):
+        import mediapipe as mp  # 第一次建立模型時才載入 (可以在背景執行緒進行)
+        return mp.solutions.pose.Pose(enable_segmentation=segmentation, **self.pose_kwargs)
+
+    @property
+    def segmentation_enabled(self):
+        """目前輸出的結果是否包含 segmentation_mask"""
+        return self.active
+
+    def set_segmentation(self, enabled):
+        """要求切換模型；切換在背景完成，期間仍使用原本的模型"""
+        with self._lock:
+            self.wanted = enabled
+            if enabled == self.active or self._warm_thread is not None:
+                return
+            self._warm_thread = threading.Thread(target=self._warm_up, daemon=True)
+            self._warm_thread.start()
+
+    def _warm_up(self):
+        try:
+            while True:
+                with self._lock:
+                    target = self.wanted
+                    if target == self.active:
+                        self._warm_thread = None
+                        return
+
+                model = self._models[target]
+                if model is None:
+                    model = self._models[target] = self._build(target)
+                # 用最新一幀預熱，讓換手後的第一幀就能沿用追蹤結果
+                frame = self._last_frame
+                if frame is not None:
+                    try:
+                        model.process(frame)
+                    except Exception as e:
+                        print(f"模型預熱失敗: {e}")
+
+                with self._lock:
+                    if self.wanted == target:
+                        self.active = target
+                        self._warm_thread = None
+                        return
+                # 預熱期間使用者又切換了，重新檢查目標
+        except Exception as e:
+            print(f"模型建立失敗，維持原本的模型: {e}")
+        finally:
+            # 建立模型失敗時也要清掉，否則之後的 set_segmentation 都會直接返回
+            with self._lock:
+                if self._warm_thread is threading.current_thread():
+                    self._warm_thread = None
+
+    def process(self, frame_rgb):
+        self._last_frame = frame_rgb
+        with self._lock:
+            model = self._models[self.active]
+        return model.process(frame_rgb)
+
+    def close(self):
+        thread = self._warm_thread
+        if thread is not None:
+            thread.join()
+        for model in self._models.values():
+            if model is not None:
+                model.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
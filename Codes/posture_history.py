@@ -1,11 +1,98 @@
 import time
 
+from quantile_sketch import HistogramSketch
+
+DEFAULT_WINDOWS = (60, 300, 1800)  # sliding windows in seconds (1, 5 and 30 minutes)
+BUCKETS_PER_WINDOW = 60
+
+_STATE_SLOTS = {"good": 0, "warning": 1, "bad": 2}
+
+# Streaming distributions kept for the whole session: name -> (lo, hi, bins)
+SKETCH_SPECS = {
+    "score": (0, 101, 101),
+    "shoulder_tilt_deg": (0, 90, 360),
+    "head_roll_deg": (0, 90, 360),
+    "eye_dist_px": (0, 500, 1000),
+    "nose_shoulder_angle": (0, 180, 720),
+}
+FEATURE_SKETCHES = tuple(name for name in SKETCH_SPECS if name != "score")
+
+
+def make_sketches(names=tuple(SKETCH_SPECS)):
+    """Fresh fixed-memory quantile sketches for the given score / feature names."""
+    return {name: HistogramSketch(*SKETCH_SPECS[name]) for name in names}
+
+
+class SlidingWindow:
+    """
+    Good/warning/bad time and mean score over the last `length` seconds.
+    Time is split into fixed buckets kept in a ring; running totals are
+    adjusted as buckets enter and leave the window, so add() and stats()
+    are constant time regardless of frame rate.
+    """
+    def __init__(self, length, buckets=BUCKETS_PER_WINDOW):
+        self.length = length
+        self.bucket_seconds = length / buckets
+        # Per bucket: [good_time, warning_time, bad_time, score_sum, score_count]
+        self.buckets = [[0.0, 0.0, 0.0, 0.0, 0] for _ in range(buckets)]
+        self.totals = [0.0, 0.0, 0.0, 0.0, 0]
+        self.head = None  # absolute index of the newest bucket
+
+    def _advance(self, timestamp):
+        index = int(timestamp // self.bucket_seconds)
+        if self.head is None:
+            self.head = index
+        elif index > self.head:
+            n = len(self.buckets)
+            if index - self.head >= n:
+                # Gap longer than the whole window: everything expires
+                for bucket in self.buckets:
+                    bucket[:] = (0.0, 0.0, 0.0, 0.0, 0)
+                self.totals = [0.0, 0.0, 0.0, 0.0, 0]
+            else:
+                for i in range(self.head + 1, index + 1):
+                    bucket = self.buckets[i % n]
+                    for k in range(5):
+                        self.totals[k] -= bucket[k]
+                    bucket[:] = (0.0, 0.0, 0.0, 0.0, 0)
+            self.head = index
+        return self.buckets[self.head % len(self.buckets)]
+
+    def add(self, timestamp, state, dt, score=None):
+        bucket = self._advance(timestamp)
+        slot = _STATE_SLOTS.get(state)
+        if slot is not None and dt > 0:
+            bucket[slot] += dt
+            self.totals[slot] += dt
+        if score is not None:
+            bucket[3] += score
+            bucket[4] += 1
+            self.totals[3] += score
+            self.totals[4] += 1
+
+    def stats(self, timestamp=None):
+        if timestamp is not None:
+            self._advance(timestamp)
+        good, warning, bad, score_sum, score_count = self.totals
+        # Running sums can drift slightly below zero after many subtractions
+        good, warning, bad = max(good, 0.0), max(warning, 0.0), max(bad, 0.0)
+        total = good + warning + bad
+        return {
+            "length": self.length,
+            "total_time": total,
+            "good_ratio": good / total if total > 0 else 0.0,
+            "warning_ratio": warning / total if total > 0 else 0.0,
+            "bad_ratio": bad / total if total > 0 else 0.0,
+            "avg_score": score_sum / score_count if score_count > 0 else None,
+        }
+
+
 class PostureHistory:
     """
     Tracks posture over time, calculating statistics and risk metrics.
     Scheme 2 implementation.
     """
-    def __init__(self):
+    def __init__(self, windows=DEFAULT_WINDOWS):
         # Time tracking
         self.total_time = 0.0
         self.good_time = 0.0
@@ -20,6 +107,12 @@ class PostureHistory:
 
         self.last_timestamp = None
 
+        # Recent-history windows for real-time feedback
+        self.windows = [SlidingWindow(length) for length in windows]
+
+        # Score / feature distributions over the whole session (p10/p50/p90 at any time)
+        self.sketches = make_sketches()
+
     def _classify_state(self, penalties):
         """
         Classify state based on penalties from Scheme 1.
@@ -56,6 +149,7 @@ class PostureHistory:
             # Initialize state based on first frame
             if result_dict and "penalties" in result_dict:
                 self.current_state = self._classify_state(result_dict["penalties"])
+            self._add_to_windows(timestamp, self.current_state, 0.0, result_dict)
             return
 
         dt = timestamp - self.last_timestamp
@@ -79,6 +173,7 @@ class PostureHistory:
             self.warning_time += dt
         elif new_state == "bad":
             self.bad_time += dt
+        self._add_to_windows(timestamp, new_state, dt, result_dict)
 
         # 3. Update streaks
         if new_state == self.current_state:
@@ -103,10 +198,39 @@ class PostureHistory:
             if new_state == "bad":
                 self.max_bad_streak = max(self.max_bad_streak, self.current_streak_time)
 
-    def snapshot(self):
+    def _add_to_windows(self, timestamp, state, dt, result_dict):
+        score = result_dict.get("score") if result_dict else None
+        for window in self.windows:
+            window.add(timestamp, state, dt, score)
+
+        if score is not None:
+            self.sketches["score"].add(score)
+            features = result_dict.get("features") or {}
+            for name in FEATURE_SKETCHES:
+                if name in features:
+                    self.sketches[name].add(features[name])
+
+    def distributions(self):
+        """
+        p10/p50/p90 summary of the score and each tracked feature.
+        Computed from the sketches, so it is cheap even after millions of frames.
+        """
+        return {name: sketch.summary() for name, sketch in self.sketches.items()}
+
+    def merge_sketches(self, sketches):
+        """Fold in sketches from another session (e.g. loaded with HistogramSketch.from_dict)."""
+        for name, sketch in sketches.items():
+            if name in self.sketches:
+                self.sketches[name].merge(sketch)
+
+    def snapshot(self, timestamp=None):
         """
         Return a summary dictionary of the current history statistics.
+        `timestamp` (default: now) expires old samples from the sliding windows,
+        so they keep draining when updates stop, e.g. while the user is away.
         """
+        if timestamp is None:
+            timestamp = time.time()
         good_ratio = 0.0
         bad_ratio = 0.0
         if self.total_time > 0:
@@ -123,5 +247,7 @@ class PostureHistory:
             "current_state": self.current_state,
             "current_streak_time": self.current_streak_time,
             "max_bad_streak": self.max_bad_streak,
-            "bad_episodes_count": self.bad_episodes_count
+            "bad_episodes_count": self.bad_episodes_count,
+            # Sliding-window stats keyed by window length in seconds
+            "windows": {w.length: w.stats(timestamp) for w in self.windows},
         }
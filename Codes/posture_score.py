@@ -1,18 +1,42 @@
 import math
-import mediapipe as mp
+from bisect import bisect_right
+import numpy as np
 
-mp_pose = mp.solutions.pose
+# 評分用的關鍵點索引 (與 mp.solutions.pose.PoseLandmark 相同)，不必為了常數載入 mediapipe
+NOSE = 0
+LEFT_EYE = 2
+RIGHT_EYE = 5
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
 
-def extract_face_shoulder_features(landmarks, img_w, img_h):
+# extract_face_shoulder_features 回傳的特徵名稱 (批次版本的欄位順序)
+FEATURE_NAMES = (
+    "shoulder_tilt_deg",
+    "head_roll_deg",
+    "head_roll_raw",
+    "eye_dist_px",
+    "distance_indicator",
+    "nose_shoulder_angle",
+)
+
+# EMA 批次計算時每個區塊的長度 (區塊內以矩陣乘法一次算完)
+EMA_BLOCK_SIZE = 64
+# 區塊矩陣的 EMA 與逐幀遞迴的最大相對誤差 (實測約 1e-15，只差幾個 ulp)
+EMA_BATCH_RTOL = 1e-12
+# extract_features_batch 與逐幀版本的最大絕對誤差 (度或像素)；NumPy 與 math 的 atan2/hypot 會差幾個 ulp，
+# acos 在夾角接近 0 或 180 度時會放大誤差，實測最大約 1e-10 度
+FEATURE_BATCH_ATOL = 1e-8
+
+def extract_face_shoulder_features(landmarks, img_w, img_h, undistort=None):
     """
     更新：加入鼻子與肩膀的幾何計算來判斷駝背。
+    undistort: 選用的 LandmarkUndistorter，只修正這五個關鍵點的鏡頭畸變 (不必 remap 整張畫面)
     """
     # 取得關鍵點索引
-    L_SH = mp_pose.PoseLandmark.LEFT_SHOULDER.value
-    R_SH = mp_pose.PoseLandmark.RIGHT_SHOULDER.value
-    L_EYE = mp_pose.PoseLandmark.LEFT_EYE.value
-    R_EYE = mp_pose.PoseLandmark.RIGHT_EYE.value
-    NOSE = mp_pose.PoseLandmark.NOSE.value  # 新增鼻子
+    L_SH = LEFT_SHOULDER
+    R_SH = RIGHT_SHOULDER
+    L_EYE = LEFT_EYE
+    R_EYE = RIGHT_EYE
     
     # --- 1. 轉換為像素座標 [x, y] ---
     l_shoulder = [landmarks[L_SH].x * img_w, landmarks[L_SH].y * img_h]
@@ -22,6 +46,10 @@ def extract_face_shoulder_features(landmarks, img_w, img_h):
     r_eye = [landmarks[R_EYE].x * img_w, landmarks[R_EYE].y * img_h]
     
     nose = [landmarks[NOSE].x * img_w, landmarks[NOSE].y * img_h]
+
+    if undistort is not None:
+        l_shoulder, r_shoulder, l_eye, r_eye, nose = undistort(
+            [l_shoulder, r_shoulder, l_eye, r_eye, nose]).tolist()
     
     # --- 2. 肩膀傾斜 (Shoulder Tilt) ---
     sh_dy = l_shoulder[1] - r_shoulder[1]
@@ -70,31 +98,241 @@ def extract_face_shoulder_features(landmarks, img_w, img_h):
         "nose_shoulder_angle": nose_shoulder_angle # 新增回傳值
     }
 
+def landmarks_to_array(landmarks):
+    """把 MediaPipe 的 landmark 列表轉成 (33, 3) 的 NumPy 陣列 (x, y, z)，方便記錄與批次處理"""
+    return np.array([[lm.x, lm.y, lm.z] for lm in landmarks], dtype=np.float64)
+
+def extract_features_batch(landmarks, img_w, img_h, undistort=None):
+    """
+    extract_face_shoulder_features 的向量化版本，一次處理 N 幀。
+    使用 NumPy 的三角函數，與單幀版本的 math.* 不保證逐位元相同，絕對誤差在 FEATURE_BATCH_ATOL 以內。
+
+    Args:
+        landmarks: (N, 33, 3) 的正規化座標陣列 (x, y, z)
+        img_w, img_h: 影像寬高 (像素)
+        undistort: 選用的 LandmarkUndistorter，與單幀版本相同
+
+    Returns:
+        dict: 特徵名稱 -> (N,) 陣列，名稱與單幀版本相同
+    """
+    lm = np.asarray(landmarks, dtype=np.float64)
+    if lm.ndim != 3 or lm.shape[1] < 33 or lm.shape[2] < 2:
+        raise ValueError(f"landmarks 形狀應為 (N, 33, 3)，收到 {lm.shape}")
+
+    L_SH = LEFT_SHOULDER
+    R_SH = RIGHT_SHOULDER
+    L_EYE = LEFT_EYE
+    R_EYE = RIGHT_EYE
+
+    # 轉換為像素座標，每個都是 (N, 2)
+    scale = np.array([img_w, img_h], dtype=np.float64)
+    l_shoulder = lm[:, L_SH, :2] * scale
+    r_shoulder = lm[:, R_SH, :2] * scale
+    l_eye = lm[:, L_EYE, :2] * scale
+    r_eye = lm[:, R_EYE, :2] * scale
+    nose = lm[:, NOSE, :2] * scale
+
+    if undistort is not None:
+        points = np.stack([l_shoulder, r_shoulder, l_eye, r_eye, nose], axis=1)
+        points = undistort(points.reshape(-1, 2)).reshape(-1, 5, 2)
+        l_shoulder, r_shoulder, l_eye, r_eye, nose = (points[:, i] for i in range(5))
+
+    # 肩膀傾斜
+    sh_d = l_shoulder - r_shoulder
+    shoulder_tilt_deg = np.abs(np.degrees(np.arctan2(sh_d[:, 1], np.abs(sh_d[:, 0]))))
+
+    # 頭部歪斜
+    eye_d = l_eye - r_eye
+    head_roll_raw = np.degrees(np.arctan2(eye_d[:, 1], eye_d[:, 0]))
+    head_roll_deg = np.abs(head_roll_raw)
+
+    # 眼距
+    eye_dist_px = np.hypot(eye_d[:, 0], eye_d[:, 1])
+
+    # 鼻肩夾角
+    vec_n_l = l_shoulder - nose
+    vec_n_r = r_shoulder - nose
+    len_prod = np.hypot(vec_n_l[:, 0], vec_n_l[:, 1]) * np.hypot(vec_n_r[:, 0], vec_n_r[:, 1])
+    dot_product = vec_n_l[:, 0] * vec_n_r[:, 0] + vec_n_l[:, 1] * vec_n_r[:, 1]
+    valid = len_prod != 0
+    cos_theta = np.divide(dot_product, len_prod, out=np.zeros_like(dot_product), where=valid)
+    cos_theta = np.clip(cos_theta, -1.0, 1.0)
+    nose_shoulder_angle = np.where(valid, np.degrees(np.arccos(cos_theta)), 0.0)
+
+    return {
+        "shoulder_tilt_deg": shoulder_tilt_deg,
+        "head_roll_deg": head_roll_deg,
+        "head_roll_raw": head_roll_raw,
+        "eye_dist_px": eye_dist_px,
+        "distance_indicator": eye_dist_px.copy(),
+        "nose_shoulder_angle": nose_shoulder_angle,
+    }
+
+def ema_batch(values, alpha, initial=None, exact=False):
+    """
+    向量化的 EMA 遞迴：y[t] = alpha * x[t] + (1 - alpha) * y[t-1]。
+
+    以固定長度的區塊處理，區塊內用下三角的衰減矩陣一次算完，
+    只在區塊之間傳遞上一個值，避免逐幀的 Python 迴圈。
+    矩陣乘法的加總順序與遞迴不同，結果與逐幀遞迴的相對誤差在 EMA_BATCH_RTOL 以內，但不保證逐位元相同。
+
+    Args:
+        values: (N, F) 陣列
+        alpha: 平滑係數
+        initial: (F,) 上一幀的平滑值；None 表示第一幀直接採用原始值 (與單幀版本相同)
+        exact: True 時改用與 PostureScore.smooth_features 相同順序的逐幀遞迴 (逐位元相同，約慢 10 倍)
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    out = np.empty_like(x)
+    if n == 0:
+        return out
+
+    decay = 1.0 - alpha
+    if initial is None:
+        out[0] = x[0]
+        prev = x[0]
+        begin = 1
+    else:
+        prev = np.asarray(initial, dtype=np.float64)
+        begin = 0
+
+    if exact:
+        # 每個特徵以 Python float 逐幀遞迴，運算與單幀版本完全相同
+        for j, column in enumerate(x[begin:].T.tolist()):
+            p = float(prev[j])
+            smoothed = []
+            for v in column:
+                p = alpha * v + decay * p
+                smoothed.append(p)
+            out[begin:, j] = smoothed
+        return out
+
+    idx = np.arange(EMA_BLOCK_SIZE)
+    lag = idx[:, None] - idx[None, :]
+    weights = np.where(lag >= 0, alpha * decay ** np.maximum(lag, 0), 0.0)
+    carry = decay ** (idx + 1)
+
+    for start in range(begin, n, EMA_BLOCK_SIZE):
+        block = x[start:start + EMA_BLOCK_SIZE]
+        m = len(block)
+        out[start:start + m] = weights[:m, :m] @ block + carry[:m, None] * prev
+        prev = out[start + m - 1]
+    return out
+
+class ScoringRule:
+    """
+    一條分段扣分規則 (以資料宣告，新增指標不必再寫分支)。
+    reference:
+        absolute     直接使用特徵值
+        baseline     特徵值 - 校正基準 (有方向性，例如越靠近螢幕越大)
+        baseline_abs |特徵值 - 校正基準|
+    值 < breakpoints[0] 扣 penalties[0]，< breakpoints[1] 扣 penalties[1]，依此類推，其餘扣 penalties[-1]
+    """
+    REFERENCES = ("absolute", "baseline", "baseline_abs")
+
+    def __init__(self, name, feature, reference, breakpoints, penalties):
+        if reference not in self.REFERENCES:
+            raise ValueError(f"未知的參考方式: {reference}")
+        if len(penalties) != len(breakpoints) + 1:
+            raise ValueError(f"{name}: 扣分數量必須比分界點多一個")
+        if list(breakpoints) != sorted(breakpoints):
+            raise ValueError(f"{name}: 分界點必須遞增")
+        self.name = name
+        self.feature = feature
+        self.reference = reference
+        self.breakpoints = tuple(float(b) for b in breakpoints)
+        self.penalties = tuple(int(p) for p in penalties)
+
+
+def compile_rules(rules, baseline=None):
+    """
+    把規則編譯成查表用的 tuple：(扣分名稱, 特徵, 偏移量, 是否取絕對值, 分界點, 扣分)。
+    校正基準直接折進偏移量，逐幀計算時不必再判斷參考方式。
+    """
+    compiled = []
+    for rule in rules:
+        offset = 0.0
+        if rule.reference != "absolute":
+            if baseline is None:
+                raise ValueError(f"{rule.name}: 相對規則需要校正基準")
+            offset = float(baseline[rule.feature])
+        compiled.append((rule.name, rule.feature, offset, rule.reference == "baseline_abs",
+                         rule.breakpoints, rule.penalties))
+    return tuple(compiled)
+
+
 class PostureScore:
-    def __init__(self):
+    # 尚未校正時使用的絕對門檻 (ABSOLUTE_RULES 由這些常數產生)
+    # 1. 角度類 (Degrees) - 左右傾斜
+    SHOULDER_WARN = 5.0
+    SHOULDER_BAD = 10.0
+    HEAD_ROLL_WARN = 10.0
+    HEAD_ROLL_BAD = 20.0
+
+    # 2. 駝背類、低頭 (Degrees) - 鼻肩夾角
+    # 正常坐姿時，這個角度通常較小 (例如 85度，視攝像頭距離而定)
+    # 當人駝背、頭往前伸時，鼻子靠近肩膀連線，角度會變大
+    HUNCH_WARN = 85.0
+    HUNCH_BAD = 100.0
+
+    # 3. 距離類 (Pixels)
+    DIST_WARN = 90.0
+    DIST_BAD = 110.0
+
+    # 校正後使用：與校正基準的差距 (BASELINE_RULES 由這些常數產生)
+    SHOULDER_DIFF_WARN = 5.0
+    SHOULDER_DIFF_BAD = 10.0
+    HEAD_ROLL_DIFF_WARN = 10.0
+    HEAD_ROLL_DIFF_BAD = 15.0
+    HUNCH_DIFF_WARN = 10.0       # 正值代表夾角變大 (更駝背)
+    HUNCH_DIFF_BAD = 25.0
+    DIST_DIFF_WARN = 10.0        # 正值代表比基準更靠近螢幕
+    DIST_DIFF_BAD = 30.0
+
+    def __init__(self, rules=None, baseline_rules=None):
+        """rules / baseline_rules 預設由上面的門檻常數產生 (子類別覆寫常數即可調整門檻)"""
         self.ALPHA = 0.4
         self.history = None
         self.baseline = None
-        
-        # 1. 角度類 (Degrees) - 左右傾斜
-        self.SHOULDER_WARN = 5.0
-        self.SHOULDER_BAD = 10.0
-        self.HEAD_ROLL_WARN = 10.0
-        self.HEAD_ROLL_BAD = 20.0
-
-        # 2. [新增] 駝背類、低頭 (Degrees) - 鼻肩夾角
-        # 正常坐姿時，這個角度通常較小 (例如 85度，視攝像頭距離而定)
-        # 當人駝背、頭往前伸時，鼻子靠近肩膀連線，角度會變大
-        self.HUNCH_WARN = 85.0 
-        self.HUNCH_BAD = 100.0
-
-        # 3. 距離類 (Pixels)
-        self.DIST_WARN = 90.0 
-        self.DIST_BAD = 110.0
+        self.rules = tuple(rules) if rules is not None else self.absolute_rules()
+        self.baseline_rules = tuple(baseline_rules) if baseline_rules is not None else self.relative_rules()
+        self._compiled = compile_rules(self.rules)
+
+    @classmethod
+    def absolute_rules(cls):
+        return (
+            ScoringRule("shoulder_tilt", "shoulder_tilt_deg", "absolute",
+                        (cls.SHOULDER_WARN, cls.SHOULDER_BAD), (0, 10, 20)),
+            ScoringRule("head_roll", "head_roll_deg", "absolute",
+                        (cls.HEAD_ROLL_WARN, cls.HEAD_ROLL_BAD), (0, 10, 20)),
+            ScoringRule("head_distance", "eye_dist_px", "absolute",
+                        (cls.DIST_WARN, cls.DIST_BAD), (0, 10, 20)),
+            # 駝背通常是比較嚴重的姿勢問題，扣分重一點
+            ScoringRule("hunchback", "nose_shoulder_angle", "absolute",
+                        (cls.HUNCH_WARN, cls.HUNCH_BAD), (0, 15, 30)),
+        )
+
+    @classmethod
+    def relative_rules(cls):
+        return (
+            ScoringRule("shoulder_tilt", "shoulder_tilt_deg", "baseline_abs",
+                        (cls.SHOULDER_DIFF_WARN, cls.SHOULDER_DIFF_BAD), (0, 10, 20)),
+            ScoringRule("head_roll", "head_roll_deg", "baseline_abs",
+                        (cls.HEAD_ROLL_DIFF_WARN, cls.HEAD_ROLL_DIFF_BAD), (0, 10, 20)),
+            ScoringRule("head_distance", "eye_dist_px", "baseline",
+                        (cls.DIST_DIFF_WARN, cls.DIST_DIFF_BAD), (0, 10, 20)),
+            ScoringRule("hunchback", "nose_shoulder_angle", "baseline",
+                        (cls.HUNCH_DIFF_WARN, cls.HUNCH_DIFF_BAD), (0, 15, 30)),
+        )
 
     def set_baseline(self, features):
         """Set the baseline features for relative scoring."""
         self.baseline = features
+        if features:
+            self._compiled = compile_rules(self.baseline_rules, features)
+        else:
+            self._compiled = compile_rules(self.rules)
 
     def smooth_features(self, new_features):
         if self.history is None:
@@ -107,64 +345,14 @@ class PostureScore:
         self.history = smoothed
         return smoothed
 
-    def _penalty_from_tilt(self, deg):
-        if self.baseline:
-            # Relative deviation
-            diff = abs(deg - self.baseline["shoulder_tilt_deg"])
-            if diff < 5.0: return 0
-            elif diff < 10.0: return 10 
-            else: return 20
-        else:
-            if deg < self.SHOULDER_WARN: return 0
-            elif deg < self.SHOULDER_BAD: return 10
-            else: return 20
-
-    def _penalty_from_roll(self, deg):
-        if self.baseline:
-            # Relative deviation
-            diff = abs(deg - self.baseline["head_roll_deg"])
-            if diff < 10.0: return 0
-            elif diff < 15.0: return 10
-            else: return 20
-        else:
-            if deg < self.HEAD_ROLL_WARN: return 0
-            elif deg < self.HEAD_ROLL_BAD: return 10
-            else: return 20
-    
-    def _penalty_from_distance(self, dist_px):
-        if self.baseline:
-            # Relative deviation: positive means closer than baseline
-            diff = dist_px - self.baseline["eye_dist_px"]
-            if diff < 10.0: return 0
-            elif diff < 30.0 : return 10
-            else: return 20
-        else:
-            if dist_px < self.DIST_WARN: return 0
-            elif dist_px < self.DIST_BAD: return 10
-            else: return 20
-
-    def _penalty_from_hunch(self, angle):
-        if self.baseline:
-            # Relative deviation: positive means angle increased (more hunch)
-            diff = angle - self.baseline["nose_shoulder_angle"]
-            if diff < 10.0: return 0
-            elif diff < 25.0: return 15
-            else: return 30
-        else:
-            if angle < self.HUNCH_WARN: return 0
-            elif angle < self.HUNCH_BAD: return 15
-            else: return 30  # 駝背通常是比較嚴重的姿勢問題，扣分重一點
-
     def compute(self, features):
         f = self.smooth_features(features)
         penalties = {}
-        
-        penalties["shoulder_tilt"] = self._penalty_from_tilt(f["shoulder_tilt_deg"])
-        penalties["head_roll"] = self._penalty_from_roll(f["head_roll_deg"])
-        penalties["head_distance"] = self._penalty_from_distance(f["eye_dist_px"])
-        
-        # 新增駝背計算
-        penalties["hunchback"] = self._penalty_from_hunch(f["nose_shoulder_angle"])
+        for name, feature, offset, use_abs, breakpoints, levels in self._compiled:
+            value = f[feature] - offset
+            if use_abs:
+                value = abs(value)
+            penalties[name] = levels[bisect_right(breakpoints, value)]
 
         total_penalty = sum(penalties.values())
         score = max(0, 100 - total_penalty)
@@ -177,4 +365,63 @@ class PostureScore:
             "status": status,
             "penalties": penalties,
             "features": f,
-        }
\ No newline at end of file
+        }
+
+    def compute_batch(self, features, exact=False):
+        """
+        compute 的批次版本，一次處理 N 幀。
+        平滑後的特徵與逐幀呼叫 compute 的相對誤差在 EMA_BATCH_RTOL 以內 (見 ema_batch)，
+        只有特徵剛好落在扣分分界點上時分數才可能不同；exact=True 時與以相同特徵逐幀呼叫 compute 完全相同。
+        (特徵若來自 extract_features_batch，本身與單幀版本就有 FEATURE_BATCH_ATOL 以內的差距)
+        EMA 狀態會從 self.history 接續，處理完後更新為最後一幀，
+        因此可以與逐幀呼叫交錯使用。
+
+        Args:
+            features: extract_features_batch 的輸出 (特徵名稱 -> (N,) 陣列)
+            exact: 以逐幀遞迴計算 EMA，結果 (含 self.history) 與逐幀呼叫 compute 逐位元相同
+
+        Returns:
+            dict: "score" (N,) 整數陣列、"penalties" 與 "features" 皆為名稱 -> (N,) 陣列。
+                  不含逐幀的 "status" 字串。
+        """
+        names = [k for k in FEATURE_NAMES if k in features]
+        matrix = np.column_stack([np.asarray(features[k], dtype=np.float64) for k in names])
+        if len(matrix) == 0:
+            # 空批次：不動 self.history，直接回傳空陣列
+            empty = np.zeros(0)
+            return {
+                "score": np.zeros(0, dtype=int),
+                "penalties": {name: empty.astype(int) for name, *_ in self._compiled},
+                "features": {k: empty.copy() for k in names},
+            }
+
+        initial = None
+        if self.history is not None:
+            initial = [self.history.get(k, matrix[0, i]) for i, k in enumerate(names)]
+        smoothed = ema_batch(matrix, self.ALPHA, initial, exact=exact)
+        f = {k: smoothed[:, i] for i, k in enumerate(names)}
+        if len(smoothed):
+            self.history = {k: float(smoothed[-1, i]) for i, k in enumerate(names)}
+
+        penalties = {}
+        for name, feature, offset, use_abs, breakpoints, levels in self._compiled:
+            values = f[feature] - offset
+            if use_abs:
+                values = np.abs(values)
+            penalties[name] = np.asarray(levels)[np.searchsorted(breakpoints, values, side="right")]
+
+        total_penalty = sum(penalties.values())
+        score = np.maximum(0, 100 - total_penalty).astype(int)
+
+        return {
+            "score": score,
+            "penalties": penalties,
+            "features": f,
+        }
+
+
+# 尚未校正時使用的絕對門檻
+ABSOLUTE_RULES = PostureScore.absolute_rules()
+
+# 校正後使用：與校正基準的差距
+BASELINE_RULES = PostureScore.relative_rules()
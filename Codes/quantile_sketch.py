@@ -0,0 +1,129 @@
+"""
+固定記憶體的串流分位數估計 (固定寬度直方圖)。
+
+每筆資料只更新一個計數，記憶體只和 bins 有關，與幀數無關；
+同樣範圍的 sketch 可以直接相加合併 (例如多個 session)，也可以存成 dict / JSON。
+分位數的誤差不超過一個 bin 寬度 (bin 內以線性內插)。
+"""
+import numpy as np
+
+
+class HistogramSketch:
+    """
+    [lo, hi) 切成 bins 個等寬區間，另外各有一個低於 lo / 高於等於 hi 的溢位區間。
+    溢位區間內的分位數以實際觀測到的最小 / 最大值代表。
+    """
+    def __init__(self, lo, hi, bins=512):
+        if hi <= lo or bins < 1:
+            raise ValueError("HistogramSketch 需要 lo < hi 且 bins >= 1")
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.bins = int(bins)
+        self._scale = self.bins / (self.hi - self.lo)
+        # counts[0] 為低於 lo，counts[-1] 為高於等於 hi
+        self.counts = np.zeros(self.bins + 2, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def _index(self, value):
+        if value < self.lo:
+            return 0
+        if value >= self.hi:
+            return self.bins + 1
+        return int((value - self.lo) * self._scale) + 1
+
+    def add(self, value):
+        value = float(value)
+        if value != value:  # NaN
+            return
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def add_many(self, values):
+        """一次加入一批資料 (NumPy 陣列)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        index = np.clip(((values - self.lo) * self._scale).astype(np.int64) + 1, 0, self.bins + 1)
+        index[values < self.lo] = 0
+        index[values >= self.hi] = self.bins + 1
+        self.counts += np.bincount(index, minlength=self.bins + 2)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def quantiles(self, qs):
+        """回傳多個分位數 (0 ~ 1)；沒有資料時回傳 None"""
+        if self.count == 0:
+            return [None for _ in qs]
+        cumulative = np.cumsum(self.counts)
+        width = 1.0 / self._scale
+        out = []
+        for q in qs:
+            rank = min(max(q, 0.0), 1.0) * self.count
+            b = int(np.searchsorted(cumulative, rank, side="left"))
+            b = min(b, self.bins + 1)
+            if b == 0:
+                value = self.min
+            elif b == self.bins + 1:
+                value = self.max
+            else:
+                before = cumulative[b - 1]
+                frac = (rank - before) / self.counts[b] if self.counts[b] else 0.0
+                value = self.lo + (b - 1 + frac) * width
+            out.append(min(max(value, self.min), self.max))
+        return out
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self):
+        """p10 / p50 / p90 與平均值"""
+        p10, p50, p90 = self.quantiles((0.1, 0.5, 0.9))
+        return {"count": self.count, "mean": self.mean(), "p10": p10, "p50": p50, "p90": p90}
+
+    def merge(self, other):
+        """把另一個同樣範圍的 sketch 加進來"""
+        if (other.lo, other.hi, other.bins) != (self.lo, self.hi, self.bins):
+            raise ValueError("只能合併範圍與 bins 相同的 HistogramSketch")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self):
+        return {
+            "lo": self.lo,
+            "hi": self.hi,
+            "bins": self.bins,
+            "counts": self.counts.tolist(),
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["lo"], data["hi"], data["bins"])
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64)
+        sketch.count = int(data["count"])
+        sketch.total = float(data["total"])
+        if sketch.count:
+            sketch.min = float(data["min"])
+            sketch.max = float(data["max"])
+        return sketch
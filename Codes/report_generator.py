@@ -1,61 +1,289 @@
+import html
+import io
+import os
 import time
-import matplotlib.pyplot as plt
+import webbrowser
 from datetime import datetime
 
-def generate_report(score_log, duration_minutes, away_periods=None):
-    """程式結束時生成圖表
-    
-    Args:
-        score_log: 分數記錄列表 [(time, score), ...]
-        duration_minutes: 總時長(分鐘)
-        away_periods: 離席時段列表 [(start_elapsed, end_elapsed), ...]
+import numpy as np
+
+MAX_PLOT_POINTS = 4000   # 折線圖最多畫幾個點，超過就降採樣
+GOOD_SCORE = 80
+REPORT_FORMATS = ("png", "svg", "html")  # 支援的報告輸出格式
+
+# 報告中顯示分佈的特徵 (PostureHistory.distributions() 的名稱 -> 顯示名稱)
+DISTRIBUTION_LABELS = {
+    "shoulder_tilt_deg": "Shoulder Tilt (deg)",
+    "head_roll_deg": "Head Roll (deg)",
+    "eye_dist_px": "Eye Dist (px)",
+    "nose_shoulder_angle": "Hunch (deg)",
+}
+
+
+def parse_report_formats(spec):
+    """把 "png,html" 轉成 ("png", "html")；有不支援的格式或沒有任何格式時拋出 ValueError"""
+    formats = tuple(f.strip().lower() for f in spec.split(",") if f.strip())
+    _check_formats(formats)
+    return formats
+
+
+def _check_formats(formats):
+    unknown = [f for f in formats if f not in REPORT_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"不支援的報告格式: {', '.join(unknown) or '(空白)'} (可用: {', '.join(REPORT_FORMATS)})")
+
+
+def _new_figure(figsize):
+    # matplotlib 只在產生報告時才載入，不拖慢程式啟動
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def decimate_minmax(times, values, max_points=MAX_PLOT_POINTS):
     """
-    if not score_log:
-        print("沒有足夠數據生成報告。")
-        return
+    min/max 降採樣：把資料切成 max_points / 2 個區間，每個區間保留最低與最高分，
+    點數大幅減少但短暫的低分 (駝背、歪頭) 仍然看得到。
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= max_points:
+        return times, values
+    starts = np.linspace(0, n, max_points // 2, endpoint=False).astype(np.int64)
+    ends = np.append(starts[1:], n) - 1
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    return (np.column_stack([times[starts], times[ends]]).ravel(),
+            np.column_stack([mins, maxs]).ravel())
+
 
-    times, scores = zip(*score_log)
-    
+def _decimate_band(times, lows, highs, max_points=MAX_PLOT_POINTS):
+    """最低 / 最高分區間帶的降採樣"""
+    n = len(times)
+    if n <= max_points:
+        return times, lows, highs
+    starts = np.linspace(0, n, max_points, endpoint=False).astype(np.int64)
+    return times[starts], np.minimum.reduceat(lows, starts), np.maximum.reduceat(highs, starts)
+
+
+def _collect(score_log):
+    """
+    把分數記錄整理成 NumPy 陣列與統計數據。
+    Returns:
+        times, scores, lows, highs (lows / highs 可能為 None), avg_score, good_ratio
+    """
+    if hasattr(score_log, "series"):
+        # ScoreTimeline：較舊的資料已降採樣成每秒 / 每分鐘的 min / mean / max
+        times, scores, lows, highs = score_log.series()
+        stats = score_log.stats()
+        return times, scores, lows, highs, stats["avg_score"], stats["good_ratio"]
+
+    data = np.asarray(score_log, dtype=np.float64)
+    times, scores = data[:, 0], data[:, 1]
     # 計算統計數據 (只計算實際在場時間的分數)
-    avg_score = sum(scores) / len(scores)
-    good_time = sum(1 for s in scores if s > 80)
-    good_ratio = (good_time / len(scores)) * 100
-    
-    # 計算離席總時間
-    total_away_time = 0
-    if away_periods:
-        total_away_time = sum(end - start for start, end in away_periods)
+    avg_score = float(scores.mean())
+    good_ratio = float((scores > GOOD_SCORE).mean() * 100)
+    return times, scores, None, None, avg_score, good_ratio
+
+
+def _build_figure(times, scores, lows, highs, away_periods, info_text, title, max_points):
+    fig = _new_figure((10, 6))
+    ax = fig.add_subplot(111)
 
-    plt.figure(figsize=(10, 6))
-    
     # 繪製離席時段 (橙色半透明區域)
     if away_periods:
         for start, end in away_periods:
-            plt.axvspan(start, end, alpha=0.3, color='orange', label='_nolegend_')
+            ax.axvspan(start, end, alpha=0.3, color='orange', label='_nolegend_')
         # 添加一個用於圖例的代表性區域
-        plt.axvspan(0, 0, alpha=0.3, color='orange', label='User Away')
-    
-    plt.plot(times, scores, label='Posture Score', color='blue', linewidth=1.5)
-    plt.axhline(y=80, color='g', linestyle='--', label='Excellent (80)')
-    plt.axhline(y=60, color='r', linestyle='--', label='Poor (60)')
-    
-    plt.title(f"Posture Report ({datetime.now().strftime('%Y-%m-%d %H:%M')})")
-    plt.xlabel("Time (seconds)")
-    plt.ylabel("Score")
-    plt.ylim(0, 105)
-    plt.legend(loc='upper left', bbox_to_anchor=(0.01, 0.25))
-    plt.grid(True, alpha=0.3)
+        ax.axvspan(0, 0, alpha=0.3, color='orange', label='User Away')
+
+    if lows is not None:
+        # 降採樣區間的最低 / 最高分，讓短暫的低分仍然看得到
+        band_t, band_lo, band_hi = _decimate_band(times, lows, highs, max_points)
+        ax.fill_between(band_t, band_lo, band_hi, color='blue', alpha=0.15, linewidth=0, label='Score Range')
+    plot_t, plot_s = decimate_minmax(times, scores, max_points)
+    ax.plot(plot_t, plot_s, label='Posture Score', color='blue', linewidth=1.5)
+    ax.axhline(y=80, color='g', linestyle='--', label='Excellent (80)')
+    ax.axhline(y=60, color='r', linestyle='--', label='Poor (60)')
+
+    ax.set_title(title)
+    ax.set_xlabel("Time (seconds)")
+    ax.set_ylabel("Score")
+    ax.set_ylim(0, 105)
+    ax.legend(loc='upper left', bbox_to_anchor=(0.01, 0.25))
+    ax.grid(True, alpha=0.3)
 
     # 加入文字統計
+    fig.text(0.3, 0.12, info_text, fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
+    return fig
+
+
+def _write_html(path, fig, title, info_text):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="svg")
+    svg = buffer.getvalue().decode("utf-8")
+    svg = svg[svg.find("<svg"):]  # 去掉 XML 宣告，直接嵌入 HTML
+    rows = "".join(
+        f"<tr><th>{html.escape(key.strip())}</th><td>{html.escape(value.strip())}</td></tr>"
+        for key, value in (line.split(":", 1) for line in info_text.splitlines())
+    )
+    safe_title = html.escape(title)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{safe_title}</title></head><body>\n"
+            f"<h1>{safe_title}</h1>\n<table>{rows}</table>\n{svg}\n</body></html>\n"
+        )
+
+
+def _format_percentiles(summary):
+    return " / ".join(f"{summary[k]:.1f}" for k in ("p10", "p50", "p90"))
+
+
+def generate_report(score_log, duration_minutes, away_periods=None, formats=("png",),
+                    output_dir=".", show=False, max_points=MAX_PLOT_POINTS, distributions=None,
+                    name="posture_report", title=None):
+    """程式結束時生成圖表 (Agg 後端繪製，不開視窗，不會卡住)
+
+    Args:
+        score_log: ScoreTimeline，或分數記錄列表 [(time, score), ...]
+        duration_minutes: 總時長(分鐘)
+        away_periods: 離席時段列表 [(start_elapsed, end_elapsed), ...]
+        formats: 要輸出的格式，可包含 "png"、"svg"、"html"
+        output_dir: 輸出目錄
+        show: 產生後是否用系統預設程式開啟 (不阻塞)
+        max_points: 折線圖最多繪製的點數，超過時以 min/max 降採樣
+        distributions: PostureHistory.distributions() 的結果，加入分數與各特徵的 p10 / p50 / p90
+        name: 輸出檔名的開頭 (後面接時間戳記)
+        title: 圖表標題，預設為 "Posture Report (日期時間)"
+
+    Returns:
+        產生的檔案路徑列表
+    """
+    _check_formats(formats)  # 在繪圖前檢查，不要畫完才在 savefig 失敗
+    if not len(score_log):
+        print("沒有足夠數據生成報告。")
+        return []
+
+    times, scores, lows, highs, avg_score, good_ratio = _collect(score_log)
+
+    # 計算離席總時間
+    total_away_time = 0
+    if away_periods:
+        total_away_time = float(np.sum([end - start for start, end in away_periods]))
+
     away_time_str = f"\nAway Time: {total_away_time:.1f}s" if total_away_time > 0 else ""
     info_text = (f"Duration: {duration_minutes:.1f} mins\n"
                  f"Avg Score: {avg_score:.1f}\n"
                  f"Good Posture: {good_ratio:.1f}%{away_time_str}")
-    plt.gcf().text(0.3, 0.12, info_text, fontsize=10, 
-                   bbox=dict(facecolor='white', alpha=0.8))
-
-    filename = f"posture_report_{int(time.time())}.png"
-    plt.savefig(filename)
-    print(f"健康報告已儲存為: {filename}")
-    # 如果想直接顯示，把下面這行取消註解
-    plt.show()
+    detail_text = info_text
+    if distributions:
+        score_dist = distributions.get("score")
+        if score_dist and score_dist["count"]:
+            info_text += f"\nScore p10/p50/p90: {_format_percentiles(score_dist)}"
+        detail_text = info_text
+        # 各特徵的分佈只放在 HTML 的統計表，避免圖上的文字框太長
+        for feature, label in DISTRIBUTION_LABELS.items():
+            summary = distributions.get(feature)
+            if summary and summary["count"]:
+                detail_text += f"\n{label} p10/p50/p90: {_format_percentiles(summary)}"
+    title = title or "Posture Report"
+    title = f"{title} ({datetime.now().strftime('%Y-%m-%d %H:%M')})"
+
+    fig = _build_figure(times, scores, lows, highs, away_periods, info_text, title, max_points)
+
+    base = os.path.join(output_dir, f"{name}_{int(time.time())}")
+    paths = []
+    for fmt in formats:
+        path = f"{base}.{fmt}"
+        if fmt == "html":
+            _write_html(path, fig, title, detail_text)
+        else:
+            fig.savefig(path)
+        paths.append(path)
+        print(f"健康報告已儲存為: {path}")
+
+    if show and paths:
+        webbrowser.open("file://" + os.path.abspath(paths[-1]))
+    return paths
+
+
+def generate_trend_report(days, formats=("png",), output_dir=".", show=False):
+    """多日趨勢報告 (資料來自 rollups.RollupStore.daily)
+
+    Args:
+        days: [{"day", "avg_score", "samples", "good_s", "warning_s", "bad_s", "away_s", "bad_episodes"}, ...]
+        formats / output_dir / show: 與 generate_report 相同
+
+    Returns:
+        產生的檔案路徑列表
+    """
+    _check_formats(formats)
+    if not days:
+        print("沒有足夠數據生成趨勢報告。")
+        return []
+
+    labels = [d["day"][5:] for d in days]  # MM-DD
+    x = np.arange(len(days))
+    hours = {key: np.array([d[key] for d in days]) / 3600 for key in ("good_s", "warning_s", "bad_s", "away_s")}
+    avg_scores = np.array([d["avg_score"] if d["avg_score"] is not None else np.nan for d in days])
+    samples = np.array([d["samples"] for d in days], dtype=np.float64)
+    episodes = np.array([d["bad_episodes"] for d in days])
+
+    fig = _new_figure((10, 7))
+    ax_time, ax_score = fig.subplots(2, 1, sharex=True)
+
+    # 上圖：每天各狀態的時數 (堆疊長條)
+    bottom = np.zeros(len(days))
+    for key, label, color in (("good_s", "Good", "green"), ("warning_s", "Warning", "gold"),
+                              ("bad_s", "Bad", "red"), ("away_s", "Away", "orange")):
+        ax_time.bar(x, hours[key], bottom=bottom, color=color, alpha=0.7, label=label)
+        bottom += hours[key]
+    ax_time.set_ylabel("Hours")
+    ax_time.legend(loc='upper left')
+    ax_time.grid(True, axis='y', alpha=0.3)
+
+    # 下圖：每天平均分數與 bad 次數
+    ax_score.plot(x, avg_scores, marker='o', color='blue', label='Avg Score')
+    ax_score.axhline(y=80, color='g', linestyle='--', label='Excellent (80)')
+    ax_score.set_ylim(0, 105)
+    ax_score.set_ylabel("Score")
+    ax_score.grid(True, alpha=0.3)
+    ax_episodes = ax_score.twinx()
+    ax_episodes.bar(x, episodes, color='red', alpha=0.2, label='Bad Episodes')
+    ax_episodes.set_ylabel("Bad Episodes")
+    ax_score.legend(loc='lower left')
+    ax_score.set_xticks(x)
+    ax_score.set_xticklabels(labels)
+
+    title = f"Posture Trend ({days[0]['day']} ~ {days[-1]['day']})"
+    fig.suptitle(title)
+
+    total_samples = samples.sum()
+    overall = float(np.nansum(avg_scores * samples) / total_samples) if total_samples else 0.0
+    monitored = hours["good_s"].sum() + hours["warning_s"].sum() + hours["bad_s"].sum()
+    good_ratio = hours["good_s"].sum() / monitored * 100 if monitored > 0 else 0.0
+    info_text = (f"Days: {len(days)}\n"
+                 f"Monitored: {monitored:.1f} h\n"
+                 f"Avg Score: {overall:.1f}\n"
+                 f"Good Posture: {good_ratio:.1f}%\n"
+                 f"Bad Episodes: {int(episodes.sum())}")
+
+    base = os.path.join(output_dir, f"posture_trend_{int(time.time())}")
+    paths = []
+    for fmt in formats:
+        path = f"{base}.{fmt}"
+        if fmt == "html":
+            _write_html(path, fig, title, info_text)
+        else:
+            fig.savefig(path)
+        paths.append(path)
+        print(f"趨勢報告已儲存為: {path}")
+
+    if show and paths:
+        webbrowser.open("file://" + os.path.abspath(paths[-1]))
+    return paths
@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+
+# 評分與追蹤用到的上半身關鍵點：鼻子、雙眼、雙耳、雙肩
+UPPER_BODY_LANDMARKS = (0, 2, 5, 7, 8, 11, 12)
+
+
+class UpperBodyROI:
+    """
+    上半身 ROI 追蹤：只把上一幀偵測到的上半身附近 (加上邊界) 裁切、縮小後送進 Pose 模型，
+    再把關鍵點換算回全畫面座標，後續的 extract_face_shoulder_features 與繪圖不需要改動。
+    偵測不到人時立即退回全畫面。
+    為了不打斷 MediaPipe 內部的追蹤，只有在人快要離開裁切範圍，
+    或裁切範圍明顯比需要的大時才移動裁切框。
+    """
+    def __init__(self, margin=0.8, max_input_width=480, min_fraction=0.25, shrink_ratio=2.0):
+        self.margin = margin                    # 邊界 (相對於上半身框的較長邊)
+        self.max_input_width = max_input_width  # 裁切後送進模型的最大寬度 (像素)
+        self.min_fraction = min_fraction        # 裁切框至少佔畫面寬高的比例
+        self.shrink_ratio = shrink_ratio        # 目前框面積超過需要的幾倍才縮小
+        self.rect = None                        # (x0, y0, x1, y1) 像素座標，None 表示全畫面
+
+    def prepare(self, frame_bgr):
+        """
+        依目前的 ROI 裁切並縮小畫面，轉成 RGB。
+
+        Returns:
+            (frame_rgb, rect)：rect 需在 restore() 時傳回
+        """
+        h, w = frame_bgr.shape[:2]
+        rect = self.rect
+        if rect is None:
+            return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB), (0, 0, w, h)
+
+        x0, y0, x1, y1 = rect
+        crop = frame_bgr[y0:y1, x0:x1]  # view，不複製
+        crop_w = x1 - x0
+        if crop_w > self.max_input_width:
+            scale = self.max_input_width / crop_w
+            size = (self.max_input_width, max(1, int((y1 - y0) * scale)))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), rect
+
+    def restore(self, results, rect, frame_shape):
+        """
+        把 Pose 結果換算回全畫面座標 (就地修改 landmarks)，並更新下一幀的 ROI。
+
+        Returns:
+            換算後的 results；segmentation_mask 會貼回全畫面大小
+        """
+        h, w = frame_shape[:2]
+        x0, y0, x1, y1 = rect
+        crop_w, crop_h = x1 - x0, y1 - y0
+        is_full = (x0, y0, crop_w, crop_h) == (0, 0, w, h)
+
+        pose_landmarks = results.pose_landmarks
+        if pose_landmarks is not None and not is_full:
+            for lm in pose_landmarks.landmark:
+                lm.x = (x0 + lm.x * crop_w) / w
+                lm.y = (y0 + lm.y * crop_h) / h
+                lm.z = lm.z * crop_w / w
+
+        mask = getattr(results, "segmentation_mask", None)
+        if mask is not None and not is_full:
+            full_mask = np.zeros((h, w), dtype=np.float32)
+            full_mask[y0:y1, x0:x1] = cv2.resize(mask, (crop_w, crop_h), interpolation=cv2.INTER_LINEAR)
+            results = results._replace(segmentation_mask=full_mask)
+
+        self._update(pose_landmarks, w, h)
+        return results
+
+    def _update(self, pose_landmarks, w, h):
+        if pose_landmarks is None:
+            self.rect = None  # 追蹤失敗，下一幀用全畫面重新偵測
+            return
+
+        landmarks = pose_landmarks.landmark
+        xs = np.array([landmarks[i].x for i in UPPER_BODY_LANDMARKS]) * w
+        ys = np.array([landmarks[i].y for i in UPPER_BODY_LANDMARKS]) * h
+        bx0, bx1 = xs.min(), xs.max()
+        by0, by1 = ys.min(), ys.max()
+
+        # 邊界：上方與兩側各留 margin，下方多留一些讓模型看到胸口
+        pad = self.margin * max(bx1 - bx0, by1 - by0)
+        cx = (bx0 + bx1) / 2
+        half_w = max((bx1 - bx0) / 2 + pad, w * self.min_fraction / 2)
+        top = by0 - pad
+        bottom = max(by1 + pad * 1.5, top + h * self.min_fraction)
+        target = (
+            int(max(0, cx - half_w)), int(max(0, top)),
+            int(min(w, cx + half_w)), int(min(h, bottom)),
+        )
+        if target[2] - target[0] < 2 or target[3] - target[1] < 2:
+            self.rect = None
+            return
+
+        if self.rect is None or not self._contains(self.rect, target) or \
+                self._area(self.rect) > self.shrink_ratio * self._area(target):
+            self.rect = target
+
+    @staticmethod
+    def _contains(outer, inner):
+        return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+    @staticmethod
+    def _area(rect):
+        return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+    def reset(self):
+        self.rect = None
@@ -0,0 +1,154 @@
+"""
+每分鐘彙總 (rollup) 與多日報告。
+
+每次程式結束時，把這次 session 的每分鐘統計 (平均分數、good / warning / bad 秒數、
+離席秒數、bad 次數) 累加進 SQLite 資料庫，週報只需要讀幾千列，不必重新掃描原始資料。
+
+產生最近 7 天的趨勢報告：
+    python Codes/rollups.py --days 7
+"""
+import argparse
+import sqlite3
+import time
+
+ROLLUP_DB_PATH = "rollups.sqlite3"
+MAX_SAMPLE_GAP = 1.0  # 兩次評分間隔超過此秒數時不計入狀態時間 (離席、確認中)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS minute_rollups (
+    minute INTEGER PRIMARY KEY,   -- Unix 時間 // 60
+    samples INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    good_s REAL NOT NULL,
+    warning_s REAL NOT NULL,
+    bad_s REAL NOT NULL,
+    away_s REAL NOT NULL,
+    bad_episodes INTEGER NOT NULL
+)
+"""
+_FIELDS = ("samples", "score_sum", "good_s", "warning_s", "bad_s", "away_s", "bad_episodes")
+
+
+class RollupAccumulator:
+    """
+    在 session 進行中累積每分鐘的統計。
+    狀態使用 PostureHistory 的分類結果 (history.current_state)，
+    bad 次數的定義也與 PostureHistory 相同 (從其他狀態進入 bad 算一次；
+    第一筆資料只決定起始狀態，以 bad 開始的 session 不算一次)。
+    """
+    def __init__(self):
+        self.minutes = {}   # minute -> [samples, score_sum, good_s, warning_s, bad_s, away_s, bad_episodes]
+        self.last_timestamp = None
+        self.last_state = None
+
+    def _row(self, minute):
+        row = self.minutes.get(minute)
+        if row is None:
+            row = self.minutes[minute] = [0, 0.0, 0.0, 0.0, 0.0, 0.0, 0]
+        return row
+
+    def add_sample(self, timestamp, score, state):
+        row = self._row(int(timestamp // 60))
+        row[0] += 1
+        row[1] += score
+
+        dt = 0.0
+        if self.last_timestamp is not None:
+            dt = timestamp - self.last_timestamp
+            if dt < 0 or dt > MAX_SAMPLE_GAP:
+                dt = 0.0
+        if state == "good":
+            row[2] += dt
+        elif state == "warning":
+            row[3] += dt
+        elif state == "bad":
+            row[4] += dt
+            if self.last_state is not None and self.last_state != "bad":
+                row[6] += 1
+
+        self.last_timestamp = timestamp
+        self.last_state = state
+
+    def add_away(self, start, end):
+        """離席時段 (Unix 時間)，跨分鐘時依比例拆開"""
+        t = start
+        while t < end:
+            minute = int(t // 60)
+            boundary = min(end, (minute + 1) * 60)
+            self._row(minute)[5] += boundary - t
+            t = boundary
+
+    def rows(self):
+        return [(minute, *values) for minute, values in sorted(self.minutes.items())]
+
+
+class RollupStore:
+    """每分鐘彙總的 SQLite 儲存"""
+    def __init__(self, path=ROLLUP_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(_SCHEMA)
+
+    def merge(self, rows):
+        """累加一批每分鐘統計 (同一分鐘的資料會相加，可重複合併多個 session)"""
+        updates = ", ".join(f"{f} = {f} + excluded.{f}" for f in _FIELDS)
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO minute_rollups (minute, {', '.join(_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT(minute) DO UPDATE SET {updates}",
+                rows,
+            )
+
+    def daily(self, start_ts, end_ts):
+        """
+        依當地日期彙總。
+        Returns:
+            [{"day", "avg_score", "samples", "good_s", "warning_s", "bad_s", "away_s", "bad_episodes"}, ...]
+        """
+        cursor = self.conn.execute(
+            "SELECT date(minute * 60, 'unixepoch', 'localtime') AS day, "
+            "SUM(score_sum), SUM(samples), SUM(good_s), SUM(warning_s), SUM(bad_s), SUM(away_s), SUM(bad_episodes) "
+            "FROM minute_rollups WHERE minute >= ? AND minute < ? GROUP BY day ORDER BY day",
+            (int(start_ts // 60), int(end_ts // 60) + 1),
+        )
+        days = []
+        for day, score_sum, samples, good_s, warning_s, bad_s, away_s, episodes in cursor:
+            days.append({
+                "day": day,
+                "avg_score": score_sum / samples if samples else None,
+                "samples": samples,
+                "good_s": good_s,
+                "warning_s": warning_s,
+                "bad_s": bad_s,
+                "away_s": away_s,
+                "bad_episodes": episodes,
+            })
+        return days
+
+    def close(self):
+        self.conn.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="多日姿勢趨勢報告")
+    parser.add_argument("--days", type=int, default=7, help="報告涵蓋的天數 (預設 7)")
+    parser.add_argument("--db", default=ROLLUP_DB_PATH, help="每分鐘彙總資料庫")
+    parser.add_argument("--report-format", default="png", help="輸出格式，以逗號分隔 (png / svg / html)")
+    args = parser.parse_args()
+    from report_generator import parse_report_formats
+    try:
+        args.report_formats = parse_report_formats(args.report_format)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+if __name__ == "__main__":
+    from report_generator import generate_trend_report
+
+    args = parse_args()
+    store = RollupStore(args.db)
+    now = time.time()
+    days = store.daily(now - args.days * 86400, now)
+    store.close()
+    generate_trend_report(days, formats=args.report_formats)
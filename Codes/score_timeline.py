@@ -0,0 +1,167 @@
+import numpy as np
+
+GOOD_SCORE_THRESHOLD = 80  # 報告中「姿勢良好」的分數門檻 (分數 > 80)
+
+
+class _BucketRing:
+    """固定容量的 (開始時間, 最小值, 平均值, 最大值) 環狀緩衝區"""
+    def __init__(self, capacity):
+        self.start = np.zeros(capacity, dtype=np.float64)
+        self.lo = np.zeros(capacity, dtype=np.float32)
+        self.mean = np.zeros(capacity, dtype=np.float32)
+        self.hi = np.zeros(capacity, dtype=np.float32)
+        self.index = 0
+        self.count = 0
+
+    def push(self, start, lo, mean, hi):
+        i = self.index
+        self.start[i] = start
+        self.lo[i] = lo
+        self.mean[i] = mean
+        self.hi[i] = hi
+        self.index = (i + 1) % len(self.start)
+        self.count = min(self.count + 1, len(self.start))
+
+    def ordered(self):
+        """依時間順序回傳 (start, lo, mean, hi)"""
+        n = len(self.start)
+        if self.count < n:
+            order = slice(0, self.count)
+            return self.start[order], self.lo[order], self.mean[order], self.hi[order]
+        order = np.r_[self.index:n, 0:self.index]
+        return self.start[order], self.lo[order], self.mean[order], self.hi[order]
+
+
+class _Accumulator:
+    """累積一個時間區間內的最小值、總和、筆數與最大值"""
+    __slots__ = ("start", "lo", "total", "count", "hi")
+
+    def __init__(self):
+        self.start = None
+        self.lo = self.hi = self.total = 0.0
+        self.count = 0
+
+    def reset(self, start):
+        self.start = start
+        self.lo = float("inf")
+        self.hi = float("-inf")
+        self.total = 0.0
+        self.count = 0
+
+    def add(self, lo, total, count, hi):
+        if lo < self.lo:
+            self.lo = lo
+        if hi > self.hi:
+            self.hi = hi
+        self.total += total
+        self.count += count
+
+
+class ScoreTimeline:
+    """
+    長時間的 (時間, 分數) 記錄，記憶體用量固定。
+    - 最近 raw_capacity 筆保留原始資料
+    - 較舊的資料保留每秒的 min / mean / max (second_capacity 個)
+    - 更舊的資料保留每分鐘的 min / mean / max (minute_capacity 個)
+    取代原本不斷成長的 [(elapsed, score), ...] 列表，可直接交給 generate_report。
+    """
+    def __init__(self, raw_capacity=18000, second_capacity=3600, minute_capacity=7 * 24 * 60):
+        self.raw_t = np.zeros(raw_capacity, dtype=np.float64)
+        self.raw_s = np.zeros(raw_capacity, dtype=np.float32)
+        self.raw_index = 0
+        self.raw_count = 0
+        self.seconds = _BucketRing(second_capacity)
+        self.minutes = _BucketRing(minute_capacity)
+        self._second = _Accumulator()
+        self._minute = _Accumulator()
+
+        # 整個 session 的統計 (不受降採樣影響)
+        self.total_count = 0
+        self.total_score = 0.0
+        self.good_count = 0
+
+    def add(self, t, score):
+        i = self.raw_index
+        self.raw_t[i] = t
+        self.raw_s[i] = score
+        self.raw_index = (i + 1) % len(self.raw_t)
+        if self.raw_count < len(self.raw_t):
+            self.raw_count += 1
+
+        self.total_count += 1
+        self.total_score += score
+        if score > GOOD_SCORE_THRESHOLD:
+            self.good_count += 1
+
+        # 每秒的區間
+        second_start = float(int(t))
+        if self._second.start != second_start:
+            self._close_second()
+            self._second.reset(second_start)
+        self._second.add(score, score, 1, score)
+
+    def _close_second(self):
+        sec = self._second
+        if sec.start is None or sec.count == 0:
+            return
+        self.seconds.push(sec.start, sec.lo, sec.total / sec.count, sec.hi)
+
+        minute_start = float(int(sec.start // 60) * 60)
+        if self._minute.start != minute_start:
+            self._close_minute()
+            self._minute.reset(minute_start)
+        self._minute.add(sec.lo, sec.total, sec.count, sec.hi)
+
+    def _close_minute(self):
+        minute = self._minute
+        if minute.start is None or minute.count == 0:
+            return
+        self.minutes.push(minute.start, minute.lo, minute.total / minute.count, minute.hi)
+
+    def __len__(self):
+        return self.total_count
+
+    def stats(self):
+        """整個 session 的平均分數與良好比例 (%)"""
+        if self.total_count == 0:
+            return {"count": 0, "avg_score": 0.0, "good_ratio": 0.0}
+        return {
+            "count": self.total_count,
+            "avg_score": self.total_score / self.total_count,
+            "good_ratio": self.good_count / self.total_count * 100,
+        }
+
+    def raw(self):
+        """依時間順序回傳保留的原始資料 (times, scores)"""
+        n = len(self.raw_t)
+        if self.raw_count < n:
+            return self.raw_t[:self.raw_count], self.raw_s[:self.raw_count]
+        order = np.r_[self.raw_index:n, 0:self.raw_index]
+        return self.raw_t[order], self.raw_s[order]
+
+    def series(self):
+        """
+        合併三種解析度，回傳整個 session 的 (times, mean, lo, hi)：
+        舊的部分來自每分鐘區間，中間來自每秒區間，最近的部分是原始資料 (lo = hi = 分數)。
+        跨越交界的區間仍然保留 (否則交界處會缺最多 59 秒)，繪圖時間取它在交界之前那一段的中點。
+        """
+        raw_t, raw_s = self.raw()
+        raw_start = raw_t[0] if len(raw_t) else np.inf
+
+        sec_start, sec_lo, sec_mean, sec_hi = self.seconds.ordered()
+        keep = sec_start < raw_start
+        sec_start, sec_lo, sec_mean, sec_hi = sec_start[keep], sec_lo[keep], sec_mean[keep], sec_hi[keep]
+        boundary = sec_start[0] if len(sec_start) else raw_start
+
+        min_start, min_lo, min_mean, min_hi = self.minutes.ordered()
+        keep = min_start < boundary
+        min_start, min_lo, min_mean, min_hi = min_start[keep], min_lo[keep], min_mean[keep], min_hi[keep]
+
+        # 區間以中點作為繪圖時間 (區間結尾不超過下一種解析度的開頭)
+        min_end = np.minimum(min_start + 60, boundary)
+        sec_end = np.minimum(sec_start + 1, raw_start)
+        times = np.concatenate([(min_start + min_end) / 2, (sec_start + sec_end) / 2, raw_t])
+        mean = np.concatenate([min_mean, sec_mean, raw_s])
+        lo = np.concatenate([min_lo, sec_lo, raw_s])
+        hi = np.concatenate([min_hi, sec_hi, raw_s])
+        return times, mean, lo, hi
@@ -0,0 +1,213 @@
+"""
+在場偵測、回座確認、番茄鐘與低分警告的狀態機。
+
+不依賴 OpenCV、MediaPipe 或真實時間：主迴圈每幀呼叫 tick(timestamp, present, score)，
+取回這一幀發生的事件 (警告、離席、回座、該休息了)，畫面與語音由呼叫端處理。
+時間可以注入 (clock 參數或每次 tick 的 timestamp)，因此能用模擬的資料快速跑完數小時的 session：
+    python Codes/session_engine.py --hours 8 --fps 30
+"""
+import argparse
+import random
+import time
+from collections import namedtuple
+
+POMODORO_LIMIT_SECONDS = 30 * 60   # 久坐提醒時間
+LOW_SCORE_THRESHOLD = 70           # 低於幾分開始警告
+LOW_SCORE_DEBOUNCE = 1.5           # 低分持續多久才警告 (秒)
+WARNING_COOLDOWN = 5.0             # 兩次低分警告的最短間隔 (秒)
+RETURN_DEBOUNCE = 3.0              # 回到座位後需持續被偵測多久才算回來 (秒)
+BREAK_REMINDER_INTERVAL = 5.0      # 時間到之後重複提醒的間隔 (秒)
+
+# 事件種類
+WARN = "warn"                      # 低分持續，提醒坐好
+USER_AWAY = "user_away"            # 用戶離席，計時器暫停
+USER_RETURNING = "user_returning"  # 偵測到用戶，開始回座確認
+USER_BACK = "user_back"            # 回座確認完成，計時器重置
+BREAK_DUE = "break_due"            # 久坐時間到 (每 BREAK_REMINDER_INTERVAL 秒一次)
+
+SessionEvent = namedtuple("SessionEvent", "kind timestamp")
+
+_NO_EVENTS = ()
+
+
+class SessionEngine:
+    """
+    以 tick 驅動的 session 狀態機。
+    calibrated 由呼叫端在校正完成後設為 True；校正完成前不會進入回座確認。
+    離席時段 away_periods 以距離 start_time 的秒數記錄 [(start, end), ...]。
+    """
+    def __init__(self, clock=time.time, pomodoro_limit=POMODORO_LIMIT_SECONDS,
+                 low_score_threshold=LOW_SCORE_THRESHOLD, low_score_debounce=LOW_SCORE_DEBOUNCE,
+                 warning_cooldown=WARNING_COOLDOWN, return_debounce=RETURN_DEBOUNCE,
+                 break_reminder_interval=BREAK_REMINDER_INTERVAL):
+        self.clock = clock
+        self.pomodoro_limit = pomodoro_limit
+        self.low_score_threshold = low_score_threshold
+        self.low_score_debounce = low_score_debounce
+        self.warning_cooldown = warning_cooldown
+        self.return_debounce = return_debounce
+        self.break_reminder_interval = break_reminder_interval
+
+        now = clock()
+        self.start_time = now
+        self.pomodoro_start = now
+        self.calibrated = False
+        self.present = False             # 這一幀是否偵測到用戶
+        self.confirmed_back = True       # 用戶是否已確認回來 (番茄鐘只在確認後運行)
+        self.return_start = None         # 回座確認開始時間
+        self.pause_start = None          # 離席開始時間
+        self.low_score_start = None      # 低分開始時間
+        self.last_warning = None         # 上次低分警告時間
+        self.last_break_reminder = None  # 上次久坐提醒時間
+        self.last_timestamp = now
+        self.away_periods = []
+
+    # --- 狀態查詢 ---
+    @property
+    def confirming(self):
+        """是否正在回座確認 (這段時間不評分)"""
+        return self.return_start is not None and not self.confirmed_back and self.calibrated
+
+    @property
+    def timer_running(self):
+        return self.present and self.confirmed_back
+
+    @property
+    def time_left(self):
+        """番茄鐘剩餘秒數 (以最近一次 tick 的時間計算)；計時暫停時為 None"""
+        if not self.timer_running:
+            return None
+        return self.pomodoro_limit - (self.last_timestamp - self.pomodoro_start)
+
+    def confirm_elapsed(self):
+        """回座確認已經過的秒數與進度 (0 ~ 1)"""
+        elapsed = self.last_timestamp - self.return_start if self.return_start is not None else 0.0
+        return elapsed, min(elapsed / self.return_debounce, 1.0)
+
+    def needs_score(self, present):
+        """這一幀 tick 是否會使用分數 (在場、已校正且不在回座確認中)，讓呼叫端省下不需要的評分"""
+        if not present or not self.calibrated:
+            return False
+        if self.confirmed_back:
+            return True
+        starts_confirming = not self.present and self.return_start is None
+        return not (starts_confirming or self.return_start is not None)
+
+    # --- 驅動 ---
+    def tick(self, timestamp=None, present=False, score=None):
+        """
+        推進一幀。score 只在 needs_score() 為 True 的幀有意義，其他幀會被忽略。
+        回傳這一幀的事件 (SessionEvent 的 tuple 或 list)。
+        """
+        t = self.clock() if timestamp is None else timestamp
+        self.last_timestamp = t
+        events = _NO_EVENTS
+
+        if present:
+            if not self.present and self.calibrated and not self.confirmed_back and self.return_start is None:
+                self.return_start = t
+                events = [SessionEvent(USER_RETURNING, t)]
+
+            if self.confirming:
+                if t - self.return_start >= self.return_debounce:
+                    # 穩定坐下 return_debounce 秒，確認回來並重置番茄鐘
+                    self.pomodoro_start = t
+                    if self.pause_start is not None:
+                        self.away_periods.append((self.pause_start - self.start_time, t - self.start_time))
+                    self.pause_start = None
+                    self.confirmed_back = True
+                    self.return_start = None
+                    events = [SessionEvent(USER_BACK, t)]
+            elif self.calibrated and score is not None:
+                if score < self.low_score_threshold:
+                    if self.low_score_start is None:
+                        self.low_score_start = t
+                    elif t - self.low_score_start >= self.low_score_debounce and \
+                            (self.last_warning is None or t - self.last_warning > self.warning_cooldown):
+                        self.last_warning = t
+                        events = [SessionEvent(WARN, t)]
+                else:
+                    self.low_score_start = None
+        else:
+            if self.present:
+                if self.pause_start is None:
+                    # 回座確認中又離開時仍是同一次離席，保留原本的開始時間
+                    self.pause_start = t
+                self.confirmed_back = False
+                events = [SessionEvent(USER_AWAY, t)]
+            self.return_start = None
+            self.low_score_start = None
+
+        self.present = present
+
+        if present and self.confirmed_back and t - self.pomodoro_start >= self.pomodoro_limit:
+            if self.last_break_reminder is None or t - self.last_break_reminder > self.break_reminder_interval:
+                self.last_break_reminder = t
+                if events is _NO_EVENTS:
+                    events = []
+                events.append(SessionEvent(BREAK_DUE, t))
+        return events
+
+    def reset_timer(self, timestamp=None):
+        """手動重置番茄鐘：只有用戶在場且時間已到時允許，回傳是否重置"""
+        t = self.clock() if timestamp is None else timestamp
+        if not self.present or self.pomodoro_limit - (t - self.pomodoro_start) > 0:
+            return False
+        self.pomodoro_start = t
+        return True
+
+    def finish(self, timestamp=None):
+        """結束 session：離席中結束時記錄最後一個離席時段"""
+        t = self.clock() if timestamp is None else timestamp
+        if self.pause_start is not None:
+            self.away_periods.append((self.pause_start - self.start_time, t - self.start_time))
+            self.pause_start = None
+        return self.away_periods
+
+
+def simulate(engine, hours, fps=30, seed=0):
+    """
+    以模擬的在場 / 分數序列執行 engine：每隔幾分鐘離席一段時間，分數在好壞之間隨機漂移。
+    回傳 (tick 數, 各種事件的次數)。
+    """
+    rng = random.Random(seed)
+    dt = 1.0 / fps
+    t = engine.start_time
+    end = t + hours * 3600
+    ticks = 0
+    counts = {}
+    present = True
+    next_switch = t + rng.uniform(600, 1800)
+    score = 90
+    while t < end:
+        if t >= next_switch:
+            present = not present
+            next_switch = t + (rng.uniform(600, 1800) if present else rng.uniform(30, 300))
+        if ticks % fps == 0:
+            score = min(100, max(0, score + rng.randint(-6, 6)))
+        for event in engine.tick(t, present, score if engine.needs_score(present) else None):
+            counts[event.kind] = counts.get(event.kind, 0) + 1
+        ticks += 1
+        t += dt
+    engine.finish(t)
+    return ticks, counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="以模擬資料執行 session 狀態機")
+    parser.add_argument("--hours", type=float, default=8.0, help="模擬的 session 長度 (小時)")
+    parser.add_argument("--fps", type=int, default=30, help="每秒 tick 數")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    engine = SessionEngine(clock=lambda: 0.0)
+    engine.calibrated = True
+    begin = time.perf_counter()
+    ticks, counts = simulate(engine, args.hours, args.fps, args.seed)
+    seconds = time.perf_counter() - begin
+    print(f"{ticks} ticks，{seconds:.2f} 秒 ({ticks / seconds:,.0f} ticks/s)")
+    print(f"事件: {counts}")
+    print(f"離席 {len(engine.away_periods)} 次，共 {sum(e - s for s, e in engine.away_periods) / 60:.1f} 分鐘")
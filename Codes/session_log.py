@@ -0,0 +1,213 @@
+"""
+每幀特徵與分數的二進位 session 記錄檔 (append-only，欄式區塊)。
+
+檔案格式 (little-endian)：
+    檔頭：MAGIC (8 bytes) + uint32 schema 長度 + schema JSON (補齊到 8 bytes 的倍數)
+    區塊：BLOCK_MAGIC (4) + uint32 列數 + uint32 payload 長度 + uint32 payload CRC32
+          payload 為各欄位連續存放的陣列，每欄補齊到 8 bytes
+寫入在背景執行緒批次進行，主迴圈不會等待磁碟。
+讀取時以 memmap 直接取得各欄位的 view (不複製)；
+程式當掉造成最後一個區塊不完整時，該區塊會被略過，其餘資料照常可讀。
+
+查看記錄檔摘要：
+    python Codes/session_log.py sessions/session_20250101_090000.plog
+"""
+import json
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b"PSLOG\x00\x00\x01"
+BLOCK_MAGIC = b"BLK1"
+BLOCK_HEADER = struct.Struct("<4sIII")
+
+NO_SCORE = 255   # 該幀沒有評分 (離席、校正中)
+STATE_CODES = {"good": 0, "warning": 1, "bad": 2}
+NO_STATE = 255
+
+FEATURE_COLUMNS = (
+    "shoulder_tilt_deg",
+    "head_roll_deg",
+    "head_roll_raw",
+    "eye_dist_px",
+    "distance_indicator",
+    "nose_shoulder_angle",
+)
+PENALTY_COLUMNS = ("shoulder_tilt", "head_roll", "head_distance", "hunchback")
+
+# (欄位名稱, dtype)
+COLUMNS = (
+    [("timestamp", "<f8")]
+    + [(name, "<f4") for name in FEATURE_COLUMNS]
+    + [(f"pen_{name}", "u1") for name in PENALTY_COLUMNS]
+    + [("score", "u1"), ("present", "u1"), ("state", "u1")]
+)
+
+
+def _padded(nbytes):
+    return (nbytes + 7) // 8 * 8
+
+
+class SessionLogWriter:
+    """
+    批次寫入 session 記錄檔。
+    append() 只把資料寫進預先配置的暫存陣列，滿 batch_rows 列才交給背景執行緒寫檔。
+    """
+    def __init__(self, path, batch_rows=256):
+        self.path = path
+        self.batch_rows = batch_rows
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            schema = json.dumps({"columns": COLUMNS}).encode("utf-8")
+            schema += b" " * (_padded(len(schema) + 12) - len(schema) - 12)
+            self._file.write(MAGIC + struct.pack("<I", len(schema)) + schema)
+            self._file.flush()
+
+        self._queue = queue.Queue()
+        self._batch = self._new_batch()
+        self._rows = 0
+        self._thread = threading.Thread(target=self._writer, name="session-log", daemon=True)
+        self._thread.start()
+
+    def _new_batch(self):
+        return {name: np.zeros(self.batch_rows, dtype=dtype) for name, dtype in COLUMNS}
+
+    def append(self, timestamp, result_dict=None, present=False, state=None):
+        """
+        記錄一幀。
+        Args:
+            timestamp: 時間戳記 (秒)
+            result_dict: PostureScore.compute() 的結果；None 表示該幀沒有評分
+            present: 是否偵測到用戶
+            state: PostureHistory 的狀態 ("good" / "warning" / "bad")
+        """
+        batch = self._batch
+        i = self._rows
+        batch["timestamp"][i] = timestamp
+        if result_dict is not None:
+            features = result_dict["features"]
+            for name in FEATURE_COLUMNS:
+                batch[name][i] = features.get(name, np.nan)
+            penalties = result_dict["penalties"]
+            for name in PENALTY_COLUMNS:
+                batch[f"pen_{name}"][i] = penalties.get(name, 0)
+            batch["score"][i] = result_dict["score"]
+        else:
+            for name in FEATURE_COLUMNS:
+                batch[name][i] = np.nan
+            for name in PENALTY_COLUMNS:
+                batch[f"pen_{name}"][i] = 0
+            batch["score"][i] = NO_SCORE
+        batch["present"][i] = 1 if present else 0
+        batch["state"][i] = STATE_CODES.get(state, NO_STATE)
+
+        self._rows += 1
+        if self._rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """把目前暫存的列交給背景執行緒寫入"""
+        if self._rows == 0:
+            return
+        self._queue.put((self._batch, self._rows))
+        self._batch = self._new_batch()
+        self._rows = 0
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, rows = item
+            payload = bytearray()
+            for name, _ in COLUMNS:
+                data = batch[name][:rows].tobytes()
+                payload += data
+                payload += b"\0" * (_padded(len(data)) - len(data))
+            header = BLOCK_HEADER.pack(BLOCK_MAGIC, rows, len(payload), zlib.crc32(payload))
+            try:
+                self._file.write(header + payload)
+                self._file.flush()
+            except OSError as e:
+                print(f"寫入 session 記錄失敗: {e}")
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+class SessionLogReader:
+    """以 memmap 讀取 session 記錄檔，各欄位直接是檔案內容的 view"""
+    def __init__(self, path):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode="r")
+        head = bytes(self._mm[:12])
+        if len(head) < 12 or head[:8] != MAGIC:
+            raise ValueError(f"{path} 不是 session 記錄檔")
+        schema_len = struct.unpack("<I", head[8:12])[0]
+        schema = json.loads(bytes(self._mm[12:12 + schema_len]).decode("utf-8"))
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in schema["columns"]]
+        self._data_start = 12 + schema_len
+        self.skipped_bytes = 0
+
+    def blocks(self):
+        """逐一產生每個完整區塊的欄位 view：{欄位名稱: ndarray}"""
+        mm = self._mm
+        offset = self._data_start
+        end = len(mm)
+        while offset + BLOCK_HEADER.size <= end:
+            magic, rows, length, crc = BLOCK_HEADER.unpack(bytes(mm[offset:offset + BLOCK_HEADER.size]))
+            payload_start = offset + BLOCK_HEADER.size
+            if magic != BLOCK_MAGIC or payload_start + length > end or \
+                    zlib.crc32(mm[payload_start:payload_start + length]) != crc:
+                break  # 不完整或損毀的尾端區塊
+            block = {}
+            col_offset = payload_start
+            for name, dtype in self.columns:
+                block[name] = np.frombuffer(mm, dtype=dtype, count=rows, offset=col_offset)
+                col_offset += _padded(rows * dtype.itemsize)
+            yield block
+            offset = payload_start + length
+        self.skipped_bytes = end - offset
+
+    def read(self, names=None):
+        """把所有區塊接成完整的欄位陣列 (會複製)；names 可只挑選部分欄位"""
+        names = names or [name for name, _ in self.columns]
+        parts = {name: [] for name in names}
+        for block in self.blocks():
+            for name in names:
+                parts[name].append(block[name])
+        return {
+            name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=dict(self.columns)[name])
+            for name, chunks in parts.items()
+        }
+
+
+def new_session_path(log_dir):
+    return os.path.join(log_dir, time.strftime("session_%Y%m%d_%H%M%S.plog"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("用法: python Codes/session_log.py <記錄檔>")
+        sys.exit(1)
+    reader = SessionLogReader(sys.argv[1])
+    data = reader.read(["timestamp", "score", "present"])
+    scored = data["score"] != NO_SCORE
+    print(f"幀數: {len(data['timestamp'])}")
+    if len(data["timestamp"]):
+        print(f"時間: {time.ctime(data['timestamp'][0])} ~ {time.ctime(data['timestamp'][-1])}")
+        print(f"在場比例: {data['present'].mean() * 100:.1f}%")
+    if scored.any():
+        print(f"平均分數: {data['score'][scored].mean():.1f}")
+    if reader.skipped_bytes:
+        print(f"略過不完整的尾端資料: {reader.skipped_bytes} bytes")
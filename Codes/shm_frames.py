@@ -0,0 +1,282 @@
+"""
+跨行程的共享記憶體影像環狀緩衝 (multiprocessing.shared_memory)。
+
+擷取行程把 cap.read() 與 cv2.remap 的結果直接寫進共享記憶體的 slot，
+推論行程把 slot 包成 NumPy view 交給 cv2.cvtColor / pose.process，整張畫面都不經過 pickle 或複製。
+
+每個 slot 有狀態與序號：
+    FREE -> WRITING (擷取端寫入中) -> READY (序號遞增) -> READING (推論端使用中) -> FREE
+讀取端永遠拿序號最新的 READY slot，較舊的 READY slot 直接丟棄 (與 LatestQueue 相同的策略)；
+寫入端沒有空的 slot 時覆寫最舊的 READY slot，不會等待讀取端。
+"""
+import multiprocessing
+import signal
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+FREE, WRITING, READY, READING = 0, 1, 2, 3
+
+# 檔頭 (int64)：每個 slot 的 (狀態, 序號)，之後是 [下一個序號, 丟棄幀數, 已關閉, 攝影機已開啟]
+_NEXT_SEQ, _DROPPED, _CLOSED, _OPENED = 0, 1, 2, 3
+_COUNTERS = 4
+_HEADER_ALIGN = 64
+# 等待擷取行程開啟攝影機的上限 (秒)；包含 spawn 行程載入 cv2 與部分 USB 攝影機較慢的初始化
+CAMERA_OPEN_TIMEOUT = 10.0
+
+
+def _open_shared_memory(name, create, size):
+    """
+    建立或連接共享記憶體。只有建立端向 resource_tracker 登記並負責 unlink：
+    連接端若也登記，連接的行程使用自己的 tracker 時，結束時會把它當成洩漏而提早 unlink。
+    連接後再取消登記也不行：與建立端共用 tracker 時會連建立端的登記一起取消。
+    """
+    if create:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Python 3.12 以前沒有 track 參數：連接時暫時停用登記 (連接發生在擷取行程啟動時，只有一個執行緒)
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedFrameRing:
+    """
+    共享記憶體中的固定大小影像 slot。
+    建立端 (create=True) 配置記憶體；另一個行程以同樣的 name / shape / slots 與 cond 連接。
+    cond 為 multiprocessing.Condition，保護 slot 狀態並在有新幀時喚醒讀取端。
+    """
+    def __init__(self, shape, slots=3, dtype=np.uint8, name=None, create=True, cond=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_bytes = (slots * 2 + _COUNTERS) * 8
+        self._data_offset = (header_bytes + _HEADER_ALIGN - 1) // _HEADER_ALIGN * _HEADER_ALIGN
+        size = self._data_offset + self.frame_bytes * slots
+
+        self.shm = _open_shared_memory(name, create, size)
+        self.name = self.shm.name
+        self.owner = create
+        self.cond = cond if cond is not None else multiprocessing.get_context("spawn").Condition()
+
+        self._slot_table = np.ndarray((slots, 2), dtype=np.int64, buffer=self.shm.buf)
+        self._counters = np.ndarray((_COUNTERS,), dtype=np.int64, buffer=self.shm.buf, offset=slots * 2 * 8)
+        self.frames = [
+            np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf,
+                       offset=self._data_offset + i * self.frame_bytes)
+            for i in range(slots)
+        ]
+        if create:
+            self._slot_table[:] = 0
+            self._counters[:] = 0
+
+    def connect_args(self):
+        """在另一個行程以 SharedFrameRing(*args, create=False) 連接所需的參數"""
+        return self.shape, self.slots, self.dtype.str, self.name
+
+    # --- 寫入端 ---
+    def acquire_write(self):
+        """取得一個可寫入的 slot：優先用 FREE，沒有時覆寫最舊的 READY。回傳 (index, view)"""
+        with self.cond:
+            states = self._slot_table[:, 0]
+            free = np.flatnonzero(states == FREE)
+            if len(free):
+                index = int(free[0])
+            else:
+                ready = np.flatnonzero(states == READY)
+                if not len(ready):
+                    return None, None  # 讀取端占用了所有 slot (slots 至少要 3)
+                index = int(ready[np.argmin(self._slot_table[ready, 1])])
+                self._counters[_DROPPED] += 1
+            self._slot_table[index, 0] = WRITING
+        return index, self.frames[index]
+
+    def commit_write(self, index):
+        with self.cond:
+            self._counters[_NEXT_SEQ] += 1
+            self._slot_table[index] = (READY, self._counters[_NEXT_SEQ])
+            self.cond.notify_all()
+
+    def abort_write(self, index):
+        with self.cond:
+            self._slot_table[index, 0] = FREE
+
+    # --- 讀取端 ---
+    def acquire_read(self, timeout=None):
+        """
+        等待並取得最新的一幀，回傳 (index, seq, view)；
+        較舊的 READY slot 會被釋放 (計入丟棄)。逾時或已關閉時回傳 (None, None, None)。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while True:
+                states = self._slot_table[:, 0]
+                ready = np.flatnonzero(states == READY)
+                if len(ready):
+                    seqs = self._slot_table[ready, 1]
+                    index = int(ready[np.argmax(seqs)])
+                    for stale in ready:
+                        if stale != index:
+                            self._slot_table[stale, 0] = FREE
+                            self._counters[_DROPPED] += 1
+                    self._slot_table[index, 0] = READING
+                    return index, int(self._slot_table[index, 1]), self.frames[index]
+                if self._counters[_CLOSED]:
+                    return None, None, None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None, None, None
+                self.cond.wait(remaining)
+
+    def release_read(self, index):
+        with self.cond:
+            self._slot_table[index, 0] = FREE
+
+    # --- 共用 ---
+    @property
+    def dropped(self):
+        return int(self._counters[_DROPPED])
+
+    @property
+    def closed(self):
+        return bool(self._counters[_CLOSED])
+
+    @property
+    def opened(self):
+        return bool(self._counters[_OPENED])
+
+    def mark_opened(self):
+        with self.cond:
+            self._counters[_OPENED] = 1
+            self.cond.notify_all()
+
+    def wait_opened(self, timeout, alive=None):
+        """
+        等待寫入端回報攝影機已開啟；開啟失敗 (已關閉)、逾時或 alive() 為 False 時回傳 False。
+        alive: 選用的檢查函式 (例如寫入端行程是否還活著)，避免行程意外結束時空等到逾時
+        """
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while not self._counters[_OPENED] and not self._counters[_CLOSED]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (alive is not None and not alive()):
+                    break
+                self.cond.wait(min(remaining, 0.1))
+            return bool(self._counters[_OPENED])
+
+    def mark_closed(self):
+        with self.cond:
+            self._counters[_CLOSED] = 1
+            self.cond.notify_all()
+
+    def close(self):
+        # 釋放 view 之後才能關閉共享記憶體
+        self.frames = []
+        self._slot_table = None
+        self._counters = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _capture_process(ring_args, cond, stop_event, camera_index, frame_size, mapx, mapy):
+    """擷取行程：讀攝影機 (與畸變修正) 直接寫進共享記憶體"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    shape, slots, dtype, name = ring_args
+    ring = SharedFrameRing(shape, slots, dtype, name=name, create=False, cond=cond)
+    cap = None
+    # 需要 remap 時先讀進行程內的暫存畫面，remap 的輸出直接寫進 slot
+    scratch = np.empty(shape, dtype=np.uint8) if mapx is not None else None
+    try:
+        cap = cv2.VideoCapture(camera_index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, frame_size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_size[1])
+        if cap.isOpened():
+            ring.mark_opened()  # 建構端等到這個旗標 (或 mark_closed) 才返回
+        while not stop_event.is_set() and cap.isOpened():
+            index, view = ring.acquire_write()
+            if index is None:
+                time.sleep(0.001)
+                continue
+            target = scratch if scratch is not None else view
+            success, frame = cap.read(target)
+            if not success:
+                ring.abort_write(index)
+                time.sleep(0.005)
+                continue
+            if frame.shape != shape:
+                # 攝影機不支援要求的解析度：縮放成 slot 的大小
+                cv2.resize(frame, (shape[1], shape[0]), dst=target)
+            elif frame is not target and not np.shares_memory(frame, target):
+                target[:] = frame
+            if scratch is not None:
+                cv2.remap(scratch, mapx, mapy, cv2.INTER_LINEAR, dst=view)
+            ring.commit_write(index)
+    finally:
+        if cap is not None:
+            cap.release()
+        ring.mark_closed()
+        ring.close()
+
+
+class SharedMemoryCapture:
+    """
+    在獨立行程擷取攝影機畫面 (與畸變修正)，介面與 cv2.VideoCapture 相同，可直接交給 main()。
+    read() 回傳的畫面是共享記憶體 slot 的 view，在下一次 read() 之前都屬於呼叫端 (可就地模糊、繪製)。
+    建構時等待擷取行程開啟攝影機 (最多 open_timeout 秒)；開啟失敗時 isOpened() 為 False，與 cv2.VideoCapture 相同。
+    """
+    def __init__(self, camera_index=0, frame_size=(1280, 720), mapx=None, mapy=None, slots=3, timeout=2.0,
+                 open_timeout=CAMERA_OPEN_TIMEOUT):
+        ctx = multiprocessing.get_context("spawn")
+        self.timeout = timeout
+        self.ring = SharedFrameRing((frame_size[1], frame_size[0], 3), slots, cond=ctx.Condition())
+        self.stop_event = ctx.Event()
+        self.process = ctx.Process(
+            target=_capture_process, name="capture",
+            args=(self.ring.connect_args(), self.ring.cond, self.stop_event, camera_index, frame_size, mapx, mapy),
+            daemon=True,
+        )
+        self.process.start()
+        self._reading = None
+        self.last_seq = None
+        if not self.ring.wait_opened(open_timeout, self.process.is_alive):
+            self.release()
+
+    def isOpened(self):
+        return self.ring is not None and self.ring.opened and not (self.ring.closed and self._reading is None)
+
+    def set(self, prop, value):
+        return False  # 解析度在建立時指定
+
+    def read(self):
+        if self._reading is not None:
+            self.ring.release_read(self._reading)
+            self._reading = None
+        index, seq, view = self.ring.acquire_read(self.timeout)
+        if index is None:
+            return False, None
+        self._reading = index
+        self.last_seq = seq
+        return True, view
+
+    @property
+    def dropped(self):
+        return self.ring.dropped
+
+    def release(self):
+        if self.ring is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.ring.close()
+        self.ring = None
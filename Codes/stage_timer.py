@@ -0,0 +1,178 @@
+import time
+
+import numpy as np
+
+
+class _StageContext:
+    """with timer.stage(name): 的計時區塊，每個階段重複使用同一個物件"""
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class RingBuffer:
+    """固定大小的環狀緩衝區，只保留最近 capacity 筆數值"""
+    __slots__ = ("data", "index", "count")
+
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        data = self.data
+        data[self.index] = value
+        self.index = (self.index + 1) % len(data)
+        if self.count < len(data):
+            self.count += 1
+
+    def values(self):
+        if self.count < len(self.data):
+            return self.data[:self.count]
+        return self.data
+
+    def __len__(self):
+        return self.count
+
+
+class _GrowingBuffer(list):
+    """不限長度的緩衝區 (基準測試需要保留全部樣本)"""
+    __slots__ = ()
+
+    def values(self):
+        return np.asarray(self)
+
+
+class StageTimer:
+    """
+    記錄主迴圈各階段 (remap、cvtColor、pose.process ...) 的耗時。
+    capacity 為每個階段保留的樣本數 (環狀緩衝區，常駐開啟也不會無限成長)；
+    None 表示保留全部樣本，供基準測試計算完整的百分位數。
+    每個階段名稱只應由同一個執行緒寫入。
+    """
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.samples = {}    # 階段名稱 -> 耗時緩衝區 (秒)
+        self._contexts = {}
+
+    def stage(self, name):
+        ctx = self._contexts.get(name)
+        if ctx is None:
+            ctx = self._contexts[name] = _StageContext(self, name)
+        return ctx
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            if self.capacity is None:
+                samples = _GrowingBuffer()
+            else:
+                samples = RingBuffer(self.capacity)
+            self.samples[name] = samples
+        samples.append(seconds)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        """
+        回傳每個階段的統計 (單位毫秒)：
+        {name: {"count": n, "mean": ms, "p50": ms, "p95": ms, "p99": ms}}
+        """
+        summary = {}
+        for name, samples in list(self.samples.items()):
+            if not len(samples):
+                continue
+            ms = samples.values() * 1000.0
+            stats = {"count": len(ms), "mean": float(ms.mean())}
+            for q, value in zip(qs, np.percentile(ms, qs)):
+                stats[f"p{q}"] = float(value)
+            summary[name] = stats
+        return summary
+
+    def format_report(self, qs=(50, 95, 99)):
+        header = f"{'stage':<18}{'count':>8}{'mean':>10}" + "".join(f"{'p' + str(q):>10}" for q in qs)
+        lines = [header, "-" * len(header)]
+        for name, stats in self.percentiles(qs).items():
+            line = f"{name:<18}{stats['count']:>8}{stats['mean']:>10.2f}"
+            line += "".join(f"{stats['p' + str(q)]:>10.2f}" for q in qs)
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class FrameRateMeter:
+    """以最近幾幀的實際間隔 (含擷取、推論、繪製與顯示) 計算 FPS"""
+    def __init__(self, capacity=60):
+        self.intervals = RingBuffer(capacity)
+        self.last_tick = None
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last_tick is not None:
+            self.intervals.append(now - self.last_tick)
+        self.last_tick = now
+
+    @property
+    def fps(self):
+        if not len(self.intervals):
+            return 0.0
+        mean_interval = self.intervals.values().mean()
+        return 1.0 / mean_interval if mean_interval > 0 else 0.0
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullTimer:
+    """不計時的替身，讓主迴圈不必到處判斷是否啟用計時"""
+    _context = _NullContext()
+
+    def stage(self, name):
+        return self._context
+
+    def record(self, name, seconds):
+        pass
+
+
+class StartupTimer:
+    """
+    啟動流程各步驟的耗時。mark(name) 記錄從上一個 mark 到現在的時間 (主執行緒)，
+    add(name, seconds) 記錄另外量測的步驟；background=True 表示在背景執行緒進行、與主執行緒重疊，不計入總計。
+    """
+    def __init__(self):
+        self.steps = []   # (name, seconds, background)
+        self._last = time.perf_counter()
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.steps.append((name, now - self._last, False))
+        self._last = now
+
+    def add(self, name, seconds, background=True):
+        if seconds is not None:
+            self.steps.append((name, seconds, background))
+
+    def format_report(self):
+        lines = [f"{'step':<20}{'ms':>10}"]
+        for name, seconds, background in self.steps:
+            label = f"{name} *" if background else name
+            lines.append(f"{label:<20}{seconds * 1000:>10.1f}")
+        total = sum(seconds for _, seconds, background in self.steps if not background)
+        lines.append(f"{'total':<20}{total * 1000:>10.1f}")
+        lines.append("* 在背景執行緒進行，與主執行緒重疊")
+        return "\n".join(lines)
@@ -1,26 +1,232 @@
+from collections import OrderedDict
+
 import cv2
-import mediapipe as mp
+import numpy as np
+
+LANDMARK_VISIBILITY_THRESHOLD = 0.5  # 與 mp_drawing 相同：可見度較低的關鍵點不畫
 
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
-mp_pose = mp.solutions.pose
+# 與 mp.solutions.pose.POSE_CONNECTIONS 相同的骨架連線 (Tasks 後端的結果不經過 mp_drawing)
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
 
 def draw_pose_landmarks(image, pose_landmarks):
     """
     Draw pose landmarks (skeleton) on the image.
+    pose_landmarks 可以是 solution 的 NormalizedLandmarkList (protobuf)，
+    也可以是任何有 .landmark 列表的物件 (例如 Tasks 後端的 LandmarkList)。
+    """
+    if hasattr(pose_landmarks, "ListFields"):
+        # protobuf 結果只會來自 mediapipe，這時才載入繪圖工具
+        import mediapipe as mp
+        mp.solutions.drawing_utils.draw_landmarks(
+            image,
+            pose_landmarks,
+            mp.solutions.pose.POSE_CONNECTIONS,
+            landmark_drawing_spec=mp.solutions.drawing_styles.get_default_pose_landmarks_style()
+        )
+        return
+
+    h, w = image.shape[:2]
+    points = {}
+    for i, lm in enumerate(pose_landmarks.landmark):
+        visibility = getattr(lm, "visibility", None)
+        if visibility is not None and visibility < LANDMARK_VISIBILITY_THRESHOLD:
+            continue
+        points[i] = (int(lm.x * w), int(lm.y * h))
+    for start, end in POSE_CONNECTIONS:
+        if start in points and end in points:
+            cv2.line(image, points[start], points[end], (224, 224, 224), 2)
+    for point in points.values():
+        cv2.circle(image, point, 3, (0, 138, 255), -1)
+
+class TextSprite:
+    """
+    預先光柵化的文字：alpha、顏色與相對於文字基線原點的位移。
+    color 可以是單一 BGR 顏色，也可以是與 alpha 同大小的顏色圖 (靜態圖層)。
+    與直接呼叫 cv2.putText 的差異：alpha 只有 0 / 255 的文字 (OpenCV 4 的 LINE_8 / LINE_4) 以遮罩複製，結果完全相同；
+    反鋸齒的文字 (LINE_AA，或 OpenCV 5 的所有文字) 以預乘 alpha 合成，捨入方式與 OpenCV 內部的混色不同，
+    邊緣像素的每個通道可能差 1。
+    """
+    __slots__ = ("dx", "dy", "alpha", "fill", "color", "inv_alpha", "binary")
+
+    def __init__(self, dx, dy, alpha, color):
+        self.dx = dx
+        self.dy = dy
+        self.alpha = alpha
+        self.fill = np.empty(alpha.shape + (3,), dtype=np.uint8)
+        self.fill[:] = color
+        # 非反鋸齒 (LINE_8 / LINE_4) 的文字 alpha 只有 0 / 255，直接以遮罩複製即可
+        self.binary = not np.any((alpha > 0) & (alpha < 255))
+        if self.binary:
+            self.color = self.fill
+            self.inv_alpha = None
+        else:
+            # 預乘 alpha，合成時只需 roi * (1 - a) + color
+            a = alpha.astype(np.float32)[..., None] / 255.0
+            self.color = (self.fill * a + 0.5).astype(np.uint8)
+            self.inv_alpha = cv2.merge([255 - alpha] * 3)
+
+    def blit(self, image, x, y):
+        """貼到 image 的 (x, y) (左上角)，只處理文字所在的區域，超出畫面的部分裁掉"""
+        img_h, img_w = image.shape[:2]
+        sh, sw = self.alpha.shape
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sw, img_w), min(y + sh, img_h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        src = (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+        roi = image[y0:y1, x0:x1]
+        if self.binary:
+            cv2.copyTo(self.color[src], self.alpha[src], roi)
+        else:
+            # 直接寫回畫面上的區域，不配置暫存陣列
+            cv2.multiply(roi, self.inv_alpha[src], dst=roi, scale=1 / 255.0)
+            cv2.add(roi, self.color[src], dst=roi)
+
+
+def _rasterize(text, font_scale, color, thickness, line_type, font=cv2.FONT_HERSHEY_SIMPLEX):
+    (tw, th), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+    pad = thickness + 2
+    alpha = np.zeros((th + baseline + 2 * pad, tw + 2 * pad), dtype=np.uint8)
+    cv2.putText(alpha, text, (pad, pad + th), font, font_scale, 255, thickness, line_type)
+    return TextSprite(-pad, -(pad + th), alpha, color)
+
+
+class OverlayRenderer:
     """
-    mp_drawing.draw_landmarks(
-        image,
-        pose_landmarks,
-        mp_pose.POSE_CONNECTIONS,
-        landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
-    )
-
-def draw_posture_ui(image, result, fps=None, history_summary=None):
+    文字 / UI 疊圖層，取代每幀直接在整張畫面上呼叫 cv2.putText：
+    - 固定不變的文字 (add_static) 只光柵化一次，合成一張帶 alpha 的靜態圖層
+    - 動態文字依內容快取 (LRU)，顯示的數值沒變就不重新光柵化
+    - 每幀只合成文字所在的小區域
+    - 可指定較低的顯示解析度 (display_size)：畫面先縮小再疊字，座標與字體大小仍以 design_size 撰寫
+    反鋸齒文字的邊緣與 cv2.putText 的結果可能差 1 (見 TextSprite)。
+    """
+    def __init__(self, design_size=None, display_size=None, cache_size=512):
+        self.design_size = design_size
+        self.display_size = display_size
+        self.scale = 1.0
+        if design_size is not None and display_size is not None:
+            self.scale = display_size[0] / design_size[0]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._static = []
+        self._static_layer = None
+
+    def canvas_size(self, image):
+        """UI 座標系的 (寬, 高)"""
+        if self.design_size is not None and self.display_size is not None:
+            return self.design_size
+        h, w = image.shape[:2]
+        return w, h
+
+    def prepare(self, frame):
+        """回傳要疊字與顯示的畫面 (需要時縮小到 display_size)"""
+        if self.display_size is None or (frame.shape[1], frame.shape[0]) == tuple(self.display_size):
+            return frame
+        return cv2.resize(frame, tuple(self.display_size), interpolation=cv2.INTER_AREA)
+
+    def _point(self, x, y):
+        return int(round(x * self.scale)), int(round(y * self.scale))
+
+    def _style(self, font_scale, thickness):
+        return font_scale * self.scale, max(1, int(round(thickness * self.scale)))
+
+    def _sprite(self, text, font_scale, color, thickness, line_type):
+        key = (text, font_scale, tuple(color), thickness, line_type)
+        sprite = self._cache.get(key)
+        if sprite is not None:
+            self._cache.move_to_end(key)
+            return sprite
+        scale, thick = self._style(font_scale, thickness)
+        sprite = _rasterize(text, scale, color, thick, line_type)
+        self._cache[key] = sprite
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return sprite
+
+    def text(self, image, text, org, font_scale, color, thickness=1, line_type=cv2.LINE_8):
+        """與 cv2.putText 相同的參數 (字型固定為 FONT_HERSHEY_SIMPLEX)"""
+        sprite = self._sprite(text, font_scale, color, thickness, line_type)
+        x, y = self._point(*org)
+        sprite.blit(image, x + sprite.dx, y + sprite.dy)
+
+    def rectangle(self, image, pt1, pt2, color, thickness=1):
+        cv2.rectangle(image, self._point(*pt1), self._point(*pt2), color, thickness)
+
+    def add_static(self, text, org, font_scale, color, thickness=1, line_type=cv2.LINE_8):
+        """登記每幀都會顯示、內容不變的文字 (例如按鍵說明)，由 draw_static 一次合成"""
+        self._static.append((text, org, font_scale, tuple(color), thickness, line_type))
+        self._static_layer = None
+
+    def _build_static_layer(self):
+        placed = []
+        for text, org, font_scale, color, thickness, line_type in self._static:
+            sprite = self._sprite(text, font_scale, color, thickness, line_type)
+            x, y = self._point(*org)
+            placed.append((sprite, x + sprite.dx, y + sprite.dy))
+        x0 = min(x for _, x, _ in placed)
+        y0 = min(y for _, _, y in placed)
+        x1 = max(x + sprite.alpha.shape[1] for sprite, x, _ in placed)
+        y1 = max(y + sprite.alpha.shape[0] for sprite, _, y in placed)
+
+        # 所有靜態文字畫進同一張圖層，每幀只需合成一次
+        alpha = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        fill = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        for sprite, x, y in placed:
+            sh, sw = sprite.alpha.shape
+            region = (slice(y - y0, y - y0 + sh), slice(x - x0, x - x0 + sw))
+            covered = sprite.alpha >= alpha[region]
+            fill[region][covered] = sprite.fill[covered]
+            np.maximum(alpha[region], sprite.alpha, out=alpha[region])
+        return TextSprite(0, 0, alpha, fill), x0, y0
+
+    def draw_static(self, image):
+        if not self._static:
+            return
+        if self._static_layer is None:
+            self._static_layer = self._build_static_layer()
+        layer, x, y = self._static_layer
+        layer.blit(image, x, y)
+
+
+class NullOverlay:
+    """不繪製任何東西的疊圖層 (背景服務模式)"""
+    def canvas_size(self, image):
+        h, w = image.shape[:2]
+        return w, h
+
+    def prepare(self, frame):
+        return frame
+
+    def text(self, *args, **kwargs):
+        pass
+
+    def rectangle(self, *args, **kwargs):
+        pass
+
+    def add_static(self, *args, **kwargs):
+        pass
+
+    def draw_static(self, image):
+        pass
+
+
+_default_overlay = OverlayRenderer()
+
+
+def draw_posture_ui(image, result, fps=None, history_summary=None, perf_stats=None, overlay=None):
     """
     Draw score, status, detailed metrics (debug), and FPS on the image.
+    perf_stats: StageTimer.percentiles() 的結果，不為 None 時顯示各階段耗時的除錯面板。
+    overlay: 使用的 OverlayRenderer (文字快取與顯示解析度)，None 時使用模組預設的實例。
     """
-    h, w = image.shape[:2]
+    overlay = overlay or _default_overlay
+    w, h = overlay.canvas_size(image)
 
     if result is not None:
         current_score = result["score"]
@@ -37,13 +243,13 @@ def draw_posture_ui(image, result, fps=None, history_summary=None):
             color = (0, 0, 255)  # Red
 
         # 2. 繪製總分與狀態
-        cv2.putText(
+        overlay.text(
             image, f"Score: {current_score}", (20, 40),
-            cv2.FONT_HERSHEY_SIMPLEX, 1.0, color, 2, cv2.LINE_AA
+            1.0, color, 2, cv2.LINE_AA
         )
-        cv2.putText(
+        overlay.text(
             image, f"Status: {current_status}", (20, 70),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA
+            0.7, color, 2, cv2.LINE_AA
         )
 
         # 3. 詳細數值顯示 (除錯用，黑色字體)
@@ -60,9 +266,9 @@ def draw_posture_ui(image, result, fps=None, history_summary=None):
             # 根據是否有被扣分來改變文字顏色 (有扣分變紅，沒扣分黑色)
             text_color = (0, 0, 255) if pen_display > 0 else (0, 0, 0)
             
-            cv2.putText(
+            overlay.text(
                 img, text, (20, y),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                0.6,
                 text_color,
                 1,
                 cv2.LINE_AA
@@ -113,27 +319,56 @@ def draw_posture_ui(image, result, fps=None, history_summary=None):
         hist_text_y = 250  # Place below debug metrics
         hist_gap = 25
         
-        cv2.putText(
+        overlay.text(
             image, f"Good: {good_ratio*100:.1f}%", (20, hist_text_y),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 100, 0), 1, cv2.LINE_AA
+            0.6, (0, 100, 0), 1, cv2.LINE_AA
         )
         
-        cv2.putText(
+        overlay.text(
             image, f"Bad: {bad_ratio*100:.1f}%", (20, hist_text_y + hist_gap),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 1, cv2.LINE_AA
+            0.6, (0, 0, 255), 1, cv2.LINE_AA
         )
         
-        cv2.putText(
+        overlay.text(
             image, f"Max Bad Streak: {max_bad_streak:.1f}s", (20, hist_text_y + hist_gap * 2),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv2.LINE_AA
+            0.6, (0, 0, 0), 1, cv2.LINE_AA
         )
 
+        # Sliding windows: recent good / bad ratio and mean score
+        windows = history_summary.get("windows") or {}
+        for i, (length, stats) in enumerate(sorted(windows.items())):
+            label = f"{length // 60}m" if length >= 60 else f"{length}s"
+            avg = stats.get("avg_score")
+            avg_text = f"{avg:.0f}" if avg is not None else "--"
+            overlay.text(
+                image,
+                f"{label}: Good {stats['good_ratio']*100:.0f}%  Bad {stats['bad_ratio']*100:.0f}%  Avg {avg_text}",
+                (20, hist_text_y + hist_gap * (3 + i)),
+                0.55, (60, 60, 60), 1, cv2.LINE_AA
+            )
+
     # 4. FPS 顯示
     if fps is not None:
-        cv2.putText(
+        overlay.text(
             image, f"FPS: {int(fps)}",
             (w - 120, 30),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+            0.7,
             (50, 50, 50),
             2
-        )
\ No newline at end of file
+        )
+
+    # 6. 效能除錯面板 (各階段 p50 / p95 / p99 耗時)
+    if perf_stats is not None:
+        panel_x = w - 360
+        panel_y = 60
+        line_gap = 20
+        overlay.text(
+            image, "stage  p50 / p95 / p99 (ms)", (panel_x, panel_y),
+            0.5, (50, 50, 50), 1, cv2.LINE_AA
+        )
+        for i, (name, stats) in enumerate(perf_stats.items(), start=1):
+            text = f"{name}: {stats['p50']:.1f} / {stats['p95']:.1f} / {stats['p99']:.1f}"
+            overlay.text(
+                image, text, (panel_x, panel_y + line_gap * i),
+                0.5, (50, 50, 50), 1, cv2.LINE_AA
+            )
@@ -0,0 +1,78 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+
+CAMERA_PARAMS_PATH = "camera_params.npz"
+REMAP_CACHE_DIR = "remap_cache"
+
+
+def load_camera_params(path=CAMERA_PARAMS_PATH):
+    """讀取 calibration.py 產生的相機參數；檔案不存在或讀取失敗時回傳 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return data['mtx'], data['dist']
+    except Exception as e:
+        print(f"載入參數失敗: {e}")
+        return None
+
+
+def optimal_camera_matrix(mtx, dist, size):
+    """修正後影像使用的相機矩陣 (與畫面 remap 的結果一致)"""
+    newcameramtx, _ = cv2.getOptimalNewCameraMatrix(mtx, dist, size, 0, size)
+    return newcameramtx
+
+
+def _cache_key(mtx, dist, size):
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(mtx, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(dist, dtype=np.float64).tobytes())
+    return f"remap_{size[0]}x{size[1]}_{digest.hexdigest()[:16]}.npz"
+
+
+def build_remap_maps(mtx, dist, size, cache_dir=REMAP_CACHE_DIR):
+    """
+    建立整張畫面畸變修正用的定點數 (CV_16SC2) remap 表。
+    結果依解析度與相機參數快取在磁碟上，下次啟動直接讀取，不必重算。
+
+    Returns:
+        (map1, map2)，可直接傳給 cv2.remap
+    """
+    cache_path = os.path.join(cache_dir, _cache_key(mtx, dist, size))
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as data:
+                return data['map1'], data['map2']
+        except Exception as e:
+            print(f"讀取 remap 快取失敗，重新計算: {e}")
+
+    newcameramtx = optimal_camera_matrix(mtx, dist, size)
+    map1, map2 = cv2.initUndistortRectifyMap(mtx, dist, None, newcameramtx, size, cv2.CV_16SC2)
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_path, map1=map1, map2=map2)
+    except OSError as e:
+        print(f"無法寫入 remap 快取: {e}")
+    return map1, map2
+
+
+class LandmarkUndistorter:
+    """
+    只修正評分用到的幾個關鍵點，而不是整張畫面。
+    輸入為原始 (有畸變) 畫面的像素座標，輸出為修正後畫面的像素座標，
+    與整張畫面 remap 之後再偵測得到的座標一致。
+    """
+    def __init__(self, mtx, dist, size):
+        self.mtx = mtx
+        self.dist = dist
+        self.newcameramtx = optimal_camera_matrix(mtx, dist, size)
+
+    def __call__(self, points):
+        """points: (N, 2) 像素座標 -> (N, 2) 修正後的像素座標"""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        undistorted = cv2.undistortPoints(pts, self.mtx, self.dist, P=self.newcameramtx)
+        return undistorted.reshape(-1, 2)
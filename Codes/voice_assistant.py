@@ -1,39 +1,183 @@
+import heapq
+import itertools
+import subprocess
 import threading
-import pyttsx3
 import time
 
+from voice_cache import ClipCache, FIXED_PROMPTS, VOICE_CACHE_DIR, play_clip, start_prerender
+
+# 優先順序 (數字越小越先播放)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+LOW_PRIORITY_TTL = 5.0  # 低優先語音預設的有效時間 (秒)，逾時未播放就丟棄
+ENGINE_RETRY_DELAY = 1.0   # 語音引擎初始化 / 播放失敗後，第一次重試前的等待 (秒)
+ENGINE_RETRY_MAX = 60.0    # 重試間隔每次加倍，最多到此秒數
+
+
 class VoiceAssistant:
-    """非阻塞版，每次播放新 engine，播放完後釋放記憶體"""
-    def __init__(self):
-        self.lock = threading.Lock()  # 防止多執行緒同時播放時出錯
-        self.last_reset_time = 0      # 記錄最後一次重置的時間
+    """
+    非阻塞語音助手：單一常駐執行緒持有一個 engine，從優先佇列依序播放。
+    - 尚未播放的相同語句會合併成一筆
+    - 有期限的語句逾時未播放就丟棄 (低優先預設 LOW_PRIORITY_TTL 秒)
+    - stop() 清空所有尚未播放的語句
+    - 固定提示語 (prerender) 在另一個行程合成成音檔快取，之後直接播放音檔；
+      合成不佔用語音執行緒，不會延後任何排入的語句
+    - 語音引擎失敗時以遞增的間隔重試，不會空轉
+    """
+    def __init__(self, prerender=FIXED_PROMPTS, cache_dir=VOICE_CACHE_DIR):
+        self.prerender = list(prerender)
+        self.cache_dir = cache_dir
+        self._heap = []        # [priority, seq, deadline, text, valid]
+        self._pending = {}     # text -> 佇列中的項目，用於合併重複語句
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._prerender_process = None
+        self._thread = threading.Thread(target=self._worker, name="voice", daemon=True)
+        self._thread.start()
 
-    def say(self, text):
+    def say(self, text, priority=PRIORITY_NORMAL, ttl=None):
+        """
+        排入一句語音。
+        Args:
+            priority: PRIORITY_HIGH / PRIORITY_NORMAL / PRIORITY_LOW
+            ttl: 有效時間 (秒)，None 表示不過期 (低優先預設為 LOW_PRIORITY_TTL)
+        """
         if not text:
             return
-        # 用背景執行緒播放，傳入當前的生成時間
-        current_req_time = time.time()
-        threading.Thread(target=self._play, args=(text, current_req_time), daemon=True).start()
+        if ttl is None and priority >= PRIORITY_LOW:
+            ttl = LOW_PRIORITY_TTL
+        deadline = time.time() + ttl if ttl is not None else None
+
+        with self._cond:
+            existing = self._pending.get(text)
+            if existing is not None:
+                # 合併：保留較晚的期限 (None 代表不過期)
+                if existing[2] is not None:
+                    existing[2] = None if deadline is None else max(existing[2], deadline)
+                if priority >= existing[0]:
+                    return
+                # 新的請求優先順序較高，作廢舊項目後重新排入
+                existing[4] = False
+                deadline = existing[2]
+
+            entry = [priority, next(self._seq), deadline, text, True]
+            self._pending[text] = entry
+            heapq.heappush(self._heap, entry)
+            self._cond.notify()
 
     def stop(self):
         """取消所有尚未播放的語音指令"""
-        self.last_reset_time = time.time()
+        with self._cond:
+            self._heap.clear()
+            self._pending.clear()
 
-    def _play(self, text, req_time):
-        # 如果這個請求是在最後一次重置之前發出的，就忽略它
-        if req_time < self.last_reset_time:
-            return
+    def close(self, timeout=1.0):
+        """結束語音執行緒 (尚未播放的語句會被丟棄)"""
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._pending.clear()
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._reap_prerender(timeout)
+
+    def _next_entry(self, wait=True, timeout=None):
+        """取出下一筆要播放的語句；wait=False 時佇列為空就回傳 None，timeout 秒內沒有語句也回傳 None"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._running:
+                while self._heap:
+                    entry = heapq.heappop(self._heap)
+                    if not entry[4]:
+                        continue
+                    if self._pending.get(entry[3]) is entry:
+                        del self._pending[entry[3]]
+                    if entry[2] is not None and time.time() > entry[2]:
+                        continue  # 已過期
+                    return entry
+                if not wait:
+                    return None
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+            return None
+
+    def _worker(self):
+        engine = None
+        cache = None
+        retry_delay = ENGINE_RETRY_DELAY
+        next_init = 0.0
+        while True:
+            if engine is None and time.time() >= next_init:
+                try:
+                    import pyttsx3  # 在語音執行緒載入，不拖慢程式啟動
+                    engine = pyttsx3.init()
+                    cache = ClipCache.for_engine(engine, self.cache_dir)
+                    retry_delay = ENGINE_RETRY_DELAY
+                    self._start_prerender(cache)
+                except Exception as e:
+                    print("語音引擎初始化失敗:", e)
+                    engine = None
+                    next_init = time.time() + retry_delay
+                    retry_delay = min(retry_delay * 2, ENGINE_RETRY_MAX)
+
+            if engine is None:
+                # 等待重試期間排入的語句直接丟棄 (引擎無法使用)
+                self._next_entry(timeout=max(0.0, next_init - time.time()))
+                if not self._running:
+                    break
+                continue
 
-        with self.lock:
-            # 再次檢查，因為排隊時可能又發生了重置
-            if req_time < self.last_reset_time:
-                return
-                
+            entry = self._next_entry()
+            if not self._running:
+                break
+            self._reap_prerender()
             try:
-                engine = pyttsx3.init()
-                engine.say(text)
+                clip = cache.lookup(entry[3])
+                if clip is not None and play_clip(clip):
+                    continue
+                engine.say(entry[3])
                 engine.runAndWait()
-                engine.stop()
-                del engine
             except Exception as e:
                 print("語音播放失敗:", e)
+                engine = None  # 稍後重新建立 engine
+                next_init = time.time() + retry_delay
+                retry_delay = min(retry_delay * 2, ENGINE_RETRY_MAX)
+
+    def _start_prerender(self, cache):
+        """第一次成功建立 engine 後，在另一個行程合成尚未快取的固定提示語 (只啟動一次)"""
+        if self._prerender_process is not None:
+            return
+        missing = cache.missing(self.prerender)
+        if missing:
+            self._prerender_process = start_prerender(missing, self.cache_dir) or False
+
+    def _reap_prerender(self, timeout=0):
+        """預先合成的子行程結束後回收 (避免殭屍行程)；timeout 秒內還沒結束就讓它繼續在背景合成"""
+        process = self._prerender_process
+        if not process:
+            return
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return
+        self._prerender_process = False
+
+
+class SilentVoice:
+    """與 VoiceAssistant 介面相同但不發出語音 (基準測試、多攝影機 worker 使用)"""
+    def say(self, text, priority=PRIORITY_NORMAL, ttl=None):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self, timeout=None):
+        pass
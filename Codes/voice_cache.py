@@ -0,0 +1,126 @@
+"""
+固定提示語的預先合成音檔快取。
+
+main.py 的提示語幾乎都是固定字串，第一次執行 (或安裝時執行本檔) 先用 pyttsx3 合成成音檔，
+之後直接播放音檔，只有不在快取中的字串才即時合成。
+
+安裝時預先產生：
+    python Codes/voice_cache.py
+"""
+import argparse
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+import sys
+
+VOICE_CACHE_DIR = "voice_cache"
+
+# main.py 使用的固定提示語
+FIXED_PROMPTS = (
+    "校正完成，開始監控",
+    "請坐好，注意姿勢",
+    "時間到了，請起來活動一下",
+    "歡迎回來，計時器已重置",
+    "計時器已重置",
+)
+
+
+class ClipCache:
+    """以 (文字, 語音, 語速) 為 key 的音檔快取"""
+    def __init__(self, voice_id, rate, cache_dir=VOICE_CACHE_DIR):
+        self.voice_id = voice_id
+        self.rate = rate
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def for_engine(cls, engine, cache_dir=VOICE_CACHE_DIR):
+        return cls(engine.getProperty('voice'), engine.getProperty('rate'), cache_dir)
+
+    def path_for(self, text):
+        key = hashlib.sha1(f"{self.voice_id}|{self.rate}|{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def lookup(self, text):
+        """回傳已合成的音檔路徑；不在快取中時回傳 None"""
+        path = self.path_for(text)
+        return path if os.path.exists(path) else None
+
+    def render(self, engine, text):
+        """用 engine 把 text 合成成音檔；先寫暫存檔再改名，避免留下不完整的檔案"""
+        path = self.path_for(text)
+        if os.path.exists(path):
+            return path
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path + ".tmp.wav"
+        engine.save_to_file(text, tmp_path)
+        engine.runAndWait()
+        if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+            return None
+        os.replace(tmp_path, path)
+        return path
+
+    def missing(self, texts):
+        return [t for t in texts if self.lookup(t) is None]
+
+
+def play_clip(path):
+    """
+    以系統內建的輕量方式播放音檔 (阻塞直到播放完畢)。
+    回傳 False 表示此平台沒有可用的播放方式，呼叫端應改用即時合成。
+    """
+    system = platform.system()
+    try:
+        if system == "Windows":
+            import winsound
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+            return True
+        if system == "Darwin":
+            return subprocess.run(["afplay", path]).returncode == 0
+        if shutil.which("aplay"):
+            return subprocess.run(["aplay", "-q", path]).returncode == 0
+    except Exception as e:
+        print(f"音檔播放失敗: {e}")
+    return False
+
+
+def prerender(texts=FIXED_PROMPTS, cache_dir=VOICE_CACHE_DIR):
+    """預先合成所有固定提示語 (安裝時使用)"""
+    import pyttsx3
+    engine = pyttsx3.init()
+    cache = ClipCache.for_engine(engine, cache_dir)
+    for text in cache.missing(texts):
+        try:
+            path = cache.render(engine, text)
+        except Exception as e:
+            # 單一句合成失敗就略過，不影響其他提示語
+            print(f"合成失敗: {text} ({e})")
+            continue
+        print(f"{'已合成' if path else '合成失敗'}: {text}")
+    engine.stop()
+
+
+def start_prerender(texts, cache_dir=VOICE_CACHE_DIR):
+    """
+    在另一個行程預先合成 texts (各自的 pyttsx3 engine)，不佔用呼叫端的語音執行緒。
+    回傳 subprocess.Popen；無法啟動時回傳 None。
+    """
+    try:
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--cache-dir", cache_dir, *texts],
+                                stdout=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"無法啟動語音預先合成: {e}")
+        return None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="預先合成固定提示語音檔")
+    parser.add_argument("texts", nargs="*", help="要合成的字串 (預設為所有固定提示語)")
+    parser.add_argument("--cache-dir", default=VOICE_CACHE_DIR, help=f"音檔快取目錄 (預設 {VOICE_CACHE_DIR})")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    prerender(args.texts or FIXED_PROMPTS, args.cache_dir)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 專案的模組是 Codes/ 底下的扁平檔案 (以 python Codes/main.py 執行)，測試時同樣從 Codes/ 匯入
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Codes"))
@@ -0,0 +1,35 @@
+import threading
+import time
+
+from frame_pipeline import LatestQueue
+
+
+def test_latest_queue_drops_oldest_when_full():
+    q = LatestQueue(maxsize=2)
+    for i in range(5):
+        q.put(i)
+    assert len(q) == 2
+    assert q.dropped == 3
+    assert q.get(timeout=0) == 3
+    assert q.get(timeout=0) == 4
+
+
+def test_latest_queue_get_times_out_with_none():
+    q = LatestQueue()
+    start = time.monotonic()
+    assert q.get(timeout=0.05) is None
+    assert time.monotonic() - start >= 0.04
+
+
+def test_latest_queue_wakes_blocked_reader():
+    q = LatestQueue()
+    threading.Timer(0.05, q.put, args=("frame",)).start()
+    assert q.get(timeout=2.0) == "frame"
+
+
+def test_latest_queue_close_releases_reader_but_keeps_items():
+    q = LatestQueue(maxsize=2)
+    q.put("last")
+    q.close()
+    assert q.get(timeout=None) == "last"
+    assert q.get(timeout=None) is None  # 已關閉且為空，不會阻塞
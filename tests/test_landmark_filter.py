@@ -0,0 +1,83 @@
+import numpy as np
+
+from landmark_filter import SCORER_LANDMARKS, LandmarkKalman, LandmarkPredictor
+from pose_backends import LandmarkList, PoseResult
+
+
+class _Landmark:
+    def __init__(self, x, y, z=0.0, visibility=1.0):
+        self.x, self.y, self.z, self.visibility = x, y, z, visibility
+
+
+def _result(offset_x=0.0, count=33):
+    return PoseResult(LandmarkList([_Landmark(0.3 + offset_x + i * 0.01, 0.4 + i * 0.005) for i in range(count)]), None)
+
+
+def test_kalman_tracks_constant_velocity():
+    kalman = LandmarkKalman(2)
+    for i in range(30):
+        t = i / 30
+        kalman.update(t, [(0.2 + 0.1 * t, 0.5), (0.6, 0.4 - 0.05 * t)])
+    predicted = kalman.predict(1.0 + 1 / 30)
+    np.testing.assert_allclose(predicted, [(0.2 + 0.1 * (1 + 1 / 30), 0.5), (0.6, 0.4 - 0.05 * (1 + 1 / 30))],
+                               atol=2e-3)
+
+
+def test_kalman_uncertainty_grows_while_predicting_and_shrinks_on_update():
+    kalman = LandmarkKalman(1)
+    kalman.update(0.0, [(0.5, 0.5)])
+    kalman.update(0.1, [(0.5, 0.5)])
+    settled = kalman.position_std()
+    kalman.predict(1.0)
+    assert kalman.position_std() > settled
+    kalman.update(1.0, [(0.5, 0.5)])
+    assert kalman.position_std() < settled * 2
+
+
+def test_kalman_first_update_initializes_without_residual():
+    kalman = LandmarkKalman(1)
+    assert kalman.update(0.0, [(0.3, 0.7)]) == 0.0
+    np.testing.assert_array_equal(kalman.position, [0.3, 0.7])
+    assert abs(kalman.update(0.1, [(0.35, 0.7)]) - 0.05) < 1e-12  # 殘差 = 量測 - 預測 (速度為 0)
+
+
+def test_predictor_skips_frames_and_moves_only_scorer_landmarks():
+    predictor = LandmarkPredictor(infer_every=3, max_error=1.0, max_seconds=10.0)
+    t = 0.0
+    assert predictor.should_infer(t)
+    last = _result()
+    predictor.observe(t, last)
+    schedule = []
+    for i in range(1, 7):
+        t = i / 30
+        infer = predictor.should_infer(t)
+        schedule.append(infer)
+        if infer:
+            last = _result()
+            predictor.observe(t, last)
+        else:
+            predicted = predictor.predict()
+            assert predicted.segmentation_mask is None
+            landmarks = predicted.pose_landmarks.landmark
+            assert len(landmarks) == 33
+            assert landmarks[20] is last.pose_landmarks.landmark[20]  # 其他關鍵點沿用上次推論
+            for index in SCORER_LANDMARKS:
+                assert landmarks[index] is not last.pose_landmarks.landmark[index]
+                assert abs(landmarks[index].x - last.pose_landmarks.landmark[index].x) < 1e-3
+    assert schedule == [False, False, True, False, False, True]
+    assert predictor.inference_ratio == 3 / 7
+
+
+def test_predictor_infers_early_when_the_residual_is_large():
+    predictor = LandmarkPredictor(infer_every=10, max_error=0.01, max_seconds=10.0)
+    predictor.should_infer(0.0)
+    predictor.observe(0.0, _result())
+    predictor.should_infer(1 / 30)
+    predictor.observe(1 / 30, _result(offset_x=0.1))  # 突然移動
+    assert predictor.should_infer(2 / 30)
+
+
+def test_predictor_infers_when_nobody_is_tracked():
+    predictor = LandmarkPredictor(infer_every=5)
+    predictor.observe(0.0, PoseResult(None, None))
+    assert predictor.should_infer(0.03)
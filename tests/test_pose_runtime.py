@@ -0,0 +1,43 @@
+from pose_runtime import PoseRuntime
+
+
+class FakePose:
+    def __init__(self, segmentation):
+        self.segmentation = segmentation
+
+    def process(self, frame):
+        return self.segmentation
+
+    def close(self):
+        pass
+
+
+class FlakyRuntime(PoseRuntime):
+    """第一次建立 segmentation 模型時失敗"""
+    failures = 1
+
+    def _build(self, segmentation):
+        if segmentation and self.failures:
+            self.failures -= 1
+            raise RuntimeError("model download failed")
+        return FakePose(segmentation)
+
+
+def _switch(runtime, enabled):
+    runtime.set_segmentation(enabled)
+    thread = runtime._warm_thread
+    if thread is not None:
+        thread.join(5)
+
+
+def test_failed_build_keeps_the_old_model_and_allows_a_retry():
+    runtime = FlakyRuntime()
+    _switch(runtime, True)
+    assert runtime._warm_thread is None
+    assert not runtime.segmentation_enabled
+    assert runtime.process("frame") is False
+
+    _switch(runtime, True)
+    assert runtime.segmentation_enabled
+    assert runtime.process("frame") is True
+    runtime.close()
@@ -0,0 +1,38 @@
+import pytest
+
+from posture_history import PostureHistory, SlidingWindow
+
+BAD = {"penalties": {"shoulder_tilt": 20}, "score": 80}
+GOOD = {"penalties": {"shoulder_tilt": 0}, "score": 100}
+
+
+def test_sliding_window_covers_its_length():
+    window = SlidingWindow(60, buckets=60)
+    for t in range(120):
+        window.add(float(t), "good" if t < 60 else "bad", 1.0, 100 if t < 60 else 40)
+    stats = window.stats(119.0)
+    assert stats["length"] == 60
+    assert stats["total_time"] == pytest.approx(60.0)
+    assert stats["bad_ratio"] == pytest.approx(1.0)
+    assert stats["avg_score"] == pytest.approx(40.0)
+
+
+def test_sliding_window_drops_old_samples():
+    window = SlidingWindow(60, buckets=60)
+    for t in range(30):
+        window.add(float(t), "bad", 1.0, 50)
+    assert window.stats(29.0)["total_time"] == pytest.approx(30.0)
+    # 往前推 45 秒：最舊的 15 秒已離開視窗
+    assert window.stats(74.0)["total_time"] == pytest.approx(15.0)
+    # 超過整個視窗長度沒有資料：全部過期
+    stats = window.stats(200.0)
+    assert stats["total_time"] == 0.0
+    assert stats["avg_score"] is None
+
+
+def test_snapshot_expires_windows_when_updates_stop():
+    history = PostureHistory(windows=(60,))
+    for t in range(30):
+        history.update(1000.0 + t, BAD if t % 2 else GOOD)
+    assert history.snapshot(1029.0)["windows"][60]["total_time"] == pytest.approx(29.0)
+    assert history.snapshot(1200.0)["windows"][60]["total_time"] == 0.0
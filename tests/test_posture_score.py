@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from posture_score import (ABSOLUTE_RULES, BASELINE_RULES, EMA_BATCH_RTOL, FEATURE_BATCH_ATOL, FEATURE_NAMES,
+                           PostureScore, ScoringRule, compile_rules, ema_batch, extract_face_shoulder_features,
+                           extract_features_batch)
+
+BASELINE = {"shoulder_tilt_deg": 2.0, "head_roll_deg": 3.0, "eye_dist_px": 95.0, "nose_shoulder_angle": 80.0}
+
+
+def _three_level(value, warn, bad, penalties=(0, 10, 20)):
+    return penalties[0] if value < warn else penalties[1] if value < bad else penalties[2]
+
+
+def _old_penalties(f, baseline=None):
+    """規則化之前的逐項門檻 (PostureScore._penalty_from_* 的邏輯)"""
+    if baseline:
+        return {
+            "shoulder_tilt": _three_level(abs(f["shoulder_tilt_deg"] - baseline["shoulder_tilt_deg"]), 5.0, 10.0),
+            "head_roll": _three_level(abs(f["head_roll_deg"] - baseline["head_roll_deg"]), 10.0, 15.0),
+            "head_distance": _three_level(f["eye_dist_px"] - baseline["eye_dist_px"], 10.0, 30.0),
+            "hunchback": _three_level(f["nose_shoulder_angle"] - baseline["nose_shoulder_angle"], 10.0, 25.0,
+                                      (0, 15, 30)),
+        }
+    return {
+        "shoulder_tilt": _three_level(f["shoulder_tilt_deg"], 5.0, 10.0),
+        "head_roll": _three_level(f["head_roll_deg"], 10.0, 20.0),
+        "head_distance": _three_level(f["eye_dist_px"], 90.0, 110.0),
+        "hunchback": _three_level(f["nose_shoulder_angle"], 85.0, 100.0, (0, 15, 30)),
+    }
+
+
+def _features(rng):
+    return {
+        "shoulder_tilt_deg": rng.uniform(0, 20),
+        "head_roll_deg": rng.uniform(0, 30),
+        "eye_dist_px": rng.uniform(60, 150),
+        "nose_shoulder_angle": rng.uniform(60, 120),
+    }
+
+
+@pytest.mark.parametrize("baseline", [None, BASELINE])
+def test_compiled_rules_match_the_old_thresholds(baseline):
+    rng = np.random.default_rng(0)
+    samples = [_features(rng) for _ in range(2000)]
+    # 剛好落在分界點上的值
+    samples.append({"shoulder_tilt_deg": 5.0, "head_roll_deg": 20.0, "eye_dist_px": 110.0, "nose_shoulder_angle": 85.0})
+    samples.append({k: BASELINE[k] + d for k, d in zip(BASELINE, (10.0, 15.0, 10.0, 25.0))})
+    for f in samples:
+        scorer = PostureScore()  # 每次重新建立，不受 EMA 影響
+        scorer.set_baseline(baseline)
+        assert scorer.compute(f)["penalties"] == _old_penalties(f, baseline)
+
+
+def test_rule_tables_come_from_the_threshold_constants():
+    assert PostureScore.SHOULDER_WARN == 5.0 and PostureScore.HUNCH_BAD == 100.0
+    assert ABSOLUTE_RULES[0].breakpoints == (PostureScore.SHOULDER_WARN, PostureScore.SHOULDER_BAD)
+    assert BASELINE_RULES[3].breakpoints == (PostureScore.HUNCH_DIFF_WARN, PostureScore.HUNCH_DIFF_BAD)
+
+    class Strict(PostureScore):
+        HUNCH_WARN = 80.0
+
+    scorer = Strict()
+    assert scorer.compute({**BASELINE, "nose_shoulder_angle": 82.0})["penalties"]["hunchback"] == 15
+
+
+def test_relative_rules_require_a_baseline():
+    with pytest.raises(ValueError):
+        compile_rules(BASELINE_RULES)
+    with pytest.raises(ValueError):
+        ScoringRule("x", "eye_dist_px", "absolute", (2.0, 1.0), (0, 1, 2))
+
+
+def test_ema_batch_is_within_tolerance_and_exact_mode_is_bit_identical():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 150, (1000, len(FEATURE_NAMES)))
+    reference = np.empty_like(x)
+    prev = x[0].tolist()
+    for t, row in enumerate(x.tolist()):
+        prev = row if t == 0 else [0.4 * v + (1.0 - 0.4) * p for v, p in zip(row, prev)]
+        reference[t] = prev
+    np.testing.assert_allclose(ema_batch(x, 0.4), reference, rtol=EMA_BATCH_RTOL, atol=0)
+    assert np.array_equal(ema_batch(x, 0.4, exact=True), reference)
+
+
+def test_compute_batch_exact_matches_per_frame_compute():
+    rng = np.random.default_rng(2)
+    frames = [_features(rng) for _ in range(300)]
+    frames[100:200] = [{"shoulder_tilt_deg": 5.0, "head_roll_deg": 10.0, "eye_dist_px": 90.0,
+                        "nose_shoulder_angle": 85.0}] * 100  # 停在分界點上
+    batch = PostureScore().compute_batch({k: np.array([f[k] for f in frames]) for k in frames[0]}, exact=True)
+    single = PostureScore()
+    assert list(batch["score"]) == [single.compute(f)["score"] for f in frames]
+
+
+def test_extract_features_batch_matches_per_frame_within_tolerance():
+    rng = np.random.default_rng(3)
+    landmarks = rng.random((500, 33, 3))
+    batch = extract_features_batch(landmarks, 1280, 720)
+    for i, frame in enumerate(landmarks):
+        single = extract_face_shoulder_features([SimpleNamespace(x=x, y=y, z=z) for x, y, z in frame], 1280, 720)
+        for name, value in single.items():
+            assert abs(batch[name][i] - value) <= FEATURE_BATCH_ATOL
+
+
+def test_compute_batch_with_empty_batch_keeps_history():
+    scorer = PostureScore()
+    scorer.compute(BASELINE)
+    history = dict(scorer.history)
+    result = scorer.compute_batch({k: np.zeros(0) for k in BASELINE})
+    assert len(result["score"]) == 0
+    assert all(len(v) == 0 for v in result["penalties"].values())
+    assert scorer.history == history
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from quantile_sketch import HistogramSketch
+
+
+def test_quantiles_are_within_one_bin_of_exact():
+    values = np.random.default_rng(0).normal(50, 10, 20000)
+    sketch = HistogramSketch(0, 100, bins=200)
+    sketch.add_many(values)
+    width = 100 / 200
+    for q in (0.1, 0.5, 0.9):
+        assert abs(sketch.quantile(q) - np.quantile(values, q)) <= width
+
+
+def test_add_and_add_many_agree():
+    values = np.random.default_rng(1).uniform(-10, 110, 1000)
+    one, many = HistogramSketch(0, 100, 50), HistogramSketch(0, 100, 50)
+    for v in values:
+        one.add(v)
+    many.add_many(values)
+    assert np.array_equal(one.counts, many.counts)
+    assert one.quantiles((0.0, 0.5, 1.0)) == pytest.approx(many.quantiles((0.0, 0.5, 1.0)))
+
+
+def test_overflow_bins_report_observed_extremes():
+    sketch = HistogramSketch(0, 10, 10)
+    sketch.add_many([-5.0, 3.0, 42.0, float("nan")])
+    assert sketch.count == 3
+    assert sketch.quantile(0.0) == -5.0
+    assert sketch.quantile(1.0) == 42.0
+
+
+def test_merge_equals_a_single_sketch_of_all_values():
+    rng = np.random.default_rng(2)
+    a_values, b_values = rng.uniform(0, 90, 500), rng.uniform(30, 180, 700)
+    a, b, both = HistogramSketch(0, 180, 720), HistogramSketch(0, 180, 720), HistogramSketch(0, 180, 720)
+    a.add_many(a_values)
+    b.add_many(b_values)
+    both.add_many(np.concatenate([a_values, b_values]))
+    a.merge(b)
+    assert np.array_equal(a.counts, both.counts)
+    assert (a.count, a.min, a.max) == (both.count, both.min, both.max)
+    assert a.quantiles((0.1, 0.5, 0.9)) == pytest.approx(both.quantiles((0.1, 0.5, 0.9)))
+
+
+def test_merge_rejects_different_ranges():
+    with pytest.raises(ValueError):
+        HistogramSketch(0, 100, 10).merge(HistogramSketch(0, 100, 20))
+
+
+def test_dict_round_trip_and_empty_sketch():
+    sketch = HistogramSketch(0, 1, 4)
+    assert sketch.quantile(0.5) is None and sketch.mean() is None
+    sketch.add_many([0.1, 0.2, 0.9])
+    restored = HistogramSketch.from_dict(sketch.to_dict())
+    assert restored.summary() == sketch.summary()
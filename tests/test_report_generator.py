@@ -0,0 +1,37 @@
+import os
+
+from posture_history import make_sketches
+from report_generator import generate_report
+from score_timeline import ScoreTimeline
+
+
+def _timeline():
+    timeline = ScoreTimeline()
+    for i in range(600):
+        timeline.add(i / 10, 60 + i % 40)
+    return timeline
+
+
+def _distributions():
+    sketches = make_sketches()
+    for i, sketch in enumerate(sketches.values()):
+        sketch.add_many([10.0 + i, 20.0 + i, 30.0 + i])
+    return {name: sketch.summary() for name, sketch in sketches.items()}
+
+
+def test_report_with_distributions_keeps_the_requested_name(tmp_path):
+    paths = generate_report(_timeline(), 1.0, [(10.0, 20.0)], formats=("png", "html"), output_dir=str(tmp_path),
+                            distributions=_distributions(), name="posture_report_cam1")
+    assert len(paths) == 2
+    for path in paths:
+        assert os.path.basename(path).startswith("posture_report_cam1_")
+        assert os.path.exists(path)
+
+
+def test_html_report_escapes_title(tmp_path):
+    paths = generate_report(_timeline(), 1.0, formats=("html",), output_dir=str(tmp_path),
+                            title="<script>alert(1)</script> & co")
+    with open(paths[0], encoding="utf-8") as f:
+        page = f.read()
+    assert "<script>" not in page
+    assert "&lt;script&gt;alert(1)&lt;/script&gt; &amp; co" in page
@@ -0,0 +1,65 @@
+import pytest
+
+from posture_history import PostureHistory
+from rollups import RollupAccumulator, RollupStore
+
+PENALTIES = {"good": {"hunchback": 0}, "warning": {"hunchback": 15}, "bad": {"hunchback": 30}}
+
+
+def _episodes(accumulator):
+    return sum(row[-1] for row in accumulator.rows())
+
+
+def test_state_seconds_are_split_per_minute():
+    acc = RollupAccumulator()
+    for i in range(1200):  # 120 秒，每 0.1 秒一筆，前半 good、後半 bad
+        acc.add_sample(60 * 100 + i / 10, 80, "good" if i < 600 else "bad")
+    rows = acc.rows()
+    assert [row[0] for row in rows] == [100, 101]
+    assert rows[0][1] == 600 and rows[0][2] == 600 * 80
+    assert rows[0][3] == pytest.approx(59.9)   # 第一筆沒有前一筆，不計時間
+    assert rows[1][5] == pytest.approx(60.0)
+    assert _episodes(acc) == 1
+
+
+def test_gaps_longer_than_max_sample_gap_are_not_counted():
+    acc = RollupAccumulator()
+    acc.add_sample(0.0, 80, "good")
+    acc.add_sample(0.5, 80, "good")
+    acc.add_sample(30.0, 80, "good")  # 離席後回來
+    assert acc.rows()[0][3] == pytest.approx(0.5)
+
+
+def test_away_time_is_split_across_minutes():
+    acc = RollupAccumulator()
+    acc.add_away(50.0, 130.0)
+    assert [(row[0], row[6]) for row in acc.rows()] == [(0, 10.0), (1, 60.0), (2, 10.0)]
+
+
+@pytest.mark.parametrize("states", [
+    ["bad", "bad", "good", "bad", "warning", "bad"],
+    ["good", "bad", "bad", "warning", "bad", "good"],
+])
+def test_bad_episodes_match_posture_history(states):
+    history = PostureHistory()
+    acc = RollupAccumulator()
+    for i, state in enumerate(states):
+        history.update(i * 0.1, {"penalties": PENALTIES[state]})
+        acc.add_sample(i * 0.1, 80, history.current_state)
+    assert _episodes(acc) == history.bad_episodes_count
+
+
+def test_store_merges_sessions_into_daily_totals(tmp_path):
+    store = RollupStore(str(tmp_path / "r.sqlite3"))
+    for _ in range(2):
+        acc = RollupAccumulator()
+        acc.add_sample(86400 * 3 + 43200, 70, "good")
+        acc.add_sample(86400 * 3 + 43200.5, 90, "bad")
+        store.merge(acc.rows())
+    days = store.daily(86400 * 3, 86400 * 4)
+    store.close()
+    assert len(days) == 1
+    assert days[0]["samples"] == 4
+    assert days[0]["avg_score"] == 80.0
+    assert days[0]["bad_s"] == pytest.approx(1.0)
+    assert days[0]["bad_episodes"] == 2
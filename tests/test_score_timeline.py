@@ -0,0 +1,47 @@
+import numpy as np
+
+from score_timeline import ScoreTimeline
+
+
+def _fill(timeline, seconds, fps=10, score=lambda i: 80):
+    for i in range(int(seconds * fps)):
+        timeline.add(i / fps, score(i))
+
+
+def test_series_is_raw_data_while_it_fits():
+    timeline = ScoreTimeline(raw_capacity=100)
+    _fill(timeline, 5)
+    times, mean, lo, hi = timeline.series()
+    np.testing.assert_allclose(times, np.arange(50) / 10)
+    assert np.array_equal(mean, lo) and np.array_equal(lo, hi)
+
+
+def test_series_merges_resolutions_in_time_order():
+    timeline = ScoreTimeline(raw_capacity=300, second_capacity=125, minute_capacity=100)
+    _fill(timeline, 30 * 60, score=lambda i: 60 + i % 30)
+    times, mean, lo, hi = timeline.series()
+    assert np.all(np.diff(times) > 0)
+    assert np.all(lo <= mean) and np.all(mean <= hi)
+    assert times[0] == 30.0  # 最舊的資料是第一分鐘的區間
+    assert len(timeline) == 18000
+
+
+def test_series_has_no_gap_at_the_minute_second_boundary():
+    # 每秒區間的開頭落在一分鐘的中間 (1714 秒)，那一分鐘不能被丟掉
+    timeline = ScoreTimeline(raw_capacity=300, second_capacity=125, minute_capacity=100)
+    _fill(timeline, 30 * 60 + 40)
+    times = timeline.series()[0]
+    boundary = timeline.seconds.ordered()[0][0]
+    assert boundary % 60 != 0
+    minute_start = boundary // 60 * 60
+    before = times[times < boundary]
+    assert minute_start <= before[-1] < boundary
+
+
+def test_stats_cover_the_whole_session():
+    timeline = ScoreTimeline(raw_capacity=10, second_capacity=5, minute_capacity=5)
+    _fill(timeline, 600, score=lambda i: 90 if i % 2 else 50)
+    stats = timeline.stats()
+    assert stats["count"] == 6000
+    assert stats["avg_score"] == 70.0
+    assert stats["good_ratio"] == 50.0
@@ -0,0 +1,88 @@
+from session_engine import BREAK_DUE, USER_AWAY, USER_BACK, USER_RETURNING, WARN, SessionEngine, simulate
+
+
+def _engine(**kwargs):
+    engine = SessionEngine(clock=lambda: 0.0, **kwargs)
+    engine.calibrated = True
+    return engine
+
+
+def _run(engine, start, end, present, score=90, fps=4):
+    """以 fps 推進 [start, end)，回傳 (時間, 事件種類) 列表"""
+    events = []
+    for i in range(int(round((end - start) * fps))):
+        t = start + i / fps
+        for event in engine.tick(t, present, score if engine.needs_score(present) else None):
+            events.append((t, event.kind))
+    return events
+
+
+def test_low_score_warns_after_debounce_and_respects_cooldown():
+    engine = _engine()
+    events = _run(engine, 0, 13, True, score=50)
+    assert events == [(1.5, WARN), (6.75, WARN), (12.0, WARN)]
+
+
+def test_short_dip_in_score_does_not_warn():
+    engine = _engine()
+    assert _run(engine, 0, 1, True, score=50) == []
+    assert _run(engine, 1, 5, True, score=90) == []
+
+
+def test_leaving_and_returning_needs_confirmation():
+    engine = _engine()
+    _run(engine, 0, 10, True)
+    assert _run(engine, 10, 20, False) == [(10, USER_AWAY)]
+    assert engine.time_left is None
+    events = _run(engine, 20, 25, True)
+    assert events == [(20, USER_RETURNING), (23, USER_BACK)]
+    assert engine.away_periods == [(10, 23)]
+    assert engine.time_left == engine.pomodoro_limit - 1.75  # 最後一次 tick 在 24.75 秒
+
+
+def test_leaving_again_during_confirmation_is_one_absence():
+    engine = _engine()
+    _run(engine, 0, 10, True)
+    _run(engine, 10, 20, False)
+    _run(engine, 20, 21, True)     # 回座確認中
+    _run(engine, 21, 30, False)    # 又離開
+    _run(engine, 30, 34, True)
+    assert engine.away_periods == [(10, 33)]
+
+
+def test_no_scores_are_used_while_confirming():
+    engine = _engine()
+    _run(engine, 0, 1, True)
+    _run(engine, 1, 2, False)
+    engine.tick(2.0, True, None)
+    assert engine.confirming
+    assert not engine.needs_score(True)
+
+
+def test_break_reminders_repeat_until_reset():
+    engine = _engine(pomodoro_limit=10)
+    events = [e for e in _run(engine, 0, 22, True) if e[1] == BREAK_DUE]
+    assert [t for t, _ in events] == [10, 15.25, 20.5]
+    assert engine.reset_timer(22.0)
+    assert _run(engine, 22, 31, True) == []
+
+
+def test_reset_is_refused_before_time_is_up():
+    engine = _engine(pomodoro_limit=10)
+    _run(engine, 0, 5, True)
+    assert not engine.reset_timer(5.0)
+
+
+def test_finish_closes_an_open_absence():
+    engine = _engine()
+    _run(engine, 0, 5, True)
+    _run(engine, 5, 8, False)
+    assert engine.finish(9.0) == [(5, 9.0)]
+
+
+def test_simulation_events_are_consistent():
+    engine = _engine()
+    ticks, counts = simulate(engine, hours=2, fps=10, seed=1)
+    assert ticks == 72000
+    assert counts[USER_AWAY] == len(engine.away_periods)
+    assert counts[USER_BACK] <= counts[USER_RETURNING]
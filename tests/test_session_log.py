@@ -0,0 +1,58 @@
+import numpy as np
+
+from session_log import NO_SCORE, NO_STATE, SessionLogReader, SessionLogWriter
+
+
+def _result(score):
+    return {
+        "score": score,
+        "features": {"shoulder_tilt_deg": 1.5, "eye_dist_px": 95.0, "nose_shoulder_angle": 80.25},
+        "penalties": {"shoulder_tilt": 0, "head_distance": 10},
+    }
+
+
+def test_round_trip_across_blocks(tmp_path):
+    path = str(tmp_path / "s.plog")
+    writer = SessionLogWriter(path, batch_rows=4)
+    for i in range(10):
+        if i % 3 == 0:
+            writer.append(1000.0 + i, None, present=False)
+        else:
+            writer.append(1000.0 + i, _result(60 + i), present=True, state="warning")
+    writer.close()
+
+    data = SessionLogReader(path).read()
+    np.testing.assert_array_equal(data["timestamp"], 1000.0 + np.arange(10))
+    scored = np.arange(10) % 3 != 0
+    assert list(data["score"][scored]) == [60 + i for i in range(10) if i % 3]
+    assert np.all(data["score"][~scored] == NO_SCORE)
+    assert np.all(data["state"][~scored] == NO_STATE)
+    assert np.all(data["present"] == scored)
+    assert np.all(data["eye_dist_px"][scored] == 95.0)
+    assert np.all(np.isnan(data["eye_dist_px"][~scored]))
+    assert np.all(np.isnan(data["head_roll_deg"]))  # 結果中沒有的特徵記為 NaN
+    assert np.all(data["pen_head_distance"][scored] == 10)
+
+
+def test_appending_to_an_existing_file_keeps_earlier_rows(tmp_path):
+    path = str(tmp_path / "s.plog")
+    for start in (0, 5):
+        writer = SessionLogWriter(path, batch_rows=2)
+        for i in range(start, start + 5):
+            writer.append(float(i), _result(80))
+        writer.close()
+    np.testing.assert_array_equal(SessionLogReader(path).read(["timestamp"])["timestamp"], np.arange(10.0))
+
+
+def test_truncated_tail_block_is_skipped(tmp_path):
+    path = str(tmp_path / "s.plog")
+    writer = SessionLogWriter(path, batch_rows=3)
+    for i in range(6):
+        writer.append(float(i), _result(80))
+    writer.close()
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 5)
+
+    reader = SessionLogReader(path)
+    np.testing.assert_array_equal(reader.read(["timestamp"])["timestamp"], [0.0, 1.0, 2.0])
+    assert reader.skipped_bytes > 0